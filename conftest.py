@@ -0,0 +1 @@
+"""Hace importable el paquete `ventas` al ejecutar pytest desde la raíz del repositorio"""
@@ -0,0 +1,80 @@
+import os
+import sqlite3
+
+import pytest
+
+from tests.test_ingesta import _excel
+from ventas import almacen, consultas, esquema, ingesta
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "ventas.db")
+    esquema.migrar(conn)
+    archivos = [("2025.xlsx", _excel(40, "Hombre", "2025-01-01")), ("2026.xlsx", _excel(40, "Mujer", "2026-01-01"))]
+    ingesta.cargar_archivos(conn, archivos, procesos=1)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def tienda(tmp_path):
+    return almacen.crear("parquet", tmp_path / "parquet")
+
+
+def _resumen(df):
+    return len(df), float(df["venta"].sum()), sorted(df["fecha"].dt.date.unique())
+
+
+def test_sincronizar_exporta_los_anios_marcados(conn, tienda):
+    assert not conn.in_transaction
+    assert tienda.sincronizar(conn) == [2025, 2026]
+    assert tienda.anios() == [2025, 2026]
+    assert conn.execute("SELECT COUNT(*) FROM anios_modificados").fetchone()[0] == 0
+
+    for anio in (2025, 2026):
+        assert _resumen(tienda.cargar_ventas(conn, anio)) == _resumen(consultas.cargar_ventas(conn, anio))
+    # Sin cambios nuevos no se reexporta nada
+    assert tienda.sincronizar(conn) == []
+
+
+def test_leer_no_escribe_y_usa_sqlite_si_la_replica_esta_atrasada(conn, tienda):
+    tienda.sincronizar(conn)
+    ruta = tienda._ruta(2026)
+    modificado = os.stat(ruta).st_mtime_ns
+
+    ingesta.cargar_archivos(conn, [("mas.xlsx", _excel(10, "Hombre", "2026-03-01"))], procesos=1)
+    cambios = conn.total_changes
+    df = tienda.cargar_ventas(conn, 2026, columnas=["anio", "fecha", "venta"])
+
+    assert len(df) == 50
+    assert conn.total_changes == cambios and not conn.in_transaction
+    assert os.stat(ruta).st_mtime_ns == modificado
+    # El año sin cambios se sigue leyendo de la réplica
+    assert len(tienda.cargar_ventas(conn, 2025)) == 40
+
+    tienda.sincronizar(conn)
+    assert pq.read_table(ruta).num_rows == 50
+
+
+def test_archivo_borrado_durante_la_lectura_se_lee_de_sqlite(conn, tienda, monkeypatch):
+    tienda.sincronizar(conn)
+    os.remove(tienda._ruta(2025))
+    monkeypatch.setattr(tienda, "anios", lambda: [2025, 2026])
+
+    assert len(tienda.cargar_ventas(conn, [2025, 2026])) == 80
+
+
+def test_sincronizar_no_deja_un_archivo_viejo_sobre_uno_nuevo(conn, tienda, tmp_path):
+    otra = sqlite3.connect(tmp_path / "ventas.db", timeout=0.1)
+    otra.execute("BEGIN IMMEDIATE")
+    conn.execute("PRAGMA busy_timeout = 100")
+    # Mientras otro proceso escribe, exportar espera al cerrojo de escritura
+    with pytest.raises(sqlite3.OperationalError):
+        tienda.sincronizar(conn)
+    otra.rollback()
+    otra.close()
+    assert not conn.in_transaction
+    assert tienda.anios() == []
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from tests.test_ingesta import _excel
+from ventas import api, esquema, ingesta
+
+
+def _llamar(app, ruta, consulta="", cabeceras=()):
+    """(estado, cabeceras, cuerpo) de un GET al app ASGI, con su ciclo de vida"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": ruta, "raw_path": ruta.encode(), "root_path": "",
+        "query_string": consulta.encode(), "client": ("test", 0), "server": ("test", 80),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in cabeceras],
+    }
+    respuesta = {"cuerpo": b""}
+
+    async def recibir():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def enviar(mensaje):
+        if mensaje["type"] == "http.response.start":
+            respuesta["estado"] = mensaje["status"]
+            respuesta["cabeceras"] = {k.decode(): v.decode() for k, v in mensaje["headers"]}
+        elif mensaje["type"] == "http.response.body":
+            respuesta["cuerpo"] += mensaje.get("body", b"")
+
+    async def correr():
+        async with api._ciclo_de_vida(app):
+            await app(scope, recibir, enviar)
+
+    asyncio.run(correr())
+    return respuesta["estado"], respuesta["cabeceras"], respuesta["cuerpo"]
+
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    ruta = tmp_path / "ventas.db"
+    conn = sqlite3.connect(ruta)
+    esquema.migrar(conn)
+    archivos = [("2025.xlsx", _excel(60, "Hombre", "2025-01-01")), ("2026.xlsx", _excel(60, "Hombre", "2026-01-01"))]
+    ingesta.cargar_archivos(conn, archivos, procesos=1)
+    conn.close()
+    monkeypatch.setattr(api, "DB_PATH", str(ruta))
+    monkeypatch.setattr(api, "ALMACEN", "sqlite")
+    return ruta
+
+
+def test_kpis_por_defecto(base):
+    estado, _, cuerpo = _llamar(api.app, "/kpis", "crecimiento=10")
+    datos = json.loads(cuerpo)
+
+    assert estado == 200
+    assert (datos["anio_base"], datos["anio_comparar"]) == (2025, 2026)
+    assert datos["base"]["venta"] == datos["comparar"]["venta"] == 60 * 1000.0
+    assert datos["presupuesto"]["presupuesto"] == pytest.approx(66000.0)
+
+
+@pytest.mark.parametrize("consulta, mensaje", [
+    ("anio_base=1999", "anio_base"),
+    ("anio_comparar=2030", "anio_comparar"),
+    ("anio_base=dos", "numérico"),
+    ("desde=2026-13-01", "desde"),
+    ("desde=2026-02-01&hasta=2026-01-01", "desde"),
+    ("crecimiento=-5", "crecimiento"),
+])
+def test_kpis_parametros_invalidos_responden_400(base, consulta, mensaje):
+    estado, _, cuerpo = _llamar(api.app, "/kpis", consulta)
+
+    assert estado == 400
+    assert mensaje in json.loads(cuerpo)["error"]
+
+
+def test_etag_responde_304_hasta_que_cambian_los_datos(base):
+    estado, cabeceras, _ = _llamar(api.app, "/kpis", "anio_base=2025")
+    etag = cabeceras["etag"]
+    assert estado == 200
+
+    estado, cabeceras, cuerpo = _llamar(api.app, "/kpis", "anio_base=2025", [("If-None-Match", etag)])
+    assert (estado, cabeceras["etag"], cuerpo) == (304, etag, b"")
+
+    # Otros parámetros, otra huella
+    _, cabeceras, _ = _llamar(api.app, "/kpis", "anio_base=2025&crecimiento=20")
+    assert cabeceras["etag"] != etag
+
+    # Una escritura sube la versión de datos: el ETag anterior deja de valer
+    conn = sqlite3.connect(base)
+    ingesta.cargar_archivos(conn, [("mas.xlsx", _excel(5, "Mujer", "2026-01-01"))], procesos=1)
+    conn.close()
+    estado, cabeceras, _ = _llamar(api.app, "/kpis", "anio_base=2025", [("If-None-Match", etag)])
+    assert estado == 200 and cabeceras["etag"] != etag
+
+
+def test_kpis_sin_datos_responde_404(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "DB_PATH", str(tmp_path / "vacia.db"))
+    estado, _, _ = _llamar(api.app, "/kpis")
+    assert estado == 404
@@ -0,0 +1,99 @@
+import sqlite3
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from ventas import comparables, esquema, ingesta
+
+
+def _ventas(desde, dias):
+    return ingesta.preparar(pd.DataFrame({
+        "Fecha": pd.date_range(desde, periods=dias, freq="D"),
+        "Secciones": "Hombre",
+        "Entradas": 100,
+        "Venta": 1000.0,
+        "Tickets": 20,
+        "Artículos": 40,
+        "Ticket promedio": 50.0,
+        "Artículos por ticket": 2.0,
+        "Tasa de conversión": 20.0,
+    }))
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "ventas.db")
+    esquema.migrar(conn)
+    ingesta.cargar_filas(conn, _ventas("2024-01-01", 10))
+    ingesta.cargar_filas(conn, _ventas("2025-01-01", 10))
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("fecha, anio_destino, esperada", [
+    (date(2026, 1, 5), 2025, date(2025, 1, 6)),
+    # Semana 1 de 2026 que empieza en diciembre de 2025
+    (date(2025, 12, 29), 2024, date(2024, 12, 30)),
+    # 2019 no tiene semana 53: se usa la 52
+    (date(2020, 12, 31), 2019, date(2019, 12, 26)),
+    (date(2025, 3, 10), 2027, date(2027, 3, 15)),
+])
+def test_equivalente_iso(fecha, anio_destino, esperada):
+    assert comparables.equivalente_iso(fecha, anio_destino) == esperada
+
+
+@pytest.mark.parametrize("fecha, anio_destino, esperada", [
+    (date(2024, 2, 29), 2023, date(2023, 2, 28)),
+    (date(2024, 2, 29), 2028, date(2028, 2, 29)),
+    (date(2025, 2, 28), 2024, date(2024, 2, 28)),
+    (date(2025, 12, 31), 2024, date(2024, 12, 31)),
+])
+def test_equivalente_calendario(fecha, anio_destino, esperada):
+    assert comparables.equivalente_calendario(fecha, anio_destino) == esperada
+
+
+def test_iso_conserva_el_dia_de_la_semana():
+    fecha = date(2024, 1, 1)
+    while fecha.year == 2024:
+        for anio_destino in (2023, 2025):
+            comparable = comparables.equivalente_iso(fecha, anio_destino)
+            assert comparable.weekday() == fecha.weekday()
+            assert abs((comparable - fecha).days - 364 * (anio_destino - 2024)) <= 7
+        fecha += timedelta(days=1)
+
+
+def test_tabla_cubre_los_anios_con_datos_y_el_siguiente(conn):
+    desde, hasta = conn.execute("SELECT MIN(anio), MAX(anio) FROM dias_comparables").fetchone()
+    assert (desde, hasta) == (2024, 2026)
+
+    # Un año nuevo en los datos extiende la tabla en la misma carga
+    ingesta.cargar_filas(conn, _ventas("2026-01-01", 5))
+    assert conn.execute("SELECT MAX(anio) FROM dias_comparables").fetchone()[0] == 2027
+
+
+@pytest.mark.parametrize("modo", comparables.MODOS)
+def test_busqueda_en_la_tabla_igual_al_calculo(conn, modo):
+    calcular = comparables.equivalente_iso if modo == "iso" else comparables.equivalente_calendario
+    for fecha in (date(2024, 2, 29), date(2024, 12, 30), date(2025, 6, 15), date(2026, 1, 1)):
+        for anio_destino in (2024, 2025, 2026):
+            if anio_destino != fecha.year:
+                assert comparables.equivalente(conn, fecha, anio_destino, modo) == calcular(fecha, anio_destino)
+
+    assert comparables.equivalente(conn, "2024-02-29", 2023, "calendario") == date(2023, 2, 28)
+    assert comparables.equivalente(conn, date(2025, 6, 15), 2025, modo) == date(2025, 6, 15)
+
+
+@pytest.mark.parametrize("modo", comparables.MODOS)
+def test_del_anio_anterior_con_y_sin_tabla(conn, modo):
+    # El rango sale de la cobertura de la tabla al final: esos días se calculan
+    con_tabla = comparables.del_anio_anterior(conn, "2026-12-01", "2027-01-10", modo)
+    sin_tabla = comparables.del_anio_anterior(None, "2026-12-01", "2027-01-10", modo)
+
+    pd.testing.assert_frame_equal(con_tabla, sin_tabla)
+    assert len(con_tabla) == 41
+
+
+def test_modo_desconocido(conn):
+    with pytest.raises(ValueError):
+        comparables.equivalente(conn, date(2025, 1, 1), 2024, modo="semana")
@@ -0,0 +1,111 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from ventas import consultas, esquema, ingesta
+
+
+def _ventas(secciones, **columnas):
+    n = len(secciones)
+    return pd.DataFrame({
+        "anio": [2025] * n,
+        "secciones": secciones,
+        "entradas": [100] * n,
+        "tickets": [20] * n,
+        "venta": [1000.0] * n,
+        **columnas,
+    })
+
+
+def test_compactar_reduce_tipos():
+    df = consultas.compactar(_ventas(["Mujer", "Hombre", "Mujer"]))
+
+    assert isinstance(df["secciones"].dtype, pd.CategoricalDtype)
+    assert list(df["secciones"].cat.categories) == ["Hombre", "Mujer"]
+    assert df["anio"].dtype == "int16"
+    assert df["entradas"].dtype == "int8"
+    assert df["venta"].dtype == "float64"
+    assert df["entradas"].tolist() == [100, 100, 100]
+
+
+def test_catalogo_comun_permite_concatenar_sin_perder_la_categoria():
+    catalogo = ["Hombre", "Mujer", "Niños"]
+    base = consultas.compactar(_ventas(["Hombre"]), catalogo)
+    comparar = consultas.compactar(_ventas(["Mujer", "Otra"]), catalogo)
+
+    # Una sección fuera del catálogo se agrega al final en lugar de perderse
+    assert list(comparar["secciones"].cat.categories) == catalogo + ["Otra"]
+    unidos = pd.concat([base, consultas.compactar(_ventas(["Niños"]), catalogo)])
+    assert isinstance(unidos["secciones"].dtype, pd.CategoricalDtype)
+
+
+def test_columnas_con_nulos_no_se_reducen():
+    df = consultas.compactar(_ventas(["Hombre", "Mujer"], tickets=[20, None]))
+    assert df["tickets"].dtype == "float64"
+    assert df["entradas"].dtype == "int8"
+
+
+def test_compactar_no_modifica_el_original():
+    original = _ventas(["Hombre"])
+    consultas.compactar(original)
+    assert not isinstance(original["secciones"].dtype, pd.CategoricalDtype)
+    assert original["anio"].dtype == "int64"
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "ventas.db")
+    esquema.migrar(conn)
+    for desde in ("2024-01-01", "2025-01-01"):
+        for seccion in ("Hombre", "Mujer"):
+            ingesta.cargar_filas(conn, ingesta.preparar(pd.DataFrame({
+                "Fecha": pd.date_range(desde, periods=45, freq="D"),
+                "Secciones": seccion,
+                "Entradas": 100,
+                "Venta": 1000.0,
+                "Tickets": 20,
+                "Artículos": 40,
+                "Ticket promedio": 50.0,
+                "Artículos por ticket": 2.0,
+                "Tasa de conversión": 20.0,
+            })))
+    yield conn
+    conn.close()
+
+
+PERIODOS = [(2025, "2025-01-01", "2025-01-31"), (2024, "2024-01-01", "2024-01-31")]
+
+
+def test_paginas_recorren_los_periodos_en_orden(conn):
+    total = consultas.contar_periodos(conn, PERIODOS)
+    assert total == 124
+
+    paginas = [
+        consultas.pagina_periodos(conn, PERIODOS, pagina=p, tamano=50, columnas=["anio", "fecha", "secciones"])
+        for p in (1, 2, 3)
+    ]
+    assert [len(p) for p in paginas] == [50, 50, 24]
+
+    filas = pd.concat(paginas, ignore_index=True)
+    esperadas = pd.concat([
+        consultas.cargar_ventas(conn, *periodo, columnas=["anio", "fecha", "secciones"]) for periodo in PERIODOS
+    ]).sort_values(["anio", "fecha", "secciones"], ascending=[False, False, True], ignore_index=True)
+    pd.testing.assert_frame_equal(filas, esperadas)
+
+
+def test_pagina_fuera_de_rango_y_filtros(conn):
+    assert consultas.pagina_periodos(conn, PERIODOS, pagina=9, tamano=50).empty
+    # Las páginas empiezan en 1
+    pd.testing.assert_frame_equal(
+        consultas.pagina_periodos(conn, PERIODOS, pagina=0, tamano=10),
+        consultas.pagina_periodos(conn, PERIODOS, pagina=1, tamano=10),
+    )
+
+    assert consultas.contar_periodos(conn, PERIODOS, secciones=["Mujer"]) == 62
+    pagina = consultas.pagina_periodos(conn, PERIODOS, secciones=["Mujer"], tamano=100)
+    assert set(pagina["secciones"]) == {"Mujer"}
+
+    assert consultas.contar_periodos(conn, PERIODOS, secciones=[]) == 0
+    assert consultas.pagina_periodos(conn, PERIODOS, secciones=[]).empty
+    assert consultas.contar_periodos(conn, []) == 0
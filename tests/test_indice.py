@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ventas import indice
+
+
+def _frame(desordenar=False):
+    fechas = pd.date_range("2024-01-01", "2025-12-31", freq="D")
+    df = pd.DataFrame({
+        "anio": np.repeat(fechas.year, 2),
+        "fecha": np.repeat(fechas, 2),
+        "secciones": ["Hombre", "Mujer"] * len(fechas),
+        "venta": np.arange(2 * len(fechas), dtype="float64"),
+    })
+    if desordenar:
+        df = df.sample(frac=1, random_state=0).reset_index(drop=True)
+    return df
+
+
+def _con_mascara(df, anio=None, fecha_inicio=None, fecha_fin=None):
+    mascara = pd.Series(True, index=df.index)
+    if anio is not None:
+        mascara &= df["anio"] == anio
+    if fecha_inicio is not None:
+        mascara &= df["fecha"] >= pd.Timestamp(fecha_inicio)
+    if fecha_fin is not None:
+        mascara &= df["fecha"] <= pd.Timestamp(fecha_fin)
+    return df[mascara]
+
+
+FILTROS = [
+    (2024, "2024-02-10", "2024-03-05"),
+    (2025, None, "2025-01-31"),
+    (2025, "2025-12-01", None),
+    (2024, "2024-02-29", "2024-02-29"),
+    (None, "2024-12-25", "2025-01-05"),
+    (2025, "2025-03-01", "2025-02-01"),
+    (2023, None, None),
+]
+
+
+@pytest.mark.parametrize("anio, fecha_inicio, fecha_fin", FILTROS)
+def test_rango_igual_a_la_mascara(anio, fecha_inicio, fecha_fin):
+    df = _frame()
+    indice_fechas = indice.IndiceFechas(df)
+
+    assert isinstance(indice_fechas.rebanada(anio, fecha_inicio, fecha_fin), slice)
+    pd.testing.assert_frame_equal(
+        indice_fechas.rango(anio, fecha_inicio, fecha_fin),
+        _con_mascara(df, anio, fecha_inicio, fecha_fin),
+    )
+
+
+@pytest.mark.parametrize("anio, fecha_inicio, fecha_fin", FILTROS)
+def test_frame_desordenado_usa_la_mascara(anio, fecha_inicio, fecha_fin):
+    df = _frame(desordenar=True)
+    indice_fechas = indice.IndiceFechas(df)
+
+    # Un año sin filas se corta igual: no hay nada que ordenar
+    if anio in (None, 2024, 2025):
+        assert indice_fechas.rebanada(anio, fecha_inicio, fecha_fin) is None
+    pd.testing.assert_frame_equal(
+        indice_fechas.rango(anio, fecha_inicio, fecha_fin),
+        _con_mascara(df, anio, fecha_inicio, fecha_fin),
+    )
+
+
+def test_posiciones_sirven_para_frames_derivados():
+    df = _frame()
+    indice_fechas = indice.IndiceFechas(df)
+    derivado = df.assign(doble=df["venta"] * 2)
+
+    filas = indice_fechas.rango(2025, "2025-06-01", "2025-06-30", df=derivado)
+    assert len(filas) == 60
+    assert (filas["doble"] == filas["venta"] * 2).all()
+    assert filas["fecha"].between("2025-06-01", "2025-06-30").all()
+
+
+def test_hora_en_la_fecha_cuenta_como_el_dia():
+    df = _frame().assign(fecha=lambda d: d["fecha"] + pd.Timedelta(hours=15))
+    filas = indice.IndiceFechas(df).rango(2024, "2024-03-01", "2024-03-01")
+    assert len(filas) == 2
+
+
+def test_frame_vacio():
+    df = _frame().iloc[:0]
+    assert indice.IndiceFechas(df).rango(2024, "2024-01-01", "2024-12-31").empty
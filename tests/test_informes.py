@@ -0,0 +1,95 @@
+import os
+import sqlite3
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from ventas import consultas, esquema, informes, ingesta
+
+
+def _ventas(desde, dias, seccion, venta):
+    return ingesta.preparar(pd.DataFrame({
+        "Fecha": pd.date_range(desde, periods=dias, freq="D"),
+        "Secciones": seccion,
+        "Entradas": 100,
+        "Venta": venta,
+        "Tickets": 20,
+        "Artículos": 40,
+        "Ticket promedio": 50.0,
+        "Artículos por ticket": 2.0,
+        "Tasa de conversión": 20.0,
+    }))
+
+
+@pytest.fixture
+def base(tmp_path):
+    ruta = str(tmp_path / "ventas.db")
+    conn = sqlite3.connect(ruta)
+    esquema.migrar(conn)
+    for seccion in ("Hombre", "Mujer"):
+        ingesta.cargar_filas(conn, _ventas("2024-01-01", 60, seccion, 1000.0))
+        ingesta.cargar_filas(conn, _ventas("2025-01-01", 60, seccion, 1100.0))
+    catalogo = consultas.catalogo(conn)
+    conn.close()
+    return ruta, catalogo
+
+
+def test_leer_trabajos(base):
+    _, catalogo = base
+    trabajos = informes.leer_trabajos([
+        {"anio_base": 2024, "anio_comparar": 2025, "desde": "2025-01-01", "hasta": "2025-01-31"},
+        {"anio_base": 2024, "anio_comparar": 2025, "secciones": "cada", "nombre": "secciones"},
+    ], catalogo)
+
+    assert [t.nombre for t in trabajos] == [
+        "2024_vs_2025_20250101-20250131", "secciones_Hombre", "secciones_Mujer",
+    ]
+    assert trabajos[0].secciones is None
+    assert trabajos[0].crecimiento == informes.CRECIMIENTO_PRESUPUESTO
+    # Sin período se usa el rango de toda la base, como la página
+    assert (trabajos[1].desde, trabajos[1].hasta) == catalogo["rango"]
+
+
+@pytest.mark.parametrize("especificaciones, mensaje", [
+    ([{"anio_base": 2024}], "obligatorios"),
+    ([{"anio_base": 2024, "anio_comparar": 2025, "desde": "2025-13-01"}], "AAAA-MM-DD"),
+    ([{"anio_base": 2024, "anio_comparar": 2025, "desde": "2025-02-01", "hasta": "2025-01-01"}], "menor o igual"),
+    ([{"anio_base": 2024, "anio_comparar": 2025, "nombre": "x"}] * 2, "repetidos"),
+])
+def test_trabajos_mal_escritos(base, especificaciones, mensaje):
+    with pytest.raises(ValueError, match=mensaje):
+        informes.leer_trabajos(especificaciones, base[1])
+
+
+@pytest.mark.parametrize("procesos", [1, 2])
+def test_generar_por_lotes(base, tmp_path, procesos):
+    ruta, catalogo = base
+    trabajos = informes.leer_trabajos([
+        {"anio_base": 2024, "anio_comparar": 2025, "desde": "2025-01-01", "hasta": "2025-01-31", "nombre": "enero"},
+        {"anio_base": 2024, "anio_comparar": 2025, "secciones": ["Mujer"], "nombre": "mujer"},
+    ], catalogo)
+    # Un directorio que no existe hace fallar solo la escritura de ese trabajo
+    trabajos.append(informes.Trabajo("falta/roto", 2024, 2025, *catalogo["rango"]))
+    salida = str(tmp_path / "informes")
+
+    terminados = []
+    resultados = informes.generar(trabajos, ruta, salida, procesos=procesos, al_terminar=terminados.append)
+
+    assert [r["nombre"] for r in resultados] == ["enero", "mujer", "falta/roto"]
+    assert sorted(r["nombre"] for r in terminados) == sorted(r["nombre"] for r in resultados)
+    assert resultados[0]["error"] is None and resultados[1]["error"] is None
+    assert "roto.xlsx" in resultados[2]["error"]
+    assert sorted(os.listdir(salida)) == ["enero.html", "enero.xlsx", "mujer.html", "mujer.xlsx"]
+
+    # Mismos KPI que la página: 31 días de 2 secciones en cada año
+    hoja = openpyxl.load_workbook(os.path.join(salida, "enero.xlsx")).active
+    ventas = next(fila for fila in hoja.iter_rows(values_only=True) if fila[0] == "Ventas")
+    assert ventas[1:4] == (62 * 1000.0, 62 * 1100.0, pytest.approx(10.0))
+    with open(os.path.join(salida, "mujer.html"), encoding="utf-8") as archivo:
+        pagina = archivo.read()
+    assert "Resumen Comparativo" in pagina and "Secciones: Mujer" in pagina
+
+    with open(informes.escribir_indice(resultados, salida), encoding="utf-8") as archivo:
+        indice = archivo.read()
+    assert 'href="enero.xlsx"' in indice and "Error: " in indice
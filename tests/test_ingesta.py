@@ -0,0 +1,148 @@
+import io
+import sqlite3
+import threading
+
+import pandas as pd
+import pytest
+
+from ventas import esquema, ingesta
+
+
+def _excel(dias, seccion="Hombre", desde="2025-01-01"):
+    df = pd.DataFrame({
+        "Fecha": pd.date_range(desde, periods=dias, freq="D"),
+        "Secciones": seccion,
+        "Entradas": 100,
+        "Venta": 1000.0,
+        "Tickets": 20,
+        "Artículos": 40,
+        "Ticket promedio": 50.0,
+        "Artículos por ticket": 2.0,
+        "Tasa de conversión": 20.0,
+    })
+    contenido = io.BytesIO()
+    df.to_excel(contenido, index=False)
+    return contenido.getvalue()
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "ventas.db", check_same_thread=False)
+    esquema.migrar(conn)
+    yield conn
+    conn.close()
+
+
+def _en_hilo(funcion, limite=60):
+    """Resultado o excepción de `funcion()`; falla si no termina en `limite` segundos"""
+    salida = {}
+
+    def correr():
+        try:
+            salida["resultado"] = funcion()
+        except BaseException as e:
+            salida["error"] = e
+
+    hilo = threading.Thread(target=correr, daemon=True)
+    hilo.start()
+    hilo.join(limite)
+    assert not hilo.is_alive(), "la carga quedó bloqueada"
+    return salida
+
+
+def test_carga_paralela(conn):
+    archivos = [("a.xlsx", _excel(30, "Hombre")), ("b.xlsx", _excel(30, "Mujer"))]
+    resultados = ingesta.cargar_archivos(conn, archivos, procesos=2, tamano_lote=10)
+    assert {n: r["nuevos"] for n, r in resultados.items()} == {"a.xlsx": 30, "b.xlsx": 30}
+
+    # Recargar los mismos archivos no duplica filas
+    ingesta.cargar_archivos(conn, archivos, procesos=2, tamano_lote=10)
+    assert conn.execute("SELECT COUNT(*) FROM ventas").fetchone()[0] == 60
+
+
+def test_error_del_escritor_no_bloquea_la_carga_paralela(conn, monkeypatch):
+    escribir = ingesta.escribir_lote
+    llamadas = []
+
+    def escribir_con_fallo(conn, lote):
+        llamadas.append(len(lote))
+        if len(llamadas) == 2:
+            raise sqlite3.OperationalError("database is locked")
+        return escribir(conn, lote)
+
+    monkeypatch.setattr(ingesta, "escribir_lote", escribir_con_fallo)
+    # Muchos lotes por archivo: los lectores llenan la cola antes del error
+    archivos = [("a.xlsx", _excel(200, "Hombre")), ("b.xlsx", _excel(200, "Mujer"))]
+    salida = _en_hilo(lambda: ingesta.cargar_archivos(conn, archivos, procesos=2, tamano_lote=10))
+
+    assert isinstance(salida.get("error"), sqlite3.OperationalError)
+    assert not conn.in_transaction
+
+
+def test_seccion_vacia_es_error_del_archivo(conn):
+    df = pd.read_excel(io.BytesIO(_excel(5, "Hombre")))
+    df.loc[2, "Secciones"] = None
+    malo = io.BytesIO()
+    df.to_excel(malo, index=False)
+
+    archivos = [("bueno.xlsx", _excel(5, "Mujer")), ("malo.xlsx", malo.getvalue())]
+    salida = _en_hilo(lambda: ingesta.cargar_archivos(conn, archivos, procesos=2))
+    resultados = salida["resultado"]
+
+    assert resultados["bueno.xlsx"]["error"] is None
+    assert "Secciones" in resultados["malo.xlsx"]["error"]
+    assert conn.execute("SELECT COUNT(*) FROM ventas WHERE secciones IS NULL").fetchone()[0] == 0
+
+
+def test_lectores_sin_avance_detienen_la_carga(conn):
+    # Arrancar los procesos lleva más que espera_maxima=0: la primera espera vacía corta
+    archivos = [("a.xlsx", _excel(30, "Hombre")), ("b.xlsx", _excel(30, "Mujer"))]
+    salida = _en_hilo(lambda: ingesta.cargar_archivos(conn, archivos, procesos=2, espera_maxima=0))
+
+    assert isinstance(salida.get("error"), TimeoutError)
+    assert conn.execute("SELECT COUNT(*) FROM ventas").fetchone()[0] == 0
+
+
+@pytest.mark.parametrize("procesos", [1, 2])
+def test_archivos_con_el_mismo_nombre_se_cargan_por_separado(conn, procesos):
+    # Muchos lotes: con la cola llena, el segundo lector sigue enviando tras el fin del primero
+    archivos = [("ventas.xlsx", _excel(200, "Hombre")), ("ventas.xlsx", _excel(200, "Mujer"))]
+    salida = _en_hilo(lambda: ingesta.cargar_archivos(conn, archivos, procesos=procesos, tamano_lote=10))
+    resultados = salida["resultado"]
+
+    assert {n: r["nuevos"] for n, r in resultados.items()} == {"ventas.xlsx": 200, "ventas.xlsx (2)": 200}
+    assert conn.execute("SELECT COUNT(*) FROM ventas").fetchone()[0] == 400
+
+
+def _preparado(dias, seccion="Hombre", desde="2025-01-01"):
+    return ingesta.preparar(pd.read_excel(io.BytesIO(_excel(dias, seccion, desde))))
+
+
+def test_recarga_actualiza_solo_las_filas_cambiadas(conn):
+    assert ingesta.cargar_filas(conn, _preparado(31)) == {"nuevos": 31, "actualizados": 0, "sin_cambios": 0}
+    version = esquema.version_datos(conn)
+
+    # La misma carga no escribe nada ni cambia la versión de los datos
+    assert ingesta.cargar_filas(conn, _preparado(31)) == {"nuevos": 0, "actualizados": 0, "sin_cambios": 31}
+    assert esquema.version_datos(conn) == version
+
+    corregido = _preparado(31)
+    corregido.loc[corregido.index[:3], "venta"] = 1500.0
+    assert ingesta.cargar_filas(conn, corregido) == {"nuevos": 0, "actualizados": 3, "sin_cambios": 28}
+    assert esquema.version_datos(conn) > version
+    assert conn.execute("SELECT COUNT(*), SUM(venta) FROM ventas").fetchone() == (31, 28 * 1000.0 + 3 * 1500.0)
+
+
+def test_fila_repetida_en_el_lote_vale_la_ultima(conn):
+    df = pd.concat([_preparado(2), _preparado(1)], ignore_index=True)
+    df.loc[2, "venta"] = 700.0
+    ingesta.cargar_filas(conn, df)
+    assert conn.execute("SELECT COUNT(*), SUM(venta) FROM ventas").fetchone() == (2, 1700.0)
+
+
+def test_seccion_nula_no_se_escribe(conn):
+    df = _preparado(3)
+    df.loc[1, "secciones"] = None
+    with pytest.raises(ingesta.SeccionesVacias):
+        ingesta.cargar_filas(conn, df)
+    assert conn.execute("SELECT COUNT(*) FROM ventas").fetchone()[0] == 0
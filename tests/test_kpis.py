@@ -0,0 +1,53 @@
+import math
+
+import pandas as pd
+import pytest
+
+from ventas import consultas, kpis
+
+
+def _ventas():
+    return pd.DataFrame({
+        "fecha": pd.to_datetime(["2025-01-01", "2025-01-01", "2025-01-02", "2025-01-04 10:00:00"], format="ISO8601"),
+        "secciones": ["Hombre", "Mujer", "Hombre", "Mujer"],
+        "venta": [1000.0, 500.0, 300.0, 200.0],
+        "entradas": [100, 50, 30, 20],
+        "tickets": [20, 10, 0, 10],
+        "articulos": [40, 20, 0, 20],
+        "tasa_conversion": [20.0, None, 0.0, 50.0],
+    })
+
+
+def test_totales_y_derivados():
+    resultado = kpis.calcular(_ventas())
+
+    assert resultado.filas == 4
+    assert resultado.dias == 3
+    assert (resultado.venta, resultado.entradas, resultado.tickets, resultado.articulos) == (2000.0, 200.0, 40.0, 80.0)
+    # Media por fila sin contar los nulos
+    assert resultado.tasa_conversion == pytest.approx(70.0 / 3)
+    assert resultado.ticket_promedio == 50.0
+    assert resultado.promedio_diario == pytest.approx(2000.0 / 3)
+
+
+def test_tipos_compactos_dan_los_mismos_kpis():
+    df = _ventas()
+    assert kpis.calcular(consultas.compactar(df)) == kpis.calcular(df)
+
+
+def test_corte_vacio():
+    resultado = kpis.calcular(_ventas().iloc[:0])
+
+    assert resultado.vacio
+    assert resultado.venta == 0.0
+    assert math.isnan(resultado.tasa_conversion)
+    assert resultado.ticket_promedio == 0.0
+    assert resultado.promedio_diario == 0.0
+
+
+def test_variacion_presupuesto_y_cumplimiento():
+    assert kpis.variacion(110.0, 100.0) == pytest.approx(10.0)
+    assert kpis.variacion(110.0, 0.0) is None
+    assert kpis.presupuesto(200.0, 5) == pytest.approx(210.0)
+    assert kpis.cumplimiento(105.0, 210.0) == pytest.approx(50.0)
+    assert kpis.cumplimiento(105.0, 0.0) == 0
@@ -0,0 +1,87 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from ventas import esquema, ingesta, resumenes
+
+
+def _ventas(dias, seccion="Hombre", desde="2025-01-01", venta=1000.0):
+    return ingesta.preparar(pd.DataFrame({
+        "Fecha": pd.date_range(desde, periods=dias, freq="D"),
+        "Secciones": seccion,
+        "Entradas": 100,
+        "Venta": venta,
+        "Tickets": 20,
+        "Artículos": 40,
+        "Ticket promedio": 50.0,
+        "Artículos por ticket": 2.0,
+        "Tasa de conversión": 20.0,
+    }))
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "ventas.db")
+    esquema.migrar(conn)
+    yield conn
+    conn.close()
+
+
+def _sumas(conn, tabla, clave):
+    columnas = ", ".join(f"SUM({c})" for c in resumenes.SUMAS)
+    return conn.execute(f"SELECT {clave}, {columnas} FROM {tabla} GROUP BY {clave} ORDER BY {clave}").fetchall()
+
+
+def _sin_nulos(conn, clave):
+    columnas = ", ".join(f"SUM({c})" for c in resumenes.SUMAS)
+    return conn.execute(
+        f"SELECT {clave}, {columnas} FROM ventas WHERE secciones IS NOT NULL GROUP BY {clave} ORDER BY {clave}"
+    ).fetchall()
+
+
+def test_resumenes_iguales_a_las_filas_tras_el_upsert(conn):
+    ingesta.cargar_filas(conn, pd.concat([_ventas(60, "Hombre"), _ventas(60, "Mujer")]))
+
+    # Se corrigen diez días de una sección y se agregan otros diez
+    ingesta.cargar_filas(conn, _ventas(10, "Hombre", desde="2025-02-20", venta=2500.0))
+    ingesta.cargar_filas(conn, _ventas(10, "Mujer", desde="2025-03-02"))
+
+    assert _sumas(conn, "resumen_diario", "fecha_dia") == _sin_nulos(conn, "fecha_dia")
+    assert _sumas(conn, "resumen_diario", "secciones") == _sin_nulos(conn, "secciones")
+    mensual = _sumas(conn, "resumen_mensual", "mes")
+    assert mensual == _sumas(conn, "resumen_diario", "mes")
+    assert sum(fila[1] for fila in mensual) == 60 * 1000.0 + 60 * 1000.0 + 10 * 1500.0 + 10 * 1000.0
+
+
+def test_reconstruccion_parcial_igual_a_la_completa(conn):
+    ingesta.cargar_filas(conn, pd.concat([_ventas(90, "Hombre"), _ventas(90, "Mujer")]))
+    ingesta.cargar_filas(conn, _ventas(5, "Mujer", desde="2025-01-30", venta=10.0))
+    parcial = [conn.execute(f"SELECT * FROM {t} ORDER BY 1, 2, 3").fetchall() for t in ("resumen_diario", "resumen_mensual")]
+
+    resumenes.reconstruir(conn)
+    completa = [conn.execute(f"SELECT * FROM {t} ORDER BY 1, 2, 3").fetchall() for t in ("resumen_diario", "resumen_mensual")]
+    assert parcial == completa
+
+
+def test_filas_sin_seccion_quedan_fuera_de_los_resumenes(conn):
+    ingesta.cargar_filas(conn, _ventas(10))
+    # Fila antigua cargada antes de exigir la sección
+    conn.execute("INSERT INTO ventas (fecha, venta, anio) VALUES ('2025-01-03', 999.0, 2025)")
+    resumenes.reconstruir(conn)
+
+    assert conn.execute("SELECT COUNT(*) FROM resumen_diario WHERE secciones IS NULL").fetchone()[0] == 0
+    assert conn.execute("SELECT SUM(venta) FROM resumen_mensual").fetchone()[0] == 10 * 1000.0
+
+
+def test_media_reconstruida_desde_suma_y_conteo(conn):
+    df = _ventas(4)
+    df["ticket_promedio"] = [10.0, 20.0, None, 60.0]
+    ingesta.cargar_filas(conn, df)
+    resumen = pd.read_sql_query("SELECT * FROM resumen_diario", conn)
+
+    # Los nulos no cuentan, igual que en la media de las filas originales
+    assert resumenes.media(resumen, "ticket_promedio") == pytest.approx(30.0)
+    agrupado = resumenes.agregar(resumen, "secciones", ["venta", "ticket_promedio"])
+    assert agrupado.loc[0, "ticket_promedio"] == pytest.approx(30.0)
+    assert agrupado.loc[0, "venta"] == 4000.0
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ventas import series
+
+
+def _acumulada(dias):
+    fechas = pd.Series(pd.date_range("2025-01-01", periods=dias, freq="D"))
+    venta = np.full(dias, 100.0)
+    return pd.DataFrame({"fecha": fechas, "venta_acum": venta.cumsum()})
+
+
+@pytest.mark.parametrize("puntos", [3, 10, 500])
+def test_lttb_respeta_el_limite_y_los_extremos(puntos):
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=2000).cumsum()
+    indices = series.lttb(np.arange(2000), y, puntos)
+
+    assert len(indices) == puntos
+    assert indices[0] == 0 and indices[-1] == 1999
+    assert (np.diff(indices) > 0).all()
+
+
+def test_lttb_conserva_los_picos():
+    y = np.zeros(1000)
+    y[137], y[612] = 50.0, -40.0
+    indices = series.lttb(np.arange(1000), y, 20)
+    assert {137, 612} <= set(indices.tolist())
+
+
+def test_lttb_sin_reduccion():
+    assert series.lttb(np.arange(5), np.arange(5), 10).tolist() == [0, 1, 2, 3, 4]
+    assert series.lttb(np.arange(5), np.arange(5), 2).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_reducir_con_fechas():
+    df = _acumulada(365)
+    reducida = series.reducir(df, 50)
+
+    assert len(reducida) == 50
+    assert reducida.iloc[0]["fecha"] == df.iloc[0]["fecha"]
+    assert reducida.iloc[-1]["venta_acum"] == df.iloc[-1]["venta_acum"]
+    assert series.reducir(df, None) is df
+    assert series.reducir(df, 365) is df
+
+
+def test_curva_presupuesto_reparte_el_total_en_los_dias_del_rango():
+    fechas = pd.Series(pd.date_range("2025-01-01", periods=31, freq="D"))
+    curva = series.curva_presupuesto(fechas, 3100.0)
+
+    assert curva["venta_acum"].iloc[0] == pytest.approx(100.0)
+    assert curva["venta_acum"].iloc[-1] == pytest.approx(3100.0)
+    assert series.curva_presupuesto(fechas.iloc[:0], 3100.0).empty
+
+
+def test_acumulada_y_ritmo_final():
+    df = pd.DataFrame({
+        "fecha": pd.to_datetime(["2025-01-02", "2025-01-01", "2025-01-01"]),
+        "venta": [30.0, 10.0, 20.0],
+    })
+    acumulada = series.acumulada(df)
+
+    assert acumulada["venta_acum"].tolist() == [30.0, 60.0]
+    assert series.ritmo_final(acumulada, 10) == pytest.approx(300.0)
+    assert series.ritmo_final(acumulada.iloc[:0], 10) == 0.0
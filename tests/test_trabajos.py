@@ -0,0 +1,58 @@
+import os
+import sqlite3
+import time
+
+import pytest
+
+from tests.test_ingesta import _excel, _en_hilo
+from ventas import conexion, esquema, ingesta, trabajos
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "ventas.db", check_same_thread=False)
+    esquema.migrar(conn)
+    yield conn
+    conn.close()
+
+
+def test_error_del_escritor_marca_el_trabajo_fallido(conn, tmp_path, monkeypatch):
+    def escribir_con_fallo(conn, lote):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(ingesta, "escribir_lote", escribir_con_fallo)
+    trabajos.encolar(conn, [("a.xlsx", _excel(200, "Hombre")), ("b.xlsx", _excel(200, "Mujer"))], tmp_path)
+    trabajo_id, ruta, archivos = trabajos.tomar(conn)
+
+    _en_hilo(lambda: trabajos.ejecutar(conn, trabajo_id, ruta, archivos, procesos=2))
+
+    trabajo, = trabajos.listar(conn)
+    assert trabajo["estado"] == "fallido"
+    assert "database is locked" in trabajo["error"]
+    assert not os.path.exists(ruta)
+    assert not trabajos.hay_activos(conn)
+
+
+def test_al_terminar_falla_sin_cambiar_el_estado_del_trabajo(tmp_path):
+    pool = conexion.PoolConexiones(str(tmp_path / "ventas.db"))
+    with pool.conexion() as conn:
+        esquema.migrar(conn)
+        trabajos.encolar(conn, [("a.xlsx", _excel(5, "Hombre"))], tmp_path)
+
+    llamadas = []
+
+    def al_terminar(conn):
+        llamadas.append(conn.execute("SELECT COUNT(*) FROM ventas").fetchone()[0])
+        raise OSError("disco lleno")
+
+    trabajador = trabajos.Trabajador(pool, intervalo=0.1, procesos=1, al_terminar=al_terminar).iniciar()
+    limite = time.monotonic() + 30
+    while not llamadas and time.monotonic() < limite:
+        time.sleep(0.05)
+    trabajador.detener()
+
+    with pool.conexion() as conn:
+        trabajo, = trabajos.listar(conn)
+    pool.cerrar()
+    assert llamadas == [5]
+    assert trabajo["estado"] == "terminado"
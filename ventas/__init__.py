@@ -0,0 +1 @@
+"""Lógica de datos del comparador de ventas diarias (sin dependencias de Streamlit)."""
@@ -0,0 +1,192 @@
+"""Almacenes de lectura de ventas: SQLite directo o réplica Parquet por año"""
+import os
+import threading
+
+import pandas as pd
+
+from ventas import consultas, esquema
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # dependencia opcional, solo para el almacén Parquet
+    pa = pq = None
+
+# Filas por grupo: las estadísticas por grupo permiten saltar rangos de fechas
+FILAS_POR_GRUPO = 64 * 1024
+
+
+def _esquema_parquet():
+    """Tipos fijos por columna, para que todos los años se lean igual"""
+    return pa.schema([
+        ("id", pa.int64()),
+        ("fecha", pa.timestamp("us")),
+        ("secciones", pa.string()),
+        ("entradas", pa.int64()),
+        ("venta", pa.float64()),
+        ("tickets", pa.int64()),
+        ("articulos", pa.int64()),
+        ("ticket_promedio", pa.float64()),
+        ("articulos_por_ticket", pa.float64()),
+        ("tasa_conversion", pa.float64()),
+        ("anio", pa.int64()),
+        ("fecha_dia", pa.int64()),
+    ])
+
+
+def _vacio(columnas):
+    """Resultado sin filas con los mismos tipos que devuelve la ruta SQLite"""
+    df = pd.DataFrame(columns=columnas)
+    if "fecha" in df.columns:
+        df["fecha"] = pd.to_datetime(df["fecha"])
+    return df
+
+
+class AlmacenSQLite:
+    """Lee directamente de la tabla ventas"""
+
+    nombre = "sqlite"
+
+    def cargar_ventas(self, conn, anio=None, fecha_inicio=None, fecha_fin=None, secciones=None, columnas=None):
+        return consultas.cargar_ventas(conn, anio, fecha_inicio, fecha_fin, secciones, columnas)
+
+
+class AlmacenParquet:
+    """Réplica de solo lectura con un archivo Parquet por año
+
+    SQLite sigue siendo la fuente de verdad. La réplica se pone al día con
+    sincronizar(), desde quien escribe; la lectura no escribe nada: si algún
+    año pedido tiene cambios sin exportar (anios_modificados) o le falta el
+    archivo, esa consulta se lee de SQLite.
+    """
+
+    nombre = "parquet"
+
+    def __init__(self, directorio):
+        if pq is None:
+            raise ImportError("El almacén Parquet requiere pyarrow")
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+        self._lock = threading.Lock()
+        self._version = None
+
+    def _ruta(self, anio):
+        return os.path.join(self.directorio, f"ventas_{int(anio)}.parquet")
+
+    def anios(self):
+        """Años exportados en disco, en orden ascendente"""
+        anios = []
+        for nombre in os.listdir(self.directorio):
+            base, extension = os.path.splitext(nombre)
+            if extension == ".parquet" and base.startswith("ventas_"):
+                anios.append(int(base[len("ventas_"):]))
+        return sorted(anios)
+
+    def _exportar(self, conn, anio):
+        """Reescribe el archivo de un año (o lo borra si ya no tiene filas)
+
+        Un lector que ya listó el año y no encuentra el archivo lo lee de SQLite.
+        """
+        ruta = self._ruta(anio)
+        df = consultas.cargar_ventas(conn, anio=anio, columnas=consultas.COLUMNAS_VENTAS + ["fecha_dia"])
+        if df.empty:
+            if os.path.exists(ruta):
+                os.remove(ruta)
+            return
+
+        # Escritura a un temporal y reemplazo atómico: un lector nunca ve un archivo a medias
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        tabla = pa.Table.from_pandas(df, schema=_esquema_parquet(), preserve_index=False)
+        pq.write_table(tabla, temporal, row_group_size=FILAS_POR_GRUPO)
+        os.replace(temporal, ruta)
+
+    def sincronizar(self, conn):
+        """Pone al día los archivos con la base; devuelve los años reexportados
+
+        Se llama después de escribir, no al leer. Exporta dentro de una
+        transacción de escritura (BEGIN IMMEDIATE): dos procesos no exportan a
+        la vez, y nadie puede dejar un archivo más antiguo sobre uno más nuevo.
+        Las marcas se borran en esa misma transacción.
+        """
+        with self._lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                pendientes = [
+                    anio for (anio,) in conn.execute("SELECT anio FROM anios_modificados ORDER BY anio")
+                ]
+                for anio in pendientes:
+                    self._exportar(conn, anio)
+                conn.execute("DELETE FROM anios_modificados")
+
+                # Recrear la tabla no dispara triggers: al cambiar la versión se
+                # eliminan los archivos de años que ya no existen
+                version = esquema.version_datos(conn)
+                if version != self._version:
+                    existentes = set(consultas.anios_disponibles(conn))
+                    for anio in self.anios():
+                        if anio not in existentes:
+                            os.remove(self._ruta(anio))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._version = version
+
+        return pendientes
+
+    def cargar_ventas(self, conn, anio=None, fecha_inicio=None, fecha_fin=None, secciones=None, columnas=None):
+        """Mismo resultado que consultas.cargar_ventas leyendo solo las columnas pedidas"""
+        columnas = list(columnas) if columnas is not None else consultas.COLUMNAS_VENTAS
+
+        anios = consultas._como_lista(anio)
+        lista_secciones = consultas._como_lista(secciones)
+
+        # Réplica atrasada en algún año pedido: se responde desde la fuente
+        pendientes = {a for (a,) in conn.execute("SELECT anio FROM anios_modificados")}
+        if anios is not None:
+            pendientes &= {int(a) for a in anios}
+        if pendientes:
+            return consultas.cargar_ventas(conn, anio, fecha_inicio, fecha_fin, secciones, columnas)
+
+        disponibles = self.anios()
+        anios = disponibles if anios is None else sorted(set(int(a) for a in anios) & set(disponibles))
+
+        filtros = []
+        if fecha_inicio is not None:
+            filtros.append(("fecha_dia", ">=", esquema.dia_desde_fecha(fecha_inicio)))
+        if fecha_fin is not None:
+            filtros.append(("fecha_dia", "<=", esquema.dia_desde_fecha(fecha_fin)))
+        if lista_secciones is not None:
+            filtros.append(("secciones", "in", [str(s) for s in lista_secciones]))
+
+        if not anios or (lista_secciones is not None and not lista_secciones):
+            return _vacio(columnas)
+
+        # Cada archivo ya está ordenado por fecha: leerlos por año conserva el orden
+        try:
+            tablas = [
+                pq.read_table(self._ruta(a), columns=columnas, filters=filtros or None, memory_map=True)
+                for a in anios
+            ]
+        except FileNotFoundError:
+            # Otro proceso borró el año al sincronizar mientras se leía
+            return consultas.cargar_ventas(conn, anio, fecha_inicio, fecha_fin, secciones, columnas)
+        tabla = pa.concat_tables(tablas)
+        if tabla.num_rows == 0:
+            return _vacio(columnas)
+        return tabla.to_pandas()
+
+
+ALMACENES = {
+    AlmacenSQLite.nombre: AlmacenSQLite,
+    AlmacenParquet.nombre: AlmacenParquet,
+}
+
+
+def crear(tipo="sqlite", directorio=None):
+    """Instancia el almacén configurado ("sqlite" o "parquet")"""
+    if tipo not in ALMACENES:
+        raise ValueError(f"Almacén desconocido: {tipo} (opciones: {', '.join(ALMACENES)})")
+    if tipo == AlmacenParquet.nombre:
+        return AlmacenParquet(directorio)
+    return AlmacenSQLite()
@@ -0,0 +1,70 @@
+"""Cálculos de la comparación entre años sobre DataFrames ya cargados, sin Streamlit
+
+Períodos equivalentes y tablas de cada gráfico a partir de los resúmenes por
+año, mes y sección. La página solo dibuja lo que devuelven estas funciones.
+"""
+import pandas as pd
+
+from ventas import resumenes
+
+MESES = {
+    1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril", 5: "Mayo", 6: "Junio",
+    7: "Julio", 8: "Agosto", 9: "Septiembre", 10: "Octubre", 11: "Noviembre", 12: "Diciembre",
+}
+
+
+def _mismo_dia(fecha, anio):
+    try:
+        return fecha.replace(year=anio), False
+    except ValueError:
+        # 29 de febrero en un año no bisiesto
+        return fecha.replace(year=anio, day=28), True
+
+
+def periodo_equivalente(fecha_inicio, fecha_fin, anio):
+    """(inicio, fin, ajustado) del mismo período en `anio`; ajustado si algún 29/02 pasó al 28/02"""
+    inicio, ajuste_inicio = _mismo_dia(fecha_inicio, anio)
+    fin, ajuste_fin = _mismo_dia(fecha_fin, anio)
+    return inicio, fin, ajuste_inicio or ajuste_fin
+
+
+def tabla_graficos(resumen_base, resumen_comparar):
+    """Resúmenes de ambos años juntos, con el año como texto y el nombre del mes"""
+    df_plot = pd.concat([resumen_base, resumen_comparar], ignore_index=True)
+    df_plot["año_str"] = df_plot["anio"].astype(str)
+    df_plot["mes_nombre"] = df_plot["mes"].map(MESES)
+    return df_plot
+
+
+def ventas_mensuales(df_plot):
+    """Venta por mes y año, en orden de mes"""
+    return df_plot.groupby(["mes", "mes_nombre", "anio"])["venta"].sum().reset_index().sort_values("mes")
+
+
+def ventas_por_seccion(df_plot):
+    """Venta por sección y año"""
+    return df_plot.groupby(["secciones", "anio"])["venta"].sum().reset_index()
+
+
+def eficiencia(df_plot):
+    """Tickets, entradas, ticket promedio, tasa de conversión y venta por año"""
+    return resumenes.agregar(
+        df_plot, "anio", ["tickets", "entradas", "ticket_promedio", "tasa_conversion", "venta"]
+    )
+
+
+def mapa_calor(df_plot, anio):
+    """Venta por sección (filas) y mes (columnas, en orden de calendario) de un año"""
+    pivot = df_plot[df_plot["anio"] == anio].pivot_table(
+        values="venta",
+        index="secciones",
+        columns="mes_nombre",
+        aggfunc="sum",
+        fill_value=0
+    )
+    return pivot[[mes for mes in MESES.values() if mes in pivot.columns]]
+
+
+def ticket_mensual(df_plot):
+    """Ticket promedio por mes y año, en orden de mes"""
+    return resumenes.agregar(df_plot, ["mes", "mes_nombre", "anio"], ["ticket_promedio"]).sort_values("mes")
@@ -0,0 +1,366 @@
+"""API HTTP/JSON de solo lectura con los KPI, el presupuesto y la proyección de la página
+
+Uso:
+    uvicorn ventas.api:app --host 0.0.0.0 --port 8000
+
+Lee la misma base que la página (VENTAS_DB, por defecto data/ventas.db) con el
+almacén configurado en VENTAS_ALMACEN. SQLite es un archivo local: la API tiene
+que correr junto a la página (misma máquina, contenedor o volumen compartido);
+en un servidor aparte abriría una base vacía. Cada respuesta lleva un ETag que depende
+de la versión de datos y de los parámetros: mientras nadie escriba, un cliente
+que repite la consulta con If-None-Match recibe 304 sin que se calcule nada, y
+cualquier otro cliente recibe el JSON guardado en memoria.
+
+Rutas (fechas en formato AAAA-MM-DD):
+    GET /salud
+    GET /catalogo
+    GET /kpis?anio_base=&anio_comparar=&desde=&hasta=&secciones=&crecimiento=15
+    GET /proyeccion?fecha=&ambicion=15&dias=90
+"""
+import json
+import math
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from datetime import date, timedelta
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from ventas import (
+    almacen, analisis, cache, comparables, conexion, consultas, esquema, indice, kpis, proyecciones,
+)
+
+DB_PATH = os.environ.get("VENTAS_DB", os.path.join("data", "ventas.db"))
+ALMACEN = os.environ.get("VENTAS_ALMACEN", "sqlite")
+
+# Cuerpos JSON ya serializados que se conservan en memoria por ETag (LRU)
+MAX_RESPUESTAS = 256
+
+# Mismos valores por defecto que los controles de la página
+CRECIMIENTO_PRESUPUESTO = 15
+AMBICION_EXTRA = 15
+DIAS_PROYECCION = 90
+
+
+class ErrorParametro(ValueError):
+    """Parámetro de consulta ausente o con formato inválido (responde 400)"""
+
+
+# ---------- Parámetros ----------
+
+def _fecha(request, nombre, defecto=None):
+    valor = request.query_params.get(nombre)
+    if not valor:
+        return defecto
+    try:
+        return pd.Timestamp(date.fromisoformat(valor))
+    except ValueError:
+        raise ErrorParametro(f"'{nombre}' debe ser una fecha AAAA-MM-DD") from None
+
+
+def _numero(request, nombre, defecto, tipo=int, minimo=None, maximo=None):
+    valor = request.query_params.get(nombre)
+    if valor is None or valor == "":
+        return defecto
+    try:
+        numero = tipo(valor)
+    except ValueError:
+        raise ErrorParametro(f"'{nombre}' debe ser numérico") from None
+    if (minimo is not None and numero < minimo) or (maximo is not None and numero > maximo):
+        raise ErrorParametro(f"'{nombre}' debe estar entre {minimo} y {maximo}")
+    return numero
+
+
+def _secciones(request, disponibles):
+    """Secciones pedidas (`?secciones=A&secciones=B` o `?secciones=A,B`); todas si no se indica"""
+    valores = [s for valor in request.query_params.getlist("secciones") for s in valor.split(",") if s]
+    return sorted(set(valores)) if valores else list(disponibles)
+
+
+# ---------- Cálculos (en hilos del pool: leen SQLite y pandas) ----------
+
+def _limpio(valor):
+    """Valor apto para JSON: NaN pasa a null y los tipos de numpy a Python"""
+    if valor is None:
+        return None
+    if hasattr(valor, "item"):
+        valor = valor.item()
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    return valor
+
+
+def _kpis_dict(indicadores):
+    datos = asdict(indicadores)
+    datos["ticket_promedio"] = indicadores.ticket_promedio
+    datos["promedio_diario"] = indicadores.promedio_diario
+    return {clave: _limpio(valor) for clave, valor in datos.items()}
+
+
+def _dia_iso(fecha):
+    return None if fecha is None else pd.Timestamp(fecha).date().isoformat()
+
+
+def calcular_catalogo(conn):
+    cat = consultas.catalogo(conn)
+    return {
+        "anios": cat["anios"],
+        "secciones": cat["secciones"],
+        "rango": [_dia_iso(f) for f in cat["rango"]],
+        "rango_anio": {str(a): [_dia_iso(f) for f in r] for a, r in cat["rango_anio"].items()},
+    }
+
+
+def calcular_kpis(conn, tienda, anio_base, anio_comparar, desde, hasta, secciones, crecimiento):
+    """KPI de ambos años en el período común, como la página sin filtros independientes"""
+    inicio_base, fin_base, ajustado = analisis.periodo_equivalente(desde, hasta, anio_base)
+    kpis_base = kpis.calcular(tienda.cargar_ventas(conn, anio_base, inicio_base, fin_base, secciones, kpis.COLUMNAS))
+    kpis_comp = kpis.calcular(tienda.cargar_ventas(conn, anio_comparar, desde, hasta, secciones, kpis.COLUMNAS))
+
+    objetivo = kpis.presupuesto(kpis_base.venta, crecimiento)
+    return {
+        "anio_base": anio_base,
+        "anio_comparar": anio_comparar,
+        "periodo_base": [_dia_iso(inicio_base), _dia_iso(fin_base)],
+        "periodo_comparar": [_dia_iso(desde), _dia_iso(hasta)],
+        "ajuste_bisiesto": ajustado,
+        "secciones": secciones,
+        "base": _kpis_dict(kpis_base),
+        "comparar": _kpis_dict(kpis_comp),
+        "variacion": {
+            "venta": _limpio(kpis.variacion(kpis_comp.venta, kpis_base.venta)),
+            "entradas": _limpio(kpis.variacion(kpis_comp.entradas, kpis_base.entradas)),
+            "ticket_promedio": _limpio(kpis.variacion(kpis_comp.ticket_promedio, kpis_base.ticket_promedio)),
+            # Puntos porcentuales, como la tarjeta de la página
+            "tasa_conversion_pp": _limpio(kpis_comp.tasa_conversion - kpis_base.tasa_conversion),
+        },
+        "presupuesto": {
+            "crecimiento": crecimiento,
+            "presupuesto": objetivo,
+            "cumplimiento_presupuesto": kpis.cumplimiento(kpis_comp.venta, objetivo),
+        },
+    }
+
+
+def calcular_proyeccion(conn, tienda, fecha, ambicion, dias, hoy):
+    """Proyección del día y del rango, y totales del año, como la sección de proyección"""
+    anio_objetivo = fecha.year
+    anio_anterior = anio_objetivo - 1
+    fin = fecha + pd.Timedelta(days=dias - 1)
+
+    # Una sola lectura (ordenada por año y fecha) sirve al historial y a los acumulados
+    df = tienda.cargar_ventas(conn, list(range(anio_anterior, fin.year + 1)), columnas=["anio", "fecha", "venta"])
+    historial = proyecciones.historial(df)
+    df_proyeccion = proyecciones.proyectar(historial, comparables.del_anio_anterior(conn, fecha, fin), ambicion)
+    dia = df_proyeccion.iloc[0]
+
+    resultado = {
+        "fecha": _dia_iso(fecha),
+        "ambicion": ambicion,
+        "dias": dias,
+        "venta_comparable": _limpio(dia["venta_comparable"]),
+        "fecha_comparable": _dia_iso(dia["fecha_comparable"]),
+        "crecimiento": _limpio(dia["crecimiento"]),
+        "proyeccion_estimada": _limpio(dia["proyeccion"]),
+        "meta_sugerida": _limpio(dia["meta"]),
+        "escenarios": {
+            "conservador": _limpio(dia["conservador"]),
+            "realista": _limpio(dia["proyeccion"]),
+            "agresivo": _limpio(dia["agresivo"]),
+        },
+        "rango": {
+            "proyeccion": _limpio(df_proyeccion["proyeccion"].sum()),
+            "meta": _limpio(df_proyeccion["meta"].sum()),
+            "dias_con_comparable": int(df_proyeccion["venta_comparable"].notna().sum()),
+        },
+        "por_dia": [
+            {
+                "fecha": _dia_iso(fila.fecha),
+                "venta_comparable": _limpio(fila.venta_comparable),
+                "crecimiento": _limpio(fila.crecimiento),
+                "conservador": _limpio(fila.conservador),
+                "proyeccion": _limpio(fila.proyeccion),
+                "agresivo": _limpio(fila.agresivo),
+                "meta": _limpio(fila.meta),
+            }
+            for fila in df_proyeccion.itertuples(index=False)
+        ],
+        "totales": None,
+    }
+
+    # Sin venta comparable la página no muestra totales; aquí quedan en null
+    if pd.notna(dia["venta_comparable"]):
+        total_anterior = proyecciones.crecimiento_anual(historial, [anio_objetivo])["total_anterior"].iloc[0]
+        totales = proyecciones.totales_anuales(
+            indice.IndiceFechas(df), fecha, total_anterior, dia["crecimiento"], hoy
+        )
+        resultado["totales"] = {
+            "limite_anterior": _dia_iso(totales.limite_anterior),
+            "hoy": _dia_iso(totales.hoy),
+            "acumulado_anterior": totales.acumulado_anterior,
+            "acumulado_actual": totales.acumulado_actual,
+            "proyeccion_anual": totales.proyeccion_anual,
+            "presupuesto_anual": totales.presupuesto_anual,
+            "cumplimiento_presupuesto": totales.cumplimiento,
+            "progreso": totales.progreso,
+        }
+    return resultado
+
+
+# ---------- HTTP ----------
+
+def _leer_version(app):
+    with app.state.pool.conexion() as conn:
+        return esquema.version_datos(conn)
+
+
+def _calcular(app, funcion, *args):
+    with app.state.pool.conexion() as conn:
+        return funcion(conn, *args)
+
+
+def _serializar(datos):
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _coincide(request, etag):
+    pedidos = request.headers.get("if-none-match", "")
+    return pedidos.strip() == "*" or etag in [e.strip() for e in pedidos.split(",")]
+
+
+async def _responder(request, nombre, version, parametros, construir):
+    """Respuesta con ETag de (ruta, versión de datos, parámetros); 304 si el cliente ya la tiene
+
+    `construir(app)` devuelve el dict a servir y solo se llama si el JSON no está en caché.
+    """
+    etag = f'"{cache.huella(nombre, version, parametros)}"'
+    cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _coincide(request, etag):
+        return Response(status_code=304, headers=cabeceras)
+
+    app = request.app
+    cuerpo = await run_in_threadpool(
+        app.state.respuestas.obtener, etag, lambda: _serializar(construir(app))
+    )
+    return Response(cuerpo, media_type="application/json", headers=cabeceras)
+
+
+def _error(estado, mensaje):
+    return JSONResponse({"error": mensaje}, status_code=estado)
+
+
+def _manejar_errores(funcion):
+    async def envoltura(request):
+        try:
+            return await funcion(request)
+        except ErrorParametro as e:
+            return _error(400, str(e))
+        except sqlite3.Error as e:
+            return _error(503, f"Error al leer la base: {e}")
+    return envoltura
+
+
+async def _catalogo_actual(request):
+    """(versión, catálogo) sirviéndose de la caché de respuestas"""
+    version = await run_in_threadpool(_leer_version, request.app)
+    cuerpo = await run_in_threadpool(
+        request.app.state.respuestas.obtener,
+        f'"{cache.huella("catalogo", version, ())}"',
+        lambda: _serializar(_calcular(request.app, calcular_catalogo)),
+    )
+    return version, json.loads(cuerpo)
+
+
+@_manejar_errores
+async def salud(request):
+    version = await run_in_threadpool(_leer_version, request.app)
+    return JSONResponse({"estado": "ok", "version_datos": version})
+
+
+@_manejar_errores
+async def catalogo(request):
+    version = await run_in_threadpool(_leer_version, request.app)
+    return await _responder(
+        request, "catalogo", version, (), lambda app: _calcular(app, calcular_catalogo)
+    )
+
+
+@_manejar_errores
+async def kpis_periodo(request):
+    version, cat = await _catalogo_actual(request)
+    if not cat["anios"]:
+        return _error(404, "Aún no hay datos cargados")
+
+    # Por defecto, los mismos valores que la barra lateral al abrir la página
+    anios = cat["anios"]
+    anio_base = _numero(request, "anio_base", anios[min(1, len(anios) - 1)])
+    anio_comparar = _numero(request, "anio_comparar", anios[0])
+    for nombre, anio in (("anio_base", anio_base), ("anio_comparar", anio_comparar)):
+        if anio not in anios:
+            raise ErrorParametro(f"'{nombre}' debe ser un año con datos ({', '.join(map(str, anios))})")
+    desde = _fecha(request, "desde", pd.Timestamp(cat["rango"][0]))
+    hasta = _fecha(request, "hasta", pd.Timestamp(cat["rango"][1]))
+    if desde > hasta:
+        raise ErrorParametro("'desde' debe ser menor o igual a 'hasta'")
+    secciones = _secciones(request, cat["secciones"])
+    crecimiento = _numero(request, "crecimiento", CRECIMIENTO_PRESUPUESTO, float, 0, 1000)
+
+    parametros = (anio_base, anio_comparar, desde, hasta, tuple(secciones), crecimiento)
+    return await _responder(
+        request, "kpis", version, parametros,
+        lambda app: _calcular(
+            app, calcular_kpis, app.state.tienda, anio_base, anio_comparar, desde, hasta, secciones, crecimiento
+        ),
+    )
+
+
+@_manejar_errores
+async def proyeccion(request):
+    fecha = _fecha(request, "fecha", pd.Timestamp(date.today() + timedelta(days=1)))
+    ambicion = _numero(request, "ambicion", AMBICION_EXTRA, float, 0, 100)
+    dias = _numero(request, "dias", DIAS_PROYECCION, int, 1, 366)
+    # Los acumulados llegan hasta hoy: la respuesta también cambia de un día a otro
+    hoy = pd.Timestamp(date.today())
+
+    version = await run_in_threadpool(_leer_version, request.app)
+    parametros = (fecha, ambicion, dias, hoy)
+    return await _responder(
+        request, "proyeccion", version, parametros,
+        lambda app: _calcular(app, calcular_proyeccion, app.state.tienda, *parametros),
+    )
+
+
+@asynccontextmanager
+async def _ciclo_de_vida(app):
+    """Pool, almacén y caché del proceso; la base se migra una vez al arrancar"""
+    directorio = os.path.dirname(DB_PATH) or "."
+    os.makedirs(directorio, exist_ok=True)
+    app.state.pool = conexion.PoolConexiones(DB_PATH)
+    app.state.tienda = almacen.crear(ALMACEN, os.path.join(directorio, "parquet"))
+    app.state.respuestas = cache.CacheLRU(MAX_RESPUESTAS)
+    with app.state.pool.conexion() as conn:
+        esquema.migrar(conn)
+        # La API no escribe: la réplica se pone al día al arrancar y después la
+        # mantiene quien carga datos; los años atrasados se leen de SQLite
+        if hasattr(app.state.tienda, "sincronizar"):
+            app.state.tienda.sincronizar(conn)
+    try:
+        yield
+    finally:
+        app.state.pool.cerrar()
+
+
+app = Starlette(
+    routes=[
+        Route("/salud", salud),
+        Route("/catalogo", catalogo),
+        Route("/kpis", kpis_periodo),
+        Route("/proyeccion", proyeccion),
+    ],
+    lifespan=_ciclo_de_vida,
+)
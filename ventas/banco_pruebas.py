@@ -0,0 +1,271 @@
+"""Banco de pruebas de rendimiento sobre ventas sintéticas
+
+Uso:
+    python -m ventas.banco_pruebas --escalas 10k 1m 10m --salida resultados.json
+    python -m ventas.banco_pruebas --escalas 10k --comparar resultados.json
+
+Cada escala se genera una vez en `--directorio` (se reutiliza mientras no
+cambien sus parámetros) y se miden los mismos pasos que hace la página en una
+ejecución: carga, filtros, KPIs, agregaciones de cada gráfico y proyección.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from ventas import (
+    almacen, analisis, comparables, conexion, consultas, esquema, indice, kpis,
+    proyecciones, series, sintetico,
+)
+
+# Filas objetivo de cada escala (años completos × secciones × tiendas)
+ESCALAS = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+ANIOS = [2023, 2024, 2025]
+SECCIONES = 10
+SEMILLA = 0
+
+
+def _medir(funcion, repeticiones):
+    """(resultado, tiempos en ms) de llamar `funcion` `repeticiones` veces"""
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return resultado, tiempos
+
+
+def _parametros(escala):
+    return {
+        "anios": ANIOS,
+        "secciones": SECCIONES,
+        "tiendas": sintetico.tiendas_para(ESCALAS[escala], ANIOS, SECCIONES),
+        "semilla": SEMILLA,
+    }
+
+
+def preparar_base(directorio, escala, regenerar=False):
+    """Ruta de la base de la escala; la genera si falta o cambiaron sus parámetros
+
+    Los parámetros se guardan junto a la base en banco_<escala>.json, escrito
+    solo al terminar de generarla: una base a medias no se reutiliza.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, f"banco_{escala}.db")
+    ruta_parametros = os.path.join(directorio, f"banco_{escala}.json")
+    parametros = _parametros(escala)
+    firma = json.dumps(parametros, sort_keys=True)
+
+    if os.path.exists(ruta) and os.path.exists(ruta_parametros) and not regenerar:
+        with open(ruta_parametros, encoding="utf-8") as f:
+            if f.read() == firma:
+                return ruta
+
+    for archivo in (ruta_parametros, ruta, ruta + "-wal", ruta + "-shm"):
+        if os.path.exists(archivo):
+            os.remove(archivo)
+
+    total = sintetico.filas_estimadas(parametros["anios"], parametros["secciones"], parametros["tiendas"])
+    print(f"Generando {escala}: {total:,} filas en {ruta}", file=sys.stderr)
+    pool = conexion.PoolConexiones(ruta, tamano=1)
+    with pool.conexion() as conn:
+        esquema.migrar(conn)
+        sintetico.poblar(conn, **parametros)
+    pool.cerrar()
+    with open(ruta_parametros, "w", encoding="utf-8") as f:
+        f.write(firma)
+    return ruta
+
+
+def pasos(conn, tienda, anio_base, anio_comparar, fecha_inicio, fecha_fin, dias_proyeccion=90):
+    """Pasos medidos en el orden de la página: [(nombre, funcion)]
+
+    Cada paso usa el resultado del anterior, como en una ejecución real.
+    """
+    estado = {}
+    catalogo = consultas.secciones_disponibles(conn)
+    # Mismas columnas que lee la página
+    columnas = ["anio", "secciones"] + kpis.COLUMNAS
+    inicio_base = pd.Timestamp(fecha_inicio.replace(year=anio_base))
+    fin_base = pd.Timestamp(fecha_fin.replace(year=anio_base))
+    inicio_comp = pd.Timestamp(fecha_inicio.replace(year=anio_comparar))
+    fin_comp = pd.Timestamp(fecha_fin.replace(year=anio_comparar))
+
+    def cargar_datos():
+        for clave, anio in (("indice_base", anio_base), ("indice_comp", anio_comparar)):
+            estado[clave] = indice.cargar(tienda, conn, anio, categorias=catalogo, columnas=columnas)
+        return len(estado["indice_base"].df) + len(estado["indice_comp"].df)
+
+    def filtros():
+        estado["datos_base"] = estado["indice_base"].rango(anio_base, inicio_base, fin_base)
+        estado["datos_comp"] = estado["indice_comp"].rango(anio_comparar, inicio_comp, fin_comp)
+        return len(estado["datos_base"]) + len(estado["datos_comp"])
+
+    def resumen():
+        estado["resumen_base"] = consultas.cargar_resumen(conn, anio_base, inicio_base, fin_base)
+        estado["resumen_comp"] = consultas.cargar_resumen(conn, anio_comparar, inicio_comp, fin_comp)
+        estado["df_plot"] = analisis.tabla_graficos(estado["resumen_base"], estado["resumen_comp"])
+        return len(estado["df_plot"])
+
+    def kpis_periodo():
+        estado["kpis_base"] = kpis.calcular(estado["datos_base"])
+        estado["kpis_comp"] = kpis.calcular(estado["datos_comp"])
+        return estado["kpis_base"].filas + estado["kpis_comp"].filas
+
+    def grafico_mensual():
+        return len(analisis.ventas_mensuales(estado["df_plot"]))
+
+    def grafico_secciones():
+        return len(analisis.ventas_por_seccion(estado["df_plot"]))
+
+    def grafico_eficiencia():
+        return len(analisis.eficiencia(estado["df_plot"]))
+
+    def grafico_heatmap():
+        return analisis.mapa_calor(estado["df_plot"], anio_base).size
+
+    def grafico_ticket():
+        return len(analisis.ticket_mensual(estado["df_plot"]))
+
+    def grafico_evolucion():
+        curvas = []
+        for datos, total in ((estado["datos_base"], estado["kpis_base"].venta), (estado["datos_comp"], estado["kpis_comp"].venta)):
+            acumulada = series.acumulada(datos)
+            curvas += [acumulada, series.curva_presupuesto(acumulada["fecha"], total)]
+        return sum(len(series.reducir(curva, 500)) for curva in curvas)
+
+    def proyeccion():
+        # En la página el historial se cachea por versión de datos; aquí se mide entero
+        anio_objetivo = anio_comparar + 1
+        desde = pd.Timestamp(date(anio_objetivo, 1, 1))
+        hasta = desde + pd.Timedelta(days=dias_proyeccion - 1)
+        datos = tienda.cargar_ventas(conn, [anio_comparar, anio_objetivo], columnas=["anio", "fecha", "venta"])
+        historial = proyecciones.historial(datos)
+        return len(proyecciones.proyectar(historial, comparables.del_anio_anterior(conn, desde, hasta)))
+
+    def proyeccion_lookup():
+        anio_objetivo = anio_comparar + 1
+        desde = pd.Timestamp(date(anio_objetivo, 1, 1))
+        hasta = desde + pd.Timedelta(days=dias_proyeccion - 1)
+        return len(comparables.del_anio_anterior(conn, desde, hasta))
+
+    return [
+        ("cargar_datos", cargar_datos),
+        ("filtros", filtros),
+        ("resumen", resumen),
+        ("kpis", kpis_periodo),
+        ("grafico.mensual", grafico_mensual),
+        ("grafico.secciones", grafico_secciones),
+        ("grafico.eficiencia", grafico_eficiencia),
+        ("grafico.heatmap", grafico_heatmap),
+        ("grafico.ticket", grafico_ticket),
+        ("grafico.evolucion", grafico_evolucion),
+        ("proyeccion.lookup", proyeccion_lookup),
+        ("proyeccion", proyeccion),
+    ]
+
+
+def medir_escala(ruta, escala, tipo_almacen="sqlite", repeticiones=5):
+    """Filas de resultado (una por paso) de una escala y un almacén"""
+    pool = conexion.PoolConexiones(ruta, tamano=1)
+    tienda = almacen.crear(tipo_almacen, os.path.join(os.path.dirname(ruta), f"parquet_{escala}"))
+    resultados = []
+    try:
+        with pool.conexion() as conn:
+            if hasattr(tienda, "sincronizar"):
+                tienda.sincronizar(conn)
+            total = conn.execute("SELECT COUNT(*) FROM ventas").fetchone()[0]
+            anios = consultas.anios_disponibles(conn)
+            # anios_disponibles va del más reciente al más antiguo: se compara el
+            # último año con el anterior y se proyecta el siguiente, como en la página
+            anio_comparar, anio_base = anios[0], anios[1]
+            # Primer semestre: un período parcial, como el uso habitual de la página
+            for nombre, funcion in pasos(conn, tienda, anio_base, anio_comparar, date(2000, 1, 1), date(2000, 6, 30)):
+                filas, tiempos = _medir(funcion, repeticiones)
+                resultados.append({
+                    "escala": escala,
+                    "filas": total,
+                    "almacen": tipo_almacen,
+                    "paso": nombre,
+                    "repeticiones": repeticiones,
+                    "min_ms": round(min(tiempos), 3),
+                    "mediana_ms": round(statistics.median(tiempos), 3),
+                    "media_ms": round(statistics.fmean(tiempos), 3),
+                    "filas_resultado": int(filas),
+                })
+    finally:
+        pool.cerrar()
+    return resultados
+
+
+def entorno():
+    """Versiones y máquina, para saber si dos resultados son comparables"""
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "procesadores": os.cpu_count(),
+    }
+
+
+def comparar(anterior, actual):
+    """Líneas de texto con la variación de la mediana por (escala, almacén, paso)"""
+    clave = lambda fila: (fila["escala"], fila["almacen"], fila["paso"])
+    previos = {clave(fila): fila for fila in anterior["resultados"]}
+    lineas = []
+    for fila in actual["resultados"]:
+        previa = previos.get(clave(fila))
+        if previa is None or not previa["mediana_ms"]:
+            continue
+        cambio = (fila["mediana_ms"] - previa["mediana_ms"]) / previa["mediana_ms"] * 100
+        lineas.append(
+            f"{fila['escala']:>4} {fila['almacen']:<8} {fila['paso']:<20} "
+            f"{previa['mediana_ms']:>10.2f} -> {fila['mediana_ms']:>10.2f} ms ({cambio:+.1f}%)"
+        )
+    return lineas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escalas", nargs="+", choices=list(ESCALAS), default=["10k"])
+    parser.add_argument("--almacenes", nargs="+", choices=list(almacen.ALMACENES), default=["sqlite"])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--directorio", default=os.path.join("data", "banco"))
+    parser.add_argument("--regenerar", action="store_true", help="vuelve a generar las bases aunque existan")
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto, stdout)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para mostrar la variación")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for escala in args.escalas:
+        ruta = preparar_base(args.directorio, escala, args.regenerar)
+        for tipo in args.almacenes:
+            resultados += medir_escala(ruta, escala, tipo, args.repeticiones)
+
+    informe = {"entorno": entorno(), "resultados": resultados}
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto)
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            for linea in comparar(json.load(archivo), informe):
+                print(linea, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
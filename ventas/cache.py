@@ -0,0 +1,50 @@
+"""Caché LRU en memoria compartida entre hilos y huellas estables para sus claves"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def huella(*partes):
+    """Clave estable (sha1) de los valores que determinan un resultado"""
+    return hashlib.sha1(repr(partes).encode("utf-8")).hexdigest()
+
+
+class CacheLRU:
+    """Guarda hasta `max_entradas` valores y descarta el menos usado
+
+    Conviene guardar valores inmutables (texto, bytes): se entregan a varios
+    hilos a la vez sin copiarlos.
+    """
+
+    def __init__(self, max_entradas=64):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obtener(self, clave, construir):
+        """Valor de `clave`; si falta, lo crea con `construir()` y lo guarda"""
+        with self._lock:
+            valor = self._entradas.get(clave)
+            if valor is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return valor
+
+        # Se construye fuera del lock: un cálculo lento no frena a los demás
+        valor = construir()
+        with self._lock:
+            self.fallos += 1
+            self._entradas[clave] = valor
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return valor
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
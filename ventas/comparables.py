@@ -0,0 +1,157 @@
+"""Tabla de días comparables entre años (misma semana y día ISO, o mismo día del calendario)"""
+import calendar
+from datetime import date, timedelta
+
+import pandas as pd
+
+# Mismo origen que fecha_dia (días desde 1970-01-01)
+_ORDINAL_EPOCA = date(1970, 1, 1).toordinal()
+
+MODOS = ("iso", "calendario")
+
+
+def _dia(fecha):
+    return fecha.toordinal() - _ORDINAL_EPOCA
+
+
+def _fecha(dia):
+    return date.fromordinal(int(dia) + _ORDINAL_EPOCA)
+
+
+def semanas_iso(anio):
+    """52 o 53: el 28 de diciembre siempre cae en la última semana ISO"""
+    return date(anio, 12, 28).isocalendar()[1]
+
+
+def equivalente_iso(fecha, anio_destino):
+    """Mismo día y semana ISO en el año pedido; la semana 53 pasa a la 52 si no existe"""
+    iso_anio, semana, dia = fecha.isocalendar()
+    # Se desplaza el año ISO tanto como el calendario: el 29/12/2025 (semana 1
+    # de 2026) se compara con la semana 1 de 2025, que empieza el 30/12/2024
+    destino = iso_anio + (anio_destino - fecha.year)
+    return date.fromisocalendar(destino, min(semana, semanas_iso(destino)), dia)
+
+
+def equivalente_calendario(fecha, anio_destino):
+    """Mismo día y mes en el año pedido; el 29 de febrero pasa al 28 si no es bisiesto"""
+    dia = fecha.day
+    if fecha.month == 2 and dia == 29 and not calendar.isleap(anio_destino):
+        dia = 28
+    return date(anio_destino, fecha.month, dia)
+
+
+def crear_tabla(conn):
+    """Crea la tabla de días comparables si no existe"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dias_comparables (
+            fecha_dia INTEGER,
+            anio_destino INTEGER,
+            anio INTEGER NOT NULL,
+            iso_dia INTEGER NOT NULL,
+            calendario_dia INTEGER NOT NULL,
+            PRIMARY KEY (fecha_dia, anio_destino)
+        ) WITHOUT ROWID
+    """)
+
+
+def _cobertura_deseada(conn):
+    """Años de datos más el siguiente (para proyectar), o None si no hay datos"""
+    minimo, maximo = conn.execute("SELECT MIN(anio), MAX(anio) FROM ventas").fetchone()
+    if minimo is None:
+        return None
+    return int(minimo), int(maximo) + 1
+
+
+def _cobertura_actual(conn):
+    filas = dict(conn.execute(
+        "SELECT clave, valor FROM metadatos WHERE clave IN ('comparables_desde', 'comparables_hasta')"
+    ).fetchall())
+    if len(filas) < 2:
+        return None
+    return filas["comparables_desde"], filas["comparables_hasta"]
+
+
+def actualizar(conn, forzar=False):
+    """Regenera la tabla si cambió el rango de años con datos; devuelve True si la regeneró
+
+    No hace commit: va dentro de la transacción de la escritura.
+    """
+    cobertura = _cobertura_deseada(conn)
+    if cobertura is None or (not forzar and cobertura == _cobertura_actual(conn)):
+        return False
+
+    desde, hasta = cobertura
+    anios = range(desde, hasta + 1)
+    fecha = date(desde, 1, 1)
+    fin = date(hasta, 12, 31)
+    filas = []
+    while fecha <= fin:
+        dia = _dia(fecha)
+        for anio_destino in anios:
+            if anio_destino != fecha.year:
+                filas.append((
+                    dia, anio_destino, fecha.year,
+                    _dia(equivalente_iso(fecha, anio_destino)),
+                    _dia(equivalente_calendario(fecha, anio_destino)),
+                ))
+        fecha += timedelta(days=1)
+
+    conn.execute("DELETE FROM dias_comparables")
+    conn.executemany(
+        "INSERT INTO dias_comparables (fecha_dia, anio_destino, anio, iso_dia, calendario_dia) VALUES (?, ?, ?, ?, ?)",
+        filas
+    )
+    conn.executemany(
+        "INSERT INTO metadatos (clave, valor) VALUES (?, ?) ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor",
+        [("comparables_desde", desde), ("comparables_hasta", hasta)]
+    )
+    return True
+
+
+def equivalente(conn, fecha, anio_destino, modo="iso"):
+    """Fecha comparable de `fecha` en `anio_destino` (búsqueda por clave)"""
+    if modo not in MODOS:
+        raise ValueError(f"Modo desconocido: {modo}")
+    fecha = pd.Timestamp(fecha).date()
+    if anio_destino == fecha.year:
+        return fecha
+    fila = conn.execute(
+        f"SELECT {modo}_dia FROM dias_comparables WHERE fecha_dia = ? AND anio_destino = ?",
+        (_dia(fecha), int(anio_destino))
+    ).fetchone()
+    if fila is not None:
+        return _fecha(fila[0])
+    # Fuera de la cobertura de la tabla: mismo cálculo sin persistir
+    calcular = equivalente_iso if modo == "iso" else equivalente_calendario
+    return calcular(fecha, int(anio_destino))
+
+
+def del_anio_anterior(conn, fecha_inicio, fecha_fin, modo="iso"):
+    """DataFrame (fecha, fecha_comparable) con el comparable del año anterior de cada día del rango
+
+    Con `conn` None (o días fuera de la tabla) se calcula sin consultar la base.
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo desconocido: {modo}")
+    inicio = pd.Timestamp(fecha_inicio).date()
+    fin = pd.Timestamp(fecha_fin).date()
+    encontrados = {} if conn is None else dict(conn.execute(
+        f"""
+        SELECT fecha_dia, {modo}_dia FROM dias_comparables
+        WHERE fecha_dia BETWEEN ? AND ? AND anio_destino = anio - 1
+        """,
+        (_dia(inicio), _dia(fin))
+    ).fetchall())
+
+    calcular = equivalente_iso if modo == "iso" else equivalente_calendario
+    fechas, comparables = [], []
+    for dia in range(_dia(inicio), _dia(fin) + 1):
+        fecha = _fecha(dia)
+        fechas.append(fecha)
+        comparables.append(
+            _fecha(encontrados[dia]) if dia in encontrados else calcular(fecha, fecha.year - 1)
+        )
+    return pd.DataFrame({
+        "fecha": pd.to_datetime(fechas),
+        "fecha_comparable": pd.to_datetime(comparables),
+    })
@@ -0,0 +1,67 @@
+"""Pool de conexiones SQLite de larga vida compartido entre hilos"""
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Ajustes aplicados a cada conexión nueva. journal_mode=WAL queda grabado en el
+# archivo; el resto es por conexión.
+PRAGMAS = {
+    "journal_mode": "WAL",           # lectores no se bloquean mientras alguien escribe
+    "synchronous": "NORMAL",         # seguro con WAL y con muchos menos fsync
+    "mmap_size": 256 * 1024 * 1024,  # lecturas por memoria mapeada
+    "cache_size": -64 * 1024,        # 64 MB de caché de páginas (negativo = KiB)
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+
+class PoolConexiones:
+    """Reparte hasta `tamano` conexiones reutilizables; cada una la usa un solo hilo a la vez"""
+
+    def __init__(self, ruta, tamano=4, timeout=10, pragmas=None):
+        self.ruta = ruta
+        self.tamano = tamano
+        self.timeout = timeout
+        self.pragmas = dict(PRAGMAS if pragmas is None else pragmas)
+        self._libres = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(tamano)
+        self._todas = []
+        self._lock = threading.Lock()
+
+    def _nueva(self):
+        """Abre una conexión y le aplica los PRAGMA del pool"""
+        conn = sqlite3.connect(self.ruta, timeout=self.timeout, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+        for nombre, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {nombre} = {valor}")
+        with self._lock:
+            self._todas.append(conn)
+        return conn
+
+    @contextmanager
+    def conexion(self):
+        """Presta una conexión; al salir se deshace lo no confirmado y vuelve al pool"""
+        if not self._cupos.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError("No hay conexiones libres en el pool")
+        conn = None
+        try:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                conn = self._nueva()
+            yield conn
+        finally:
+            if conn is not None:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._libres.put(conn)
+            self._cupos.release()
+
+    def cerrar(self):
+        """Cierra todas las conexiones abiertas por el pool"""
+        with self._lock:
+            conexiones, self._todas = self._todas, []
+        for conn in conexiones:
+            conn.close()
+        self._libres = queue.LifoQueue()
@@ -0,0 +1,229 @@
+"""Consultas parametrizadas sobre la tabla ventas"""
+import pandas as pd
+
+from ventas import resumenes
+from ventas.esquema import dia_desde_fecha, fecha_desde_dia
+
+COLUMNAS_VENTAS = [
+    "id", "fecha", "secciones", "entradas", "venta", "tickets", "articulos",
+    "ticket_promedio", "articulos_por_ticket", "tasa_conversion", "anio"
+]
+
+
+def _como_lista(valor):
+    """Normaliza un escalar o iterable a lista (None se mantiene)"""
+    if valor is None:
+        return None
+    if isinstance(valor, (str, int)) or not hasattr(valor, "__iter__"):
+        return [valor]
+    return list(valor)
+
+
+def _condiciones(anio=None, fecha_inicio=None, fecha_fin=None, secciones=None):
+    """Lista de condiciones SQL (a unir con AND) y sus parámetros"""
+    condiciones = []
+    parametros = []
+
+    anios = _como_lista(anio)
+    if anios is not None:
+        condiciones.append(f"anio IN ({', '.join('?' * len(anios))})")
+        parametros.extend(int(a) for a in anios)
+
+    # Rangos sobre el número de día entero (indexado), no sobre el texto
+    if fecha_inicio is not None:
+        condiciones.append("fecha_dia >= ?")
+        parametros.append(dia_desde_fecha(fecha_inicio))
+
+    if fecha_fin is not None:
+        condiciones.append("fecha_dia <= ?")
+        parametros.append(dia_desde_fecha(fecha_fin))
+
+    lista_secciones = _como_lista(secciones)
+    if lista_secciones is not None:
+        condiciones.append(f"secciones IN ({', '.join('?' * len(lista_secciones))})")
+        parametros.extend(str(s) for s in lista_secciones)
+
+    return condiciones, parametros
+
+
+def construir_filtros(anio=None, fecha_inicio=None, fecha_fin=None, secciones=None):
+    """Construye la cláusula WHERE y sus parámetros a partir de los filtros"""
+    condiciones, parametros = _condiciones(anio, fecha_inicio, fecha_fin, secciones)
+    where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    return where, parametros
+
+
+def _filtro_periodos(periodos, secciones=None):
+    """WHERE que une con OR varios períodos (anio, fecha_inicio, fecha_fin) de las secciones dadas"""
+    alternativas = []
+    parametros = []
+    for anio, fecha_inicio, fecha_fin in periodos:
+        condiciones, params = _condiciones(anio, fecha_inicio, fecha_fin)
+        alternativas.append(f"({' AND '.join(condiciones) or '1'})")
+        parametros.extend(params)
+
+    condiciones, params = _condiciones(secciones=secciones)
+    where = f" WHERE ({' OR '.join(alternativas)})"
+    if condiciones:
+        where += f" AND {' AND '.join(condiciones)}"
+    return where, parametros + params
+
+
+def contar_periodos(conn, periodos, secciones=None):
+    """Número de filas de ventas de los períodos indicados"""
+    if not periodos or _filtro_vacio(None, secciones):
+        return 0
+    where, parametros = _filtro_periodos(periodos, secciones)
+    return conn.execute(f"SELECT COUNT(*) FROM ventas{where}", parametros).fetchone()[0]
+
+
+def pagina_periodos(conn, periodos, secciones=None, pagina=1, tamano=100, columnas=None):
+    """Una página de filas de los períodos, de la más reciente a la más antigua
+
+    La paginación es LIMIT/OFFSET sobre el índice (anio, fecha_dia, secciones),
+    así solo se leen y convierten las filas que se muestran.
+    """
+    columnas = list(columnas) if columnas is not None else COLUMNAS_VENTAS
+    if not periodos or _filtro_vacio(None, secciones):
+        df = pd.DataFrame(columns=columnas)
+    else:
+        where, parametros = _filtro_periodos(periodos, secciones)
+        df = pd.read_sql(
+            f"""
+            SELECT {', '.join(columnas)} FROM ventas{where}
+            ORDER BY anio DESC, fecha_dia DESC, secciones
+            LIMIT ? OFFSET ?
+            """,
+            conn,
+            params=parametros + [int(tamano), (max(int(pagina), 1) - 1) * int(tamano)]
+        )
+
+    if "fecha" in df.columns:
+        df["fecha"] = pd.to_datetime(df["fecha"])
+    return df
+
+
+def cargar_ventas(conn, anio=None, fecha_inicio=None, fecha_fin=None, secciones=None, columnas=None):
+    """Devuelve solo las filas de ventas que cumplen los filtros indicados"""
+    columnas = list(columnas) if columnas is not None else COLUMNAS_VENTAS
+
+    # Filtros vacíos no pueden coincidir con nada: evitar la consulta
+    if _filtro_vacio(anio, secciones):
+        df = pd.DataFrame(columns=columnas)
+    else:
+        where, parametros = construir_filtros(anio, fecha_inicio, fecha_fin, secciones)
+        df = pd.read_sql(
+            f"SELECT {', '.join(columnas)} FROM ventas{where} ORDER BY anio, fecha_dia",
+            conn,
+            params=parametros
+        )
+
+    if "fecha" in df.columns:
+        df["fecha"] = pd.to_datetime(df["fecha"])
+    return df
+
+
+# Conteos enteros que se reducen al entero más chico que los contiene
+_COLUMNAS_CONTEO = ["id", "entradas", "tickets", "articulos"]
+
+
+def compactar(df, secciones=None):
+    """Tipos compactos: secciones categórica, conteos reducidos y anio como int16
+
+    `secciones` fija las categorías (p. ej. todas las del catálogo) para que
+    frames distintos compartan tipo y se puedan concatenar sin volver a object.
+    Las columnas con nulos se dejan como están.
+    """
+    cambios = {}
+    if "secciones" in df.columns:
+        presentes = sorted(df["secciones"].dropna().unique())
+        if secciones is None:
+            categorias = presentes
+        else:
+            conocidas = set(secciones)
+            categorias = list(secciones) + [s for s in presentes if s not in conocidas]
+        cambios["secciones"] = df["secciones"].astype(pd.CategoricalDtype(categorias))
+    for columna in _COLUMNAS_CONTEO:
+        if columna in df.columns and len(df) and not df[columna].isna().any():
+            cambios[columna] = pd.to_numeric(df[columna], downcast="integer")
+    if "anio" in df.columns and len(df) and not df["anio"].isna().any():
+        cambios["anio"] = df["anio"].astype("int16")
+    # assign no copia las columnas sin cambios (copy-on-write)
+    return df.assign(**cambios)
+
+
+def anios_disponibles(conn):
+    """Años con datos, del más reciente al más antiguo"""
+    filas = conn.execute("SELECT DISTINCT anio FROM ventas WHERE anio IS NOT NULL ORDER BY anio DESC").fetchall()
+    return [int(f[0]) for f in filas]
+
+
+def secciones_disponibles(conn):
+    """Secciones con datos, en orden alfabético"""
+    filas = conn.execute("SELECT DISTINCT secciones FROM ventas WHERE secciones IS NOT NULL ORDER BY secciones").fetchall()
+    return [f[0] for f in filas]
+
+
+def rango_fechas(conn, anio=None):
+    """Fecha mínima y máxima (como Timestamp) para un año o para toda la tabla"""
+    where, parametros = construir_filtros(anio=anio)
+    fila = conn.execute(f"SELECT MIN(fecha_dia), MAX(fecha_dia) FROM ventas{where}", parametros).fetchone()
+    if fila is None or fila[0] is None:
+        return None, None
+    return fecha_desde_dia(fila[0]), fecha_desde_dia(fila[1])
+
+
+def catalogo(conn):
+    """Años, secciones y rangos de fechas (de la tabla y de cada año), sin leer las filas"""
+    anios = anios_disponibles(conn)
+    return {
+        "anios": anios,
+        "secciones": secciones_disponibles(conn),
+        "rango": rango_fechas(conn),
+        "rango_anio": {a: rango_fechas(conn, a) for a in anios}
+    }
+
+
+def _filtro_vacio(anio, secciones):
+    """True si algún filtro de lista viene vacío y no puede coincidir con nada"""
+    return (anio is not None and len(_como_lista(anio)) == 0) or \
+           (secciones is not None and len(_como_lista(secciones)) == 0)
+
+
+def cargar_resumen(conn, anio=None, fecha_inicio=None, fecha_fin=None, secciones=None):
+    """Totales por (anio, mes, secciones) del período, leídos de las tablas de resumen
+
+    Los meses que caen enteros dentro del período salen de resumen_mensual; los
+    meses cortados por los límites se completan con filas de resumen_diario.
+    """
+    if _filtro_vacio(anio, secciones):
+        return resumenes.vacio()
+
+    dia_inicio = dia_desde_fecha(fecha_inicio) if fecha_inicio is not None else -(2 ** 62)
+    dia_fin = dia_desde_fecha(fecha_fin) if fecha_fin is not None else 2 ** 62
+
+    where, parametros = construir_filtros(anio=anio, secciones=secciones)
+    enlace = " AND " if where else " WHERE "
+    columnas = ", ".join(resumenes.COLUMNAS_RESUMEN)
+    agregados = ", ".join(f"SUM({c}) AS {c}" for c in resumenes.COLUMNAS_RESUMEN)
+
+    sql = f"""
+        SELECT anio, mes, secciones, {agregados}
+        FROM (
+            SELECT anio, mes, secciones, {columnas}
+            FROM resumen_mensual
+            {where}{enlace}mes_dia >= ? AND mes_fin_dia <= ?
+            UNION ALL
+            SELECT anio, mes, secciones, {columnas}
+            FROM resumen_diario
+            {where}{enlace}fecha_dia BETWEEN ? AND ?
+              AND NOT (mes_dia >= ? AND mes_fin_dia <= ?)
+        )
+        GROUP BY anio, mes, secciones
+        ORDER BY anio, mes, secciones
+    """
+    parametros = (
+        parametros + [dia_inicio, dia_fin]
+        + parametros + [dia_inicio, dia_fin, dia_inicio, dia_fin]
+    )
+    return pd.read_sql(sql, conn, params=parametros)
@@ -0,0 +1,236 @@
+"""Esquema de la base de datos y migraciones en sitio"""
+from datetime import date
+
+import pandas as pd
+
+from ventas import comparables, resumenes
+
+# Día 0 de la columna fecha_dia (mismo origen que julianday(...) - 2440587.5)
+EPOCA = date(1970, 1, 1)
+
+# Expresión SQL equivalente a dia_desde_fecha(), usada en backfill y triggers
+_SQL_FECHA_DIA = "CAST(julianday(substr({col}, 1, 10)) - 2440587.5 AS INTEGER)"
+
+
+def dia_desde_fecha(fecha):
+    """Número de día (entero ordenable) de una fecha"""
+    return (pd.Timestamp(fecha).date() - EPOCA).days
+
+
+def fecha_desde_dia(dia):
+    """Timestamp correspondiente a un número de día"""
+    return pd.Timestamp(EPOCA) + pd.Timedelta(days=int(dia))
+
+
+def _migracion_tabla_ventas(conn):
+    """Tabla base de ventas diarias"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ventas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT,
+            secciones TEXT,
+            entradas INTEGER,
+            venta REAL,
+            tickets INTEGER,
+            articulos INTEGER,
+            ticket_promedio REAL,
+            articulos_por_ticket REAL,
+            tasa_conversion REAL,
+            anio INTEGER
+        )
+    """)
+
+
+def _migracion_fecha_dia(conn):
+    """Columna fecha_dia e índices compuestos para los filtros del tablero"""
+    columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(ventas)")}
+    if "fecha_dia" not in columnas:
+        conn.execute("ALTER TABLE ventas ADD COLUMN fecha_dia INTEGER")
+
+    conn.execute(f"""
+        UPDATE ventas SET fecha_dia = {_SQL_FECHA_DIA.format(col="fecha")}
+        WHERE fecha_dia IS NULL AND fecha IS NOT NULL
+    """)
+
+    # Mantener fecha_dia al insertar o corregir fechas desde cualquier ruta
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ventas_fecha_dia_insert
+        AFTER INSERT ON ventas
+        WHEN NEW.fecha_dia IS NULL AND NEW.fecha IS NOT NULL
+        BEGIN
+            UPDATE ventas SET fecha_dia = {_SQL_FECHA_DIA.format(col="NEW.fecha")} WHERE id = NEW.id;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ventas_fecha_dia_update
+        AFTER UPDATE OF fecha ON ventas
+        BEGIN
+            UPDATE ventas SET fecha_dia = {_SQL_FECHA_DIA.format(col="NEW.fecha")} WHERE id = NEW.id;
+        END
+    """)
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ventas_anio_fecha_secciones ON ventas (anio, fecha_dia, secciones)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ventas_secciones_fecha ON ventas (secciones, fecha_dia)")
+
+
+def _migracion_metadatos(conn):
+    """Tabla clave/valor con la versión de los datos para invalidar cachés"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS metadatos (
+            clave TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO metadatos (clave, valor) VALUES ('version_datos', 0)")
+
+
+def _migracion_resumenes(conn):
+    """Tablas de resumen diario/mensual, reconstruidas a partir de ventas"""
+    resumenes.crear_tablas(conn)
+    resumenes.reconstruir(conn)
+
+
+def _migracion_clave_natural(conn):
+    """Clave única (fecha, secciones); elimina duplicados de cargas repetidas"""
+    # Se conserva la fila cargada más recientemente de cada clave
+    borradas = conn.execute("""
+        DELETE FROM ventas
+        WHERE fecha_dia IS NOT NULL AND secciones IS NOT NULL
+          AND id NOT IN (
+              SELECT MAX(id) FROM ventas
+              WHERE fecha_dia IS NOT NULL AND secciones IS NOT NULL
+              GROUP BY fecha_dia, secciones
+          )
+    """).rowcount
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_ventas_fecha_secciones ON ventas (fecha_dia, secciones)")
+    if borradas > 0:
+        resumenes.reconstruir(conn)
+        marcar_cambio_datos(conn)
+
+
+def _migracion_trabajos(conn):
+    """Cola persistente de cargas en segundo plano"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS trabajos_carga (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            estado TEXT NOT NULL DEFAULT 'en_cola',
+            ruta TEXT NOT NULL,
+            archivos TEXT NOT NULL,
+            creado REAL NOT NULL,
+            iniciado REAL,
+            actualizado REAL,
+            terminado REAL,
+            duracion REAL,
+            filas_estimadas INTEGER DEFAULT 0,
+            filas_procesadas INTEGER DEFAULT 0,
+            nuevos INTEGER DEFAULT 0,
+            actualizados INTEGER DEFAULT 0,
+            sin_cambios INTEGER DEFAULT 0,
+            resultado TEXT,
+            error TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trabajos_carga_estado ON trabajos_carga (estado, id)")
+
+
+def _migracion_anios_modificados(conn):
+    """Registro de años con cambios pendientes de exportar a otros almacenes"""
+    # `cambios` crece con cada fila tocada; quien exporta solo borra la marca
+    # si no cambió mientras tanto.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS anios_modificados (
+            anio INTEGER PRIMARY KEY,
+            cambios INTEGER NOT NULL
+        )
+    """)
+    marcar = """
+        INSERT INTO anios_modificados (anio, cambios)
+        SELECT {anio}, 1 WHERE {anio} IS NOT NULL
+        ON CONFLICT (anio) DO UPDATE SET cambios = cambios + 1;
+    """
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ventas_anio_insert
+        AFTER INSERT ON ventas
+        BEGIN {marcar.format(anio="NEW.anio")} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ventas_anio_update
+        AFTER UPDATE ON ventas
+        BEGIN
+            {marcar.format(anio="OLD.anio")}
+            {marcar.format(anio="NEW.anio")}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ventas_anio_delete
+        AFTER DELETE ON ventas
+        BEGIN {marcar.format(anio="OLD.anio")} END
+    """)
+    conn.execute("""
+        INSERT INTO anios_modificados (anio, cambios)
+        SELECT DISTINCT anio, 1 FROM ventas WHERE anio IS NOT NULL
+        ON CONFLICT (anio) DO UPDATE SET cambios = cambios + 1
+    """)
+
+
+def _migracion_comparables(conn):
+    """Tabla de días comparables entre años, regenerada al cambiar los años con datos"""
+    comparables.crear_tabla(conn)
+    comparables.actualizar(conn, forzar=True)
+
+
+# Orden fijo: la posición + 1 es la versión que deja aplicada cada migración.
+# Todas deben ser idempotentes, porque se reaplican si la tabla se recrea.
+MIGRACIONES = [
+    _migracion_tabla_ventas,
+    _migracion_fecha_dia,
+    _migracion_metadatos,
+    _migracion_resumenes,
+    _migracion_clave_natural,
+    _migracion_trabajos,
+    _migracion_anios_modificados,
+    _migracion_comparables,
+]
+
+VERSION_ESQUEMA = len(MIGRACIONES)
+
+
+def version_actual(conn):
+    """Versión de esquema registrada en PRAGMA user_version"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def version_datos(conn):
+    """Contador que cambia con cada escritura sobre ventas"""
+    fila = conn.execute("SELECT valor FROM metadatos WHERE clave = 'version_datos'").fetchone()
+    return fila[0] if fila else 0
+
+
+def marcar_cambio_datos(conn):
+    """Incrementa la versión de datos (sin commit: va en la transacción de la escritura)"""
+    conn.execute("""
+        INSERT INTO metadatos (clave, valor) VALUES ('version_datos', 1)
+        ON CONFLICT (clave) DO UPDATE SET valor = valor + 1
+    """)
+
+
+def migrar(conn):
+    """Crea o actualiza el esquema sin borrar datos; devuelve la versión final"""
+    version = version_actual(conn)
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ventas'"
+    ).fetchone()
+    if not existe:
+        version = 0
+
+    for numero in range(version, VERSION_ESQUEMA):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            MIGRACIONES[numero](conn)
+            conn.execute(f"PRAGMA user_version = {numero + 1}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    return max(version, VERSION_ESQUEMA)
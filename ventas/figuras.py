@@ -0,0 +1,16 @@
+"""Caché LRU de figuras Plotly serializadas, por huella del estado de filtros"""
+import json
+
+from ventas.cache import CacheLRU
+
+
+class CacheFiguras(CacheLRU):
+    """Guarda el JSON de hasta `max_entradas` figuras y descarta la menos usada
+
+    Se comparte entre sesiones e hilos: las figuras se guardan serializadas, así
+    nadie recibe un objeto que otra ejecución pueda modificar.
+    """
+
+    def obtener(self, clave, construir):
+        """Figura (dict) de `clave`; si falta, la crea con `construir()` y la guarda"""
+        return json.loads(super().obtener(clave, lambda: construir().to_json()))
@@ -0,0 +1,93 @@
+"""Índice por año y fecha sobre un frame de ventas ordenado, para cortar rangos sin máscaras"""
+import numpy as np
+import pandas as pd
+
+from ventas import consultas
+
+
+def _dia(fecha):
+    return np.datetime64(pd.Timestamp(fecha).date(), "D")
+
+
+class IndiceFechas:
+    """Tramos por año y búsqueda binaria por día sobre un frame ordenado por (anio, fecha)
+
+    Se construye una vez por frame cargado (O(n)); después cada corte cuesta
+    O(log n) y devuelve una vista por posición. Las posiciones sirven también
+    para frames derivados que conservan el orden de filas (p. ej. `df.assign(...)`).
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.tramos = {}
+        self._dias = np.array([], dtype="datetime64[D]")
+        self._ordenado = True
+        self._tramo_ordenado = {}
+        if df.empty or "fecha" not in df.columns or "anio" not in df.columns:
+            return
+
+        # Resolución de día: igual que los filtros por fecha_dia en SQL
+        self._dias = df["fecha"].to_numpy().astype("datetime64[D]")
+        crece = self._dias[1:] >= self._dias[:-1]
+        self._ordenado = bool(crece.all())
+
+        anios = df["anio"].to_numpy()
+        cortes = np.flatnonzero(anios[1:] != anios[:-1]) + 1
+        inicios = np.concatenate(([0], cortes))
+        fines = np.concatenate((cortes, [len(df)]))
+        for inicio, fin in zip(inicios, fines):
+            if pd.isna(anios[inicio]):
+                continue
+            anio = int(anios[inicio])
+            if anio in self.tramos:
+                # Año partido en varios tramos: no se puede cortar por posición
+                self._tramo_ordenado[anio] = False
+                continue
+            self.tramos[anio] = (int(inicio), int(fin))
+            self._tramo_ordenado[anio] = bool(crece[inicio:fin - 1].all())
+
+    def rebanada(self, anio=None, fecha_inicio=None, fecha_fin=None):
+        """slice de posiciones del año y rango de días (extremos incluidos); None si no hay orden"""
+        if anio is None:
+            if not self._ordenado:
+                return None
+            inicio, fin = 0, len(self._dias)
+        else:
+            anio = int(anio)
+            if not self._tramo_ordenado.get(anio, True):
+                return None
+            inicio, fin = self.tramos.get(anio, (0, 0))
+
+        dias = self._dias[inicio:fin]
+        desde = int(np.searchsorted(dias, _dia(fecha_inicio), side="left")) if fecha_inicio is not None else 0
+        hasta = int(np.searchsorted(dias, _dia(fecha_fin), side="right")) if fecha_fin is not None else len(dias)
+        return slice(inicio + desde, inicio + max(desde, hasta))
+
+    def rango(self, anio=None, fecha_inicio=None, fecha_fin=None, df=None):
+        """Filas de `df` (por defecto el frame indexado) del año y rango pedidos"""
+        df = self.df if df is None else df
+        corte = self.rebanada(anio, fecha_inicio, fecha_fin)
+        if corte is not None:
+            return df.iloc[corte]
+
+        # Sin orden garantizado: máscara equivalente
+        mascara = np.ones(len(df), dtype=bool)
+        if anio is not None:
+            mascara &= df["anio"].to_numpy() == int(anio)
+        if fecha_inicio is not None:
+            mascara &= self._dias >= _dia(fecha_inicio)
+        if fecha_fin is not None:
+            mascara &= self._dias <= _dia(fecha_fin)
+        return df[mascara]
+
+
+def cargar(tienda, conn, anio=None, fecha_inicio=None, fecha_fin=None, secciones=None, categorias=None,
+           columnas=None):
+    """Índice de las filas que `tienda` (un almacén) lee con esos filtros, en tipos compactos
+
+    `categorias` fija las secciones posibles (p. ej. las del catálogo) para que
+    todos los frames cargados compartan el tipo categórico. `columnas` limita
+    la lectura; el índice necesita "anio" y "fecha" entre ellas.
+    """
+    df = tienda.cargar_ventas(conn, anio, fecha_inicio, fecha_fin, secciones, columnas)
+    return IndiceFechas(consultas.compactar(df, categorias))
@@ -0,0 +1,480 @@
+"""Informes comparativos por lotes, sin la página: Excel y HTML por trabajo en un pool de procesos
+
+Uso:
+    python -m ventas.informes trabajos.json --salida informes --procesos 4
+    python -m ventas.informes trabajos.json --formatos xlsx
+
+`trabajos.json` es una lista de objetos con:
+    anio_base, anio_comparar        obligatorios
+    desde, hasta                    período (AAAA-MM-DD) del año a comparar; el del
+                                    año base es el equivalente. Por defecto, el
+                                    rango de fechas de toda la base, como la página
+    secciones                       lista de secciones; "cada" genera un trabajo por
+                                    sección (las tiendas van en el nombre de la
+                                    sección); por defecto, todas juntas
+    crecimiento                     crecimiento objetivo del presupuesto (%), 15
+    nombre                          nombre de los archivos (opcional)
+
+Cada trabajo escribe <nombre>.xlsx y/o <nombre>.html con los KPI, el presupuesto,
+el "Resumen Comparativo" y las ventas por mes y por sección; `indice.html`
+enlaza todos los informes de la corrida.
+"""
+import argparse
+import html
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date
+
+import pandas as pd
+import xlsxwriter
+
+from ventas import almacen, analisis, conexion, consultas, esquema, kpis
+
+FORMATOS_SALIDA = ("xlsx", "html")
+CRECIMIENTO_PRESUPUESTO = 15
+
+# Formato de cada tipo de celda: (número de Excel, texto para HTML)
+_FORMATOS = {
+    "dinero": ("$#,##0", "${:,.0f}"),
+    "dinero2": ("$#,##0.00", "${:,.2f}"),
+    "entero": ("#,##0", "{:,.0f}"),
+    "porcentaje": ('0.0"%"', "{:.1f}%"),
+    "porcentaje2": ('0.00"%"', "{:.2f}%"),
+    "variacion": ('+0.0"%";-0.0"%";0.0"%"', "{:+.1f}%"),
+    "pp": ('+0.00" pp";-0.00" pp";0.00" pp"', "{:+.2f} pp"),
+}
+
+
+@dataclass(frozen=True)
+class Trabajo:
+    """Una comparación a generar; el período es el del año a comparar"""
+
+    nombre: str
+    anio_base: int
+    anio_comparar: int
+    desde: pd.Timestamp
+    hasta: pd.Timestamp
+    secciones: tuple = None
+    crecimiento: float = CRECIMIENTO_PRESUPUESTO
+
+
+@dataclass(frozen=True)
+class Tabla:
+    """Tabla de un informe: cada celda es (valor, formato); formato None es texto"""
+
+    titulo: str
+    columnas: list
+    filas: list
+
+
+# ---------- Trabajos ----------
+
+def _nombre_archivo(texto):
+    return re.sub(r"[^\w.-]+", "_", texto, flags=re.UNICODE).strip("_") or "informe"
+
+
+def _fecha(valor, campo):
+    try:
+        return pd.Timestamp(date.fromisoformat(str(valor)))
+    except ValueError:
+        raise ValueError(f"'{campo}' debe ser una fecha AAAA-MM-DD: {valor!r}") from None
+
+
+def leer_trabajos(especificaciones, catalogo):
+    """Lista de Trabajo a partir de los dicts del archivo, con los valores por defecto del catálogo
+
+    Lanza ValueError si algún trabajo está incompleto o mal escrito.
+    """
+    trabajos = []
+    for numero, spec in enumerate(especificaciones, start=1):
+        try:
+            anio_base, anio_comparar = int(spec["anio_base"]), int(spec["anio_comparar"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Trabajo {numero}: 'anio_base' y 'anio_comparar' son obligatorios") from None
+
+        desde = _fecha(spec["desde"], "desde") if spec.get("desde") else catalogo["rango"][0]
+        hasta = _fecha(spec["hasta"], "hasta") if spec.get("hasta") else catalogo["rango"][1]
+        if desde > hasta:
+            raise ValueError(f"Trabajo {numero}: 'desde' debe ser menor o igual a 'hasta'")
+        crecimiento = float(spec.get("crecimiento", CRECIMIENTO_PRESUPUESTO))
+
+        secciones = spec.get("secciones")
+        if secciones == "cada":
+            grupos = [(seccion,) for seccion in catalogo["secciones"]]
+        elif secciones is None:
+            grupos = [None]
+        elif isinstance(secciones, str):
+            grupos = [(secciones,)]
+        else:
+            grupos = [tuple(secciones)]
+
+        base = spec.get("nombre") or f"{anio_base}_vs_{anio_comparar}_{desde:%Y%m%d}-{hasta:%Y%m%d}"
+        for grupo in grupos:
+            sufijo = "" if grupo is None or (spec.get("nombre") and len(grupos) == 1) else "_" + "+".join(grupo)
+            trabajos.append(Trabajo(
+                nombre=_nombre_archivo(base + sufijo),
+                anio_base=anio_base,
+                anio_comparar=anio_comparar,
+                desde=desde,
+                hasta=hasta,
+                secciones=grupo,
+                crecimiento=crecimiento,
+            ))
+
+    # Dos trabajos con el mismo nombre se pisarían los archivos
+    vistos = {}
+    for trabajo in trabajos:
+        vistos[trabajo.nombre] = vistos.get(trabajo.nombre, 0) + 1
+    repetidos = sorted(nombre for nombre, veces in vistos.items() if veces > 1)
+    if repetidos:
+        raise ValueError(f"Nombres de informe repetidos: {', '.join(repetidos)}")
+    return trabajos
+
+
+# ---------- Cálculo ----------
+
+def _comparar(titulo, etiqueta, base, comparar, anio_base, anio_comparar):
+    """Tabla etiqueta | año base | año comparar | variación de dos series de venta"""
+    indice = base.index.union(comparar.index, sort=False)
+    base, comparar = base.reindex(indice, fill_value=0.0), comparar.reindex(indice, fill_value=0.0)
+    filas = [
+        [(str(clave), None), (float(base[clave]), "dinero"), (float(comparar[clave]), "dinero"),
+         (kpis.variacion(comparar[clave], base[clave]), "variacion")]
+        for clave in indice
+    ]
+    return Tabla(titulo, [etiqueta, str(anio_base), str(anio_comparar), "Variación"], filas)
+
+
+def calcular(conn, tienda, trabajo):
+    """Tablas del informe de un trabajo, con los mismos cálculos que la página"""
+    anio_base, anio_comparar = trabajo.anio_base, trabajo.anio_comparar
+    secciones = list(trabajo.secciones) if trabajo.secciones is not None else None
+    inicio_base, fin_base, _ = analisis.periodo_equivalente(trabajo.desde, trabajo.hasta, anio_base)
+
+    kpis_base = kpis.calcular(tienda.cargar_ventas(conn, anio_base, inicio_base, fin_base, secciones, kpis.COLUMNAS))
+    kpis_comp = kpis.calcular(
+        tienda.cargar_ventas(conn, anio_comparar, trabajo.desde, trabajo.hasta, secciones, kpis.COLUMNAS)
+    )
+    df_plot = analisis.tabla_graficos(
+        consultas.cargar_resumen(conn, anio_base, inicio_base, fin_base, secciones),
+        consultas.cargar_resumen(conn, anio_comparar, trabajo.desde, trabajo.hasta, secciones),
+    )
+
+    encabezado = ["Métrica", str(anio_base), str(anio_comparar), "Variación"]
+    tabla_kpis = Tabla("KPIs", encabezado, [
+        [("Ventas", None), (kpis_base.venta, "dinero"), (kpis_comp.venta, "dinero"),
+         (kpis.variacion(kpis_comp.venta, kpis_base.venta), "variacion")],
+        [("Entradas", None), (kpis_base.entradas, "entero"), (kpis_comp.entradas, "entero"),
+         (kpis.variacion(kpis_comp.entradas, kpis_base.entradas), "variacion")],
+        [("Tickets", None), (kpis_base.tickets, "entero"), (kpis_comp.tickets, "entero"),
+         (kpis.variacion(kpis_comp.tickets, kpis_base.tickets), "variacion")],
+        [("Ticket promedio", None), (kpis_base.ticket_promedio, "dinero2"), (kpis_comp.ticket_promedio, "dinero2"),
+         (kpis.variacion(kpis_comp.ticket_promedio, kpis_base.ticket_promedio), "variacion")],
+        [("Tasa de conversión", None), (kpis_base.tasa_conversion, "porcentaje2"),
+         (kpis_comp.tasa_conversion, "porcentaje2"), (kpis_comp.tasa_conversion - kpis_base.tasa_conversion, "pp")],
+    ])
+
+    presupuesto = kpis.presupuesto(kpis_base.venta, trabajo.crecimiento)
+    cumplimiento = kpis.cumplimiento(kpis_comp.venta, presupuesto)
+    tabla_presupuesto = Tabla("Presupuesto vs Real", ["Concepto", "Valor"], [
+        [(f"Presupuesto {anio_comparar} (+{trabajo.crecimiento:g}% vs {anio_base})", None), (presupuesto, "dinero")],
+        [(f"Venta real {anio_comparar}", None), (kpis_comp.venta, "dinero")],
+        [("Cumplimiento", None), (cumplimiento, "porcentaje")],
+        [("Diferencia", None), (kpis_comp.venta - presupuesto, "dinero")],
+    ])
+
+    tabla_resumen = Tabla("Resumen Comparativo", encabezado, [
+        [("Ventas Totales", None), (kpis_base.venta, "dinero"), (kpis_comp.venta, "dinero"),
+         (kpis.variacion(kpis_comp.venta, kpis_base.venta), "variacion")],
+        [("Días con datos", None), (kpis_base.dias, "entero"), (kpis_comp.dias, "entero"),
+         (kpis.variacion(kpis_comp.dias, kpis_base.dias), "variacion")],
+        [("Promedio diario", None), (kpis_base.promedio_diario, "dinero"), (kpis_comp.promedio_diario, "dinero"),
+         (kpis.variacion(kpis_comp.promedio_diario, kpis_base.promedio_diario), "variacion")],
+        [("vs Presupuesto", None), ("Base", None), (cumplimiento, "porcentaje"), (cumplimiento - 100, "variacion")],
+    ])
+
+    mensual = analisis.ventas_mensuales(df_plot)
+    por_mes = [
+        mensual[mensual["anio"] == anio].set_index("mes_nombre")["venta"]
+        for anio in (anio_base, anio_comparar)
+    ]
+    seccion = analisis.ventas_por_seccion(df_plot)
+    por_seccion = [
+        seccion[seccion["anio"] == anio].set_index("secciones")["venta"]
+        for anio in (anio_base, anio_comparar)
+    ]
+
+    return {
+        "trabajo": trabajo,
+        "periodo_base": (inicio_base, fin_base),
+        "tablas": [
+            tabla_kpis,
+            tabla_presupuesto,
+            tabla_resumen,
+            _comparar("Ventas por mes", "Mes", *por_mes, anio_base, anio_comparar),
+            _comparar("Ventas por sección", "Sección", *por_seccion, anio_base, anio_comparar),
+        ],
+    }
+
+
+# ---------- Salida ----------
+
+def _titulo(informe):
+    trabajo = informe["trabajo"]
+    return f"Comparación {trabajo.anio_base} vs {trabajo.anio_comparar}"
+
+
+def _descripcion(informe):
+    """Líneas con el período y las secciones del informe"""
+    trabajo = informe["trabajo"]
+    inicio_base, fin_base = informe["periodo_base"]
+    secciones = ", ".join(trabajo.secciones) if trabajo.secciones is not None else "Todas"
+    return [
+        f"{trabajo.anio_base}: {inicio_base:%d/%m/%Y} - {fin_base:%d/%m/%Y}",
+        f"{trabajo.anio_comparar}: {trabajo.desde:%d/%m/%Y} - {trabajo.hasta:%d/%m/%Y}",
+        f"Secciones: {secciones}",
+    ]
+
+
+def _vacia(valor):
+    return valor is None or (isinstance(valor, float) and pd.isna(valor))
+
+
+def escribir_excel(informe, ruta):
+    """Una hoja con todas las tablas, una debajo de otra, con formato numérico por celda"""
+    libro = xlsxwriter.Workbook(ruta, {"nan_inf_to_errors": True})
+    try:
+        hoja = libro.add_worksheet("Comparación")
+        titulo = libro.add_format({"bold": True, "font_size": 14})
+        subtitulo = libro.add_format({"bold": True, "font_size": 12, "font_color": "#1f77b4"})
+        encabezado = libro.add_format({"bold": True, "bg_color": "#e1f5fe", "border": 1})
+        formatos = {nombre: libro.add_format({"num_format": excel, "border": 1}) for nombre, (excel, _) in _FORMATOS.items()}
+        texto = libro.add_format({"border": 1})
+
+        hoja.write(0, 0, _titulo(informe), titulo)
+        fila = 1
+        for linea in _descripcion(informe):
+            hoja.write(fila, 0, linea)
+            fila += 1
+
+        for tabla in informe["tablas"]:
+            fila += 1
+            hoja.write(fila, 0, tabla.titulo, subtitulo)
+            fila += 1
+            hoja.write_row(fila, 0, tabla.columnas, encabezado)
+            for celdas in tabla.filas:
+                fila += 1
+                for columna, (valor, formato) in enumerate(celdas):
+                    if _vacia(valor):
+                        hoja.write_blank(fila, columna, None, texto)
+                    else:
+                        hoja.write(fila, columna, valor, formatos[formato] if formato else texto)
+            fila += 1
+
+        hoja.set_column(0, 0, 42)
+        hoja.set_column(1, 3, 16)
+    finally:
+        libro.close()
+
+
+def _celda_html(valor, formato):
+    if _vacia(valor):
+        return "—"
+    if formato is None:
+        return html.escape(str(valor))
+    return _FORMATOS[formato][1].format(valor)
+
+
+_ESTILO_HTML = """
+body { font-family: sans-serif; background: #f8f9fa; color: #222; margin: 2rem; }
+h1 { margin-bottom: 0.2rem; }
+h2 { color: #1f77b4; border-bottom: 3px solid #1f77b4; padding-bottom: 0.3rem; }
+table { border-collapse: collapse; background: white; margin-bottom: 1rem; }
+th, td { border: 1px solid #ddd; padding: 0.3rem 0.8rem; }
+th { background: #e1f5fe; text-align: left; }
+td.num { text-align: right; }
+"""
+
+
+def _pagina_html(titulo, cuerpo):
+    return (
+        f'<!DOCTYPE html>\n<html lang="es">\n<head>\n<meta charset="utf-8">\n'
+        f"<title>{html.escape(titulo)}</title>\n<style>{_ESTILO_HTML}</style>\n</head>\n"
+        f"<body>\n{cuerpo}\n</body>\n</html>\n"
+    )
+
+
+def escribir_html(informe, ruta):
+    """Página autocontenida con las mismas tablas que el Excel"""
+    partes = [f"<h1>{html.escape(_titulo(informe))}</h1>"]
+    partes += [f"<p>{html.escape(linea)}</p>" for linea in _descripcion(informe)]
+    for tabla in informe["tablas"]:
+        partes.append(f"<h2>{html.escape(tabla.titulo)}</h2>\n<table>")
+        partes.append("<tr>" + "".join(f"<th>{html.escape(c)}</th>" for c in tabla.columnas) + "</tr>")
+        for celdas in tabla.filas:
+            partes.append("<tr>" + "".join(
+                f'<td class="num">{_celda_html(v, f)}</td>' if f else f"<td>{_celda_html(v, f)}</td>"
+                for v, f in celdas
+            ) + "</tr>")
+        partes.append("</table>")
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        archivo.write(_pagina_html(_titulo(informe), "\n".join(partes)))
+
+
+def escribir_indice(resultados, directorio):
+    """indice.html con un enlace a cada archivo generado y los trabajos fallidos"""
+    filas = []
+    for resultado in resultados:
+        if resultado["error"]:
+            enlaces = f"Error: {html.escape(resultado['error'])}"
+        else:
+            enlaces = " · ".join(
+                f'<a href="{html.escape(os.path.basename(r))}">{html.escape(os.path.splitext(r)[1][1:])}</a>'
+                for r in resultado["archivos"]
+            )
+        filas.append(f"<tr><td>{html.escape(resultado['nombre'])}</td><td>{enlaces}</td></tr>")
+    cuerpo = (
+        "<h1>Informes comparativos</h1>\n<table>\n<tr><th>Informe</th><th>Archivos</th></tr>\n"
+        + "\n".join(filas) + "\n</table>"
+    )
+    ruta = os.path.join(directorio, "indice.html")
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        archivo.write(_pagina_html("Informes comparativos", cuerpo))
+    return ruta
+
+
+# ---------- Ejecución ----------
+
+# Conexión y almacén de cada proceso del pool (se abren una vez por proceso)
+_pool = None
+_tienda = None
+
+
+def _iniciar_proceso(ruta_base, tipo_almacen, directorio_almacen):
+    global _pool, _tienda
+    _pool = conexion.PoolConexiones(ruta_base, tamano=1)
+    _tienda = almacen.crear(tipo_almacen, directorio_almacen)
+
+
+def _ejecutar(trabajo, directorio, formatos):
+    """Calcula y escribe un informe; los errores se devuelven en el resultado"""
+    inicio = time.perf_counter()
+    resultado = {"nombre": trabajo.nombre, "archivos": [], "error": None}
+    try:
+        with _pool.conexion() as conn:
+            informe = calcular(conn, _tienda, trabajo)
+        for formato in formatos:
+            ruta = os.path.join(directorio, f"{trabajo.nombre}.{formato}")
+            (escribir_excel if formato == "xlsx" else escribir_html)(informe, ruta)
+            resultado["archivos"].append(ruta)
+    except Exception as e:
+        resultado["error"] = f"{type(e).__name__}: {e}"
+    resultado["ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    return resultado
+
+
+def generar(trabajos, ruta_base, directorio, formatos=FORMATOS_SALIDA, procesos=None,
+            tipo_almacen="sqlite", directorio_almacen=None, al_terminar=None):
+    """Genera los informes de `trabajos` repartidos en `procesos` y devuelve un resultado por trabajo
+
+    Cada resultado es {"nombre", "archivos", "error", "ms"}, en el orden de
+    `trabajos`. `al_terminar(resultado)` se llama a medida que acaba cada uno.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    directorio_almacen = directorio_almacen or os.path.join(os.path.dirname(ruta_base) or ".", "parquet")
+    argumentos = (ruta_base, tipo_almacen, directorio_almacen)
+    procesos = procesos or min(len(trabajos), os.cpu_count() or 1)
+    resultados = {}
+
+    if procesos <= 1 or len(trabajos) <= 1:
+        # Sin paralelismo posible no compensa arrancar procesos
+        _iniciar_proceso(*argumentos)
+        try:
+            for trabajo in trabajos:
+                resultados[trabajo.nombre] = _ejecutar(trabajo, directorio, formatos)
+                if al_terminar is not None:
+                    al_terminar(resultados[trabajo.nombre])
+        finally:
+            _pool.cerrar()
+    else:
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto,
+                                 initializer=_iniciar_proceso, initargs=argumentos) as pool:
+            futuros = {pool.submit(_ejecutar, trabajo, directorio, formatos): trabajo for trabajo in trabajos}
+            for futuro in as_completed(futuros):
+                trabajo = futuros[futuro]
+                try:
+                    resultados[trabajo.nombre] = futuro.result()
+                except Exception as e:
+                    # Proceso caído: el trabajo no llegó a devolver su resultado
+                    resultados[trabajo.nombre] = {"nombre": trabajo.nombre, "archivos": [], "error": str(e), "ms": None}
+                if al_terminar is not None:
+                    al_terminar(resultados[trabajo.nombre])
+
+    return [resultados[trabajo.nombre] for trabajo in trabajos]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trabajos", help="archivo JSON con la lista de trabajos")
+    parser.add_argument("--salida", default="informes", help="directorio de los informes")
+    parser.add_argument("--formatos", nargs="+", choices=FORMATOS_SALIDA, default=list(FORMATOS_SALIDA))
+    parser.add_argument("--procesos", type=int, help="procesos en paralelo (por defecto, uno por CPU)")
+    parser.add_argument("--base", default=os.environ.get("VENTAS_DB", os.path.join("data", "ventas.db")))
+    parser.add_argument("--almacen", choices=list(almacen.ALMACENES), default=os.environ.get("VENTAS_ALMACEN", "sqlite"))
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.base):
+        parser.error(f"No existe la base {args.base}")
+    with open(args.trabajos, encoding="utf-8") as archivo:
+        especificaciones = json.load(archivo)
+    if isinstance(especificaciones, dict):
+        especificaciones = [especificaciones]
+
+    directorio_almacen = os.path.join(os.path.dirname(args.base) or ".", "parquet")
+    pool = conexion.PoolConexiones(args.base, tamano=1)
+    try:
+        with pool.conexion() as conn:
+            esquema.migrar(conn)
+            catalogo = consultas.catalogo(conn)
+            # Los procesos solo leen: la réplica se pone al día una vez aquí
+            tienda = almacen.crear(args.almacen, directorio_almacen)
+            if hasattr(tienda, "sincronizar"):
+                tienda.sincronizar(conn)
+    finally:
+        pool.cerrar()
+    if not catalogo["anios"]:
+        parser.error("La base no tiene datos")
+
+    try:
+        trabajos = leer_trabajos(especificaciones, catalogo)
+    except ValueError as e:
+        parser.error(str(e))
+
+    def avisar(resultado):
+        estado = f"ERROR {resultado['error']}" if resultado["error"] else f"{resultado['ms']:.0f} ms"
+        print(f"{resultado['nombre']}: {estado}", file=sys.stderr)
+
+    inicio = time.perf_counter()
+    resultados = generar(
+        trabajos, args.base, args.salida, args.formatos, args.procesos,
+        args.almacen, directorio_almacen, avisar,
+    )
+    indice = escribir_indice(resultados, args.salida)
+    fallidos = sum(1 for r in resultados if r["error"])
+    print(
+        f"{len(resultados) - fallidos} de {len(resultados)} informes en "
+        f"{time.perf_counter() - inicio:.1f} s; índice en {indice}",
+        file=sys.stderr,
+    )
+    return 1 if fallidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
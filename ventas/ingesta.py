@@ -0,0 +1,460 @@
+"""Ingesta de archivos Excel con upsert idempotente sobre la clave (fecha, secciones)"""
+import io
+import multiprocessing
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import openpyxl
+import pandas as pd
+
+from ventas import comparables, esquema, resumenes
+
+# Encabezados del Excel y su nombre de columna en la tabla
+COLUMNAS_EXCEL = {
+    "Fecha": "fecha",
+    "Secciones": "secciones",
+    "Entradas": "entradas",
+    "Venta": "venta",
+    "Tickets": "tickets",
+    "Artículos": "articulos",
+    "Ticket promedio": "ticket_promedio",
+    "Artículos por ticket": "articulos_por_ticket",
+    "Tasa de conversión": "tasa_conversion",
+}
+
+COLUMNAS_REQUERIDAS = list(COLUMNAS_EXCEL)
+
+COLUMNAS_NUMERICAS = [
+    "entradas", "venta", "tickets", "articulos",
+    "ticket_promedio", "articulos_por_ticket", "tasa_conversion"
+]
+
+# Filas por lote al leer y escribir: acota la memoria sin importar el tamaño del archivo
+TAMANO_LOTE = 5000
+
+# Columnas que se escriben en ventas; (fecha_dia, secciones) es la clave natural
+COLUMNAS_CARGA = ["fecha", "fecha_dia", "secciones"] + COLUMNAS_NUMERICAS + ["anio"]
+_COLUMNAS_VALOR = ["fecha"] + COLUMNAS_NUMERICAS + ["anio"]
+
+
+class ColumnasFaltantes(ValueError):
+    """El archivo no trae todos los encabezados requeridos"""
+
+    def __init__(self, columnas):
+        self.columnas = list(columnas)
+        super().__init__(f"El archivo debe contener: {', '.join(self.columnas)}")
+
+
+class SeccionesVacias(ValueError):
+    """Filas con fecha pero sin sección: sin clave (fecha, secciones) no se pueden cargar"""
+
+    def __init__(self, filas):
+        self.filas = filas
+        super().__init__(f"{filas} fila(s) con fecha y sin Secciones; complétalas y vuelve a cargar el archivo")
+
+
+def columnas_faltantes(columnas):
+    """Encabezados requeridos que no están en el archivo"""
+    return [col for col in COLUMNAS_REQUERIDAS if col not in columnas]
+
+
+def preparar(df, anio=None):
+    """Renombra columnas y convierte tipos de un DataFrame leído del Excel
+
+    Sin `anio`, el año de cada fila se toma de su columna Fecha. Lanza
+    SeccionesVacias si alguna fila con fecha no tiene sección.
+    """
+    df = df.rename(columns=COLUMNAS_EXCEL)
+    fechas = pd.to_datetime(df["fecha"])
+
+    # Una celda en blanco cuenta como sección vacía
+    vacias = df["secciones"].isna() | df["secciones"].astype("string").str.strip().eq("").fillna(False)
+    sin_seccion = int((vacias & fechas.notna()).sum())
+    if sin_seccion:
+        raise SeccionesVacias(sin_seccion)
+
+    df["anio"] = fechas.dt.year.astype("Int64") if anio is None else anio
+    df["fecha"] = fechas.dt.date
+
+    # Convertir tipos de datos
+    for col in COLUMNAS_NUMERICAS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def abrir_excel(archivo, anio=None, tamano_lote=TAMANO_LOTE):
+    """Abre un Excel en modo streaming y valida los encabezados una sola vez
+
+    Devuelve (filas_estimadas, lotes): lotes es un generador de DataFrames ya
+    preparados de hasta `tamano_lote` filas. Lanza ColumnasFaltantes si falta
+    algún encabezado.
+    """
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        hoja = libro.active
+        filas = hoja.iter_rows(values_only=True)
+        encabezado = [str(c) if c is not None else None for c in next(filas, ())]
+        faltan = columnas_faltantes(encabezado)
+        if faltan:
+            raise ColumnasFaltantes(faltan)
+        posiciones = [encabezado.index(c) for c in COLUMNAS_REQUERIDAS]
+        # max_row viene de las dimensiones declaradas en el archivo: es solo una estimación
+        estimadas = max((hoja.max_row or 1) - 1, 0)
+    except Exception:
+        libro.close()
+        raise
+    return estimadas, _lotes(libro, filas, posiciones, anio, tamano_lote)
+
+
+def _lotes(libro, filas, posiciones, anio, tamano_lote):
+    try:
+        lote = []
+        for fila in filas:
+            valores = [fila[i] if i < len(fila) else None for i in posiciones]
+            if all(v is None for v in valores):
+                continue
+            lote.append(valores)
+            if len(lote) >= tamano_lote:
+                yield preparar(pd.DataFrame(lote, columns=COLUMNAS_REQUERIDAS), anio)
+                lote = []
+        if lote:
+            yield preparar(pd.DataFrame(lote, columns=COLUMNAS_REQUERIDAS), anio)
+    finally:
+        libro.close()
+
+
+def _filas(df):
+    """Tuplas listas para executemany en el orden de COLUMNAS_CARGA
+
+    Lanza SeccionesVacias si alguna fila con fecha no tiene sección: SQLite
+    trata los NULL como distintos en el índice único, así que una clave sin
+    sección se duplicaría en cada recarga en lugar de actualizarse.
+    """
+    fechas = pd.to_datetime(df["fecha"])
+    dias = (fechas.dt.normalize() - pd.Timestamp(esquema.EPOCA)).dt.days
+    carga = pd.DataFrame({
+        "fecha": fechas.dt.strftime("%Y-%m-%d"),
+        "fecha_dia": dias,
+        "secciones": df["secciones"],
+        **{col: df[col] for col in COLUMNAS_NUMERICAS},
+        "anio": df["anio"],
+    })
+    carga = carga[carga["fecha_dia"].notna()]
+    sin_seccion = int(carga["secciones"].isna().sum())
+    if sin_seccion:
+        raise SeccionesVacias(sin_seccion)
+    carga = carga.astype(object)
+    carga = carga.where(carga.notna(), None)
+    return list(carga.itertuples(index=False, name=None))
+
+
+def _preparar_staging(conn):
+    """Crea (o vacía) la tabla temporal que recibe cada lote"""
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS carga_ventas (
+            fecha TEXT,
+            fecha_dia INTEGER,
+            secciones TEXT,
+            entradas INTEGER,
+            venta REAL,
+            tickets INTEGER,
+            articulos INTEGER,
+            ticket_promedio REAL,
+            articulos_por_ticket REAL,
+            tasa_conversion REAL,
+            anio INTEGER,
+            PRIMARY KEY (fecha_dia, secciones)
+        )
+    """)
+    conn.execute("DELETE FROM temp.carga_ventas")
+
+
+def _insertar_staging(conn, filas):
+    # Dentro de un mismo archivo, la última fila de cada clave es la que vale
+    conn.executemany(
+        f"INSERT OR REPLACE INTO temp.carga_ventas ({', '.join(COLUMNAS_CARGA)}) "
+        f"VALUES ({', '.join('?' * len(COLUMNAS_CARGA))})",
+        filas
+    )
+
+
+def _aplicar_staging(conn):
+    """Upsert de la tabla temporal en ventas
+
+    Devuelve (total, nuevos, actualizados, dias) donde dias son los
+    (anio, fecha_dia) cuyos resúmenes hay que recalcular.
+    """
+    distinto = " OR ".join(f"v.{c} IS NOT c.{c}" for c in _COLUMNAS_VALOR)
+    total, nuevos, actualizados = conn.execute(f"""
+        SELECT COUNT(*), SUM(v.id IS NULL), SUM(v.id IS NOT NULL AND ({distinto}))
+        FROM temp.carga_ventas c
+        LEFT JOIN ventas v ON v.fecha_dia = c.fecha_dia AND v.secciones = c.secciones
+    """).fetchone()
+
+    # Días cuyos resúmenes cambian: el del dato nuevo y, si cambió el año, el anterior
+    dias = conn.execute(f"""
+        SELECT c.anio, c.fecha_dia
+        FROM temp.carga_ventas c
+        LEFT JOIN ventas v ON v.fecha_dia = c.fecha_dia AND v.secciones = c.secciones
+        WHERE v.id IS NULL OR {distinto}
+        UNION
+        SELECT v.anio, v.fecha_dia
+        FROM temp.carga_ventas c
+        JOIN ventas v ON v.fecha_dia = c.fecha_dia AND v.secciones = c.secciones
+        WHERE v.anio IS NOT c.anio
+    """).fetchall()
+
+    asignaciones = ", ".join(f"{c} = excluded.{c}" for c in _COLUMNAS_VALOR)
+    cambio = " OR ".join(f"ventas.{c} IS NOT excluded.{c}" for c in _COLUMNAS_VALOR)
+    conn.execute(f"""
+        INSERT INTO ventas ({', '.join(COLUMNAS_CARGA)})
+        SELECT {', '.join(COLUMNAS_CARGA)} FROM temp.carga_ventas WHERE true
+        ON CONFLICT (fecha_dia, secciones) DO UPDATE SET {asignaciones}
+        WHERE {cambio}
+    """)
+
+    return total, nuevos or 0, actualizados or 0, dias
+
+
+def escribir_lote(conn, lote):
+    """Upsert de un lote preparado en su propia transacción
+
+    Las filas idénticas a las guardadas se omiten y solo se recalculan los
+    resúmenes de los días que cambiaron (y los días comparables si aparece un
+    año nuevo). Devuelve un dict con los conteos de filas nuevas, actualizadas
+    y sin cambios.
+    """
+    filas = _filas(lote)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _preparar_staging(conn)
+        _insertar_staging(conn, filas)
+        total, nuevos, actualizados, dias = _aplicar_staging(conn)
+        resumenes.reconstruir(conn, dias)
+        comparables.actualizar(conn)
+        if nuevos or actualizados:
+            esquema.marcar_cambio_datos(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    return {"nuevos": nuevos, "actualizados": actualizados, "sin_cambios": total - nuevos - actualizados}
+
+
+def _sumar_conteos(destino, conteos):
+    for clave in ("nuevos", "actualizados", "sin_cambios"):
+        destino[clave] += conteos[clave]
+
+
+def cargar_lotes(conn, lotes, al_avanzar=None):
+    """Escribe lotes de filas preparadas, una transacción por lote
+
+    Cada lote se descarta antes de leer el siguiente. Como la escritura es
+    idempotente, un archivo interrumpido se completa volviendo a cargarlo.
+    `al_avanzar(filas_procesadas)` se llama tras cada lote.
+    """
+    conteos = {"nuevos": 0, "actualizados": 0, "sin_cambios": 0}
+    procesadas = 0
+    for lote in lotes:
+        _sumar_conteos(conteos, escribir_lote(conn, lote))
+        procesadas += len(lote)
+        if al_avanzar is not None:
+            al_avanzar(procesadas)
+    return conteos
+
+
+def cargar_filas(conn, df):
+    """Inserta o actualiza un DataFrame preparado (un único lote)"""
+    return cargar_lotes(conn, [df])
+
+
+# ---------- CARGA MASIVA EN PARALELO ----------
+# Los procesos solo leen y preparan lotes; un único escritor (el proceso que
+# llama) los pasa a SQLite. La cola acotada frena a los lectores si el
+# escritor se atrasa, así la memoria no crece con el número de archivos.
+_cola_trabajador = None
+_cancelar_trabajador = None
+
+# Cada cuánto un lector bloqueado en la cola comprueba si se canceló la carga
+_ESPERA_COLA = 0.2
+
+
+class _Cancelada(Exception):
+    """El escritor abandonó la carga: el lector deja de enviar lotes"""
+
+
+def _iniciar_trabajador(cola, cancelar):
+    global _cola_trabajador, _cancelar_trabajador
+    _cola_trabajador = cola
+    _cancelar_trabajador = cancelar
+
+
+def _enviar(mensaje):
+    """put en la cola que no se queda bloqueado para siempre si el escritor se detiene"""
+    while True:
+        if _cancelar_trabajador.is_set():
+            # Lo que quede en el buffer de la cola no impide terminar el proceso
+            _cola_trabajador.cancel_join_thread()
+            raise _Cancelada()
+        try:
+            _cola_trabajador.put(mensaje, timeout=_ESPERA_COLA)
+            return
+        except queue.Full:
+            continue
+
+
+def _leer_archivo(posicion, contenido, tamano_lote):
+    """Tarea de un proceso: lee un Excel y envía sus lotes por la cola, marcados con su posición"""
+    error = None
+    try:
+        estimadas, lotes = abrir_excel(io.BytesIO(contenido), None, tamano_lote)
+        _enviar(("inicio", posicion, estimadas))
+        for lote in lotes:
+            _enviar(("lote", posicion, lote))
+    except _Cancelada:
+        return
+    except Exception as e:
+        error = str(e)
+    # El aviso de fin viaja por la misma cola, detrás del último lote
+    try:
+        _enviar(("fin", posicion, error))
+    except _Cancelada:
+        pass
+
+
+def _abortar(pool, cola, cancelar):
+    """Detiene a los lectores tras un error del escritor sin esperar a que vacíen sus archivos
+
+    Los lectores bloqueados en la cola ven la señal en cuanto se libera sitio;
+    mientras tanto se vacía la cola para que ninguno quede esperando. El
+    vaciado sigue hasta que salen los procesos: uno que ya terminó su tarea
+    aún puede tener lotes en el buffer y no sale hasta volcarlos.
+    """
+    cancelar.set()
+    pool.shutdown(wait=False, cancel_futures=True)
+    cierre = threading.Thread(target=pool.shutdown, kwargs={"wait": True}, daemon=True)
+    cierre.start()
+    while cierre.is_alive():
+        try:
+            cola.get(timeout=_ESPERA_COLA)
+        except queue.Empty:
+            pass
+
+
+def _nombres_unicos(nombres):
+    """Nombres para mostrar: los repetidos llevan " (2)", " (3)"... según su orden"""
+    usados = set()
+    unicos = []
+    for nombre in nombres:
+        unico, n = nombre, 1
+        while unico in usados:
+            n += 1
+            unico = f"{nombre} ({n})"
+        usados.add(unico)
+        unicos.append(unico)
+    return unicos
+
+
+def cargar_archivos(conn, archivos, procesos=None, tamano_lote=TAMANO_LOTE, al_avanzar=None, espera_maxima=None):
+    """Carga varios Excel leyéndolos en paralelo y escribiendo desde un solo hilo
+
+    `archivos` es una lista de (nombre, bytes). El año se toma de la columna
+    Fecha. `al_avanzar(procesadas, estimadas)` recibe el total acumulado.
+    Con `espera_maxima` (segundos), si los lectores pasan ese tiempo sin
+    enviar nada la carga se detiene con TimeoutError.
+    Devuelve {nombre: {"nuevos", "actualizados", "sin_cambios", "anios", "error"}};
+    un archivo con error no impide cargar los demás. Internamente cada archivo
+    se identifica por su posición: dos archivos con el mismo nombre se cargan
+    por separado y el segundo aparece como "nombre (2)".
+    """
+    resultados = [
+        {"nuevos": 0, "actualizados": 0, "sin_cambios": 0, "anios": set(), "error": None}
+        for _ in archivos
+    ]
+    nombres = _nombres_unicos([nombre for nombre, _ in archivos])
+    if not archivos:
+        return {}
+
+    procesos = procesos or min(len(archivos), os.cpu_count() or 1)
+    estimadas = {}
+    procesadas = 0
+
+    def registrar(posicion, lote):
+        nonlocal procesadas
+        _sumar_conteos(resultados[posicion], escribir_lote(conn, lote))
+        resultados[posicion]["anios"].update(int(a) for a in lote["anio"].dropna().unique())
+        procesadas += len(lote)
+        if al_avanzar is not None:
+            al_avanzar(procesadas, sum(estimadas.values()))
+
+    if procesos == 1:
+        # Sin paralelismo posible no compensa arrancar procesos
+        for posicion, (_, contenido) in enumerate(archivos):
+            try:
+                estimadas[posicion], lotes = abrir_excel(io.BytesIO(contenido), None, tamano_lote)
+                for lote in lotes:
+                    registrar(posicion, lote)
+            except sqlite3.Error:
+                # Los fallos de escritura no son del archivo: se propagan
+                raise
+            except Exception as e:
+                resultados[posicion]["error"] = str(e)
+        return dict(zip(nombres, resultados))
+
+    contexto = multiprocessing.get_context("spawn")
+    cola = contexto.Queue(maxsize=2 * procesos)
+    cancelar = contexto.Event()
+
+    # Sin `with`: ante un error del escritor, salir del bloque esperaría a
+    # lectores bloqueados en la cola llena
+    pool = ProcessPoolExecutor(max_workers=procesos, mp_context=contexto,
+                               initializer=_iniciar_trabajador, initargs=(cola, cancelar))
+    futuros = {}
+    try:
+        futuros = {
+            pool.submit(_leer_archivo, posicion, contenido, tamano_lote): posicion
+            for posicion, (_, contenido) in enumerate(archivos)
+        }
+        pendientes = set(range(len(archivos)))
+        ultimo_mensaje = time.monotonic()
+
+        while pendientes:
+            try:
+                tipo, posicion, dato = cola.get(timeout=0.5)
+                ultimo_mensaje = time.monotonic()
+            except queue.Empty:
+                if espera_maxima is not None and time.monotonic() - ultimo_mensaje > espera_maxima:
+                    raise TimeoutError(f"Los lectores no enviaron datos en {espera_maxima:g} s")
+                # Un proceso caído no llega a enviar su aviso de fin
+                for futuro, posicion in futuros.items():
+                    if posicion in pendientes and futuro.done() and futuro.exception() is not None:
+                        resultados[posicion]["error"] = str(futuro.exception())
+                        pendientes.discard(posicion)
+                continue
+
+            if tipo == "inicio":
+                estimadas[posicion] = dato
+            elif tipo == "lote":
+                # Como en la carga secuencial: tras el primer lote con error se
+                # descarta el resto del archivo
+                if resultados[posicion]["error"] is None:
+                    try:
+                        registrar(posicion, dato)
+                    except sqlite3.Error:
+                        raise
+                    except Exception as e:
+                        resultados[posicion]["error"] = str(e)
+            else:
+                resultados[posicion]["error"] = resultados[posicion]["error"] or dato
+                pendientes.discard(posicion)
+    except BaseException:
+        _abortar(pool, cola, cancelar)
+        raise
+    pool.shutdown(wait=True)
+
+    return dict(zip(nombres, resultados))
@@ -0,0 +1,66 @@
+"""Indicadores de un corte de ventas (año, período, secciones) calculados en una sola pasada"""
+from dataclasses import dataclass
+
+# Métricas que se suman; la tasa de conversión se promedia por fila
+_SUMAS = ["venta", "entradas", "tickets", "articulos"]
+
+# Columnas que lee calcular(): las cargas pueden pedir solo estas
+COLUMNAS = ["fecha"] + _SUMAS + ["tasa_conversion"]
+
+
+@dataclass(frozen=True)
+class Kpis:
+    """Totales y medias de un corte; los derivados se calculan sin volver a los datos"""
+
+    filas: int = 0
+    dias: int = 0
+    venta: float = 0.0
+    entradas: float = 0.0
+    tickets: float = 0.0
+    articulos: float = 0.0
+    tasa_conversion: float = float("nan")
+
+    @property
+    def vacio(self):
+        return self.filas == 0
+
+    @property
+    def ticket_promedio(self):
+        """Venta por ticket (0 si no hay tickets)"""
+        return self.venta / self.tickets if self.tickets > 0 else 0.0
+
+    @property
+    def promedio_diario(self):
+        """Venta por día con datos (0 si no hay días)"""
+        return self.venta / self.dias if self.dias > 0 else 0.0
+
+
+def calcular(df):
+    """Kpis de las filas de ventas recibidas (una suma por bloque de columnas)"""
+    if df.empty:
+        return Kpis()
+    totales = df[_SUMAS].sum()
+    return Kpis(
+        filas=len(df),
+        dias=int(df["fecha"].dt.normalize().nunique()),
+        venta=float(totales["venta"]),
+        entradas=float(totales["entradas"]),
+        tickets=float(totales["tickets"]),
+        articulos=float(totales["articulos"]),
+        tasa_conversion=float(df["tasa_conversion"].mean()),
+    )
+
+
+def variacion(actual, base):
+    """Variación porcentual de `actual` sobre `base`; None si la base no es positiva"""
+    return (actual - base) / base * 100 if base > 0 else None
+
+
+def presupuesto(venta_base, crecimiento):
+    """Objetivo de venta: la base más `crecimiento` por ciento"""
+    return venta_base * (1 + crecimiento / 100)
+
+
+def cumplimiento(real, objetivo):
+    """Porcentaje de `objetivo` alcanzado; 0 si el objetivo no es positivo"""
+    return real / objetivo * 100 if objetivo > 0 else 0
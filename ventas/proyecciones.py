@@ -0,0 +1,117 @@
+"""Proyección de venta por día a partir del día comparable del año anterior"""
+from dataclasses import dataclass
+
+import pandas as pd
+
+from ventas import comparables
+
+
+def historial(df):
+    """Venta diaria total (todas las secciones) por año y fecha
+
+    Es lo único que necesita la proyección: se calcula una vez por carga de
+    datos y después cualquier rango de fechas se proyecta con un join.
+    """
+    if df.empty:
+        return pd.DataFrame({
+            "anio": pd.Series(dtype="int64"),
+            "fecha": pd.Series(dtype="datetime64[us]"),
+            "venta": pd.Series(dtype="float64"),
+        })
+    return (
+        df.assign(fecha=df["fecha"].dt.normalize())
+        .groupby(["anio", "fecha"], sort=True)["venta"].sum()
+        .reset_index()
+    )
+
+
+def crecimiento_anual(historial, anios):
+    """Total, total del año anterior y crecimiento real de cada año pedido"""
+    totales = historial.groupby("anio")["venta"].sum()
+    anios = pd.Index(sorted(set(int(a) for a in anios)), name="anio")
+    total = totales.reindex(anios, fill_value=0.0).to_numpy()
+    anterior = totales.reindex(anios - 1, fill_value=0.0).to_numpy()
+    resultado = pd.DataFrame({"total": total, "total_anterior": anterior}, index=anios)
+    resultado["crecimiento"] = (
+        (resultado["total"] - resultado["total_anterior"])
+        / resultado["total_anterior"].where(resultado["total_anterior"] > 0)
+    ).fillna(0.0)
+    return resultado
+
+
+def proyectar(historial, comparables, ambicion=0):
+    """Proyección de cada día en una sola pasada
+
+    `comparables` es un DataFrame (fecha, fecha_comparable), p. ej. el de
+    comparables.del_anio_anterior(). Sin venta en el día comparable, la venta
+    y las proyecciones quedan en NaN. El crecimiento es el del año calendario
+    del día proyectado.
+    """
+    venta_diaria = historial.groupby("fecha")["venta"].sum().rename("venta_comparable")
+    destino = comparables.join(venta_diaria, on="fecha_comparable")
+    destino["anio"] = destino["fecha"].dt.year
+
+    crecimiento = crecimiento_anual(historial, destino["anio"].unique())["crecimiento"]
+    destino["crecimiento"] = destino["anio"].map(crecimiento)
+
+    base = destino["venta_comparable"]
+    destino["proyeccion"] = base * (1 + destino["crecimiento"])
+    destino["meta"] = destino["proyeccion"] * (1 + ambicion / 100)
+    destino["conservador"] = base * (1 + destino["crecimiento"] * 0.5)
+    destino["agresivo"] = base * (1 + destino["crecimiento"] * 1.5)
+    return destino
+
+
+@dataclass(frozen=True)
+class TotalesAnuales:
+    """Acumulados hasta hoy, cierre proyectado y presupuesto del año objetivo"""
+
+    limite_anterior: pd.Timestamp
+    hoy: pd.Timestamp
+    acumulado_anterior: float
+    acumulado_actual: float
+    proyeccion_anual: float
+    presupuesto_anual: float
+
+    @property
+    def cumplimiento(self):
+        """Cierre proyectado como porcentaje del presupuesto (0 sin presupuesto)"""
+        return self.proyeccion_anual / self.presupuesto_anual * 100 if self.presupuesto_anual > 0 else 0
+
+    @property
+    def progreso(self):
+        """Fracción del presupuesto ya vendida, tope 1"""
+        return min(self.acumulado_actual / self.presupuesto_anual, 1.0) if self.presupuesto_anual > 0 else 0
+
+
+def totales_anuales(indice_fechas, fecha_proyectar, total_anterior, crecimiento, hoy=None):
+    """Totales del año de `fecha_proyectar` frente al anterior
+
+    `indice_fechas` es un IndiceFechas con ambos años. El año anterior se
+    acumula hasta el mismo día que `fecha_proyectar`; el actual, hasta `hoy`,
+    y se proyecta al 31/12 con su promedio diario. El presupuesto es el total
+    del año anterior más el crecimiento (en valor absoluto).
+    """
+    fecha_proyectar = pd.Timestamp(fecha_proyectar)
+    hoy = pd.Timestamp.now() if hoy is None else pd.Timestamp(hoy)
+    anio_objetivo = fecha_proyectar.year
+    anio_anterior = anio_objetivo - 1
+
+    limite_anterior = pd.Timestamp(comparables.equivalente_calendario(fecha_proyectar, anio_anterior))
+    acumulado_anterior = indice_fechas.rango(anio_anterior, fecha_fin=limite_anterior)["venta"].sum()
+    acumulado_actual = indice_fechas.rango(anio_objetivo, fecha_fin=hoy)["venta"].sum()
+
+    dias_restantes = (pd.Timestamp(year=anio_objetivo, month=12, day=31) - hoy).days
+    if dias_restantes > 0:
+        proyeccion_anual = acumulado_actual + acumulado_actual / hoy.day_of_year * dias_restantes
+    else:
+        proyeccion_anual = acumulado_actual
+
+    return TotalesAnuales(
+        limite_anterior=limite_anterior,
+        hoy=hoy,
+        acumulado_anterior=float(acumulado_anterior),
+        acumulado_actual=float(acumulado_actual),
+        proyeccion_anual=float(proyeccion_anual),
+        presupuesto_anual=float(total_anterior * (1 + abs(crecimiento))),
+    )
@@ -0,0 +1,109 @@
+"""Tramos de tiempo con nombre por ejecución de la página, para el panel de rendimiento y los logs"""
+import functools
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger("ventas.rendimiento")
+
+
+def configurar_log(nivel=logging.INFO):
+    """Envía los registros de rendimiento a stderr, una línea JSON por evento (idempotente)"""
+    if not logger.handlers:
+        manejador = logging.StreamHandler(sys.stderr)
+        manejador.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(manejador)
+        logger.propagate = False
+    logger.setLevel(nivel)
+
+
+def memoria_maxima_mb():
+    """Pico de memoria residente del proceso en MB (None si no se puede medir)"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KiB y macOS en bytes
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Tramo:
+    """Un tramo medido: nombre, duración y los datos que se le anoten"""
+
+    def __init__(self, nombre, **datos):
+        self.nombre = nombre
+        self.datos = datos
+        self.ms = None
+
+    def anotar(self, df=None, **datos):
+        """Añade filas y memoria de `df` (sin recorrer objetos) y cualquier otro dato"""
+        if df is not None:
+            self.datos["filas"] = len(df)
+            self.datos["memoria_kb"] = round(df.memory_usage(index=False).sum() / 1024, 1)
+        self.datos.update(datos)
+
+    def como_dict(self):
+        return {"tramo": self.nombre, "ms": round(self.ms, 3) if self.ms is not None else None, **self.datos}
+
+
+class Medicion:
+    """Tramos de una ejecución; `emitir()` la cierra y escribe el resumen en el log
+
+    Los tramos que terminan después de cerrar (p. ej. al volver a ejecutar solo
+    un fragmento) se escriben en el log uno a uno.
+    """
+
+    def __init__(self, **contexto):
+        self.contexto = contexto
+        self.tramos = []
+        self.cerrada = False
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def tramo(self, nombre, **datos):
+        tramo = Tramo(nombre, **datos)
+        inicio = time.perf_counter()
+        try:
+            yield tramo
+        finally:
+            tramo.ms = (time.perf_counter() - inicio) * 1000
+            if self.cerrada:
+                logger.info(json.dumps({"evento": "tramo", **self.contexto, **tramo.como_dict()}, default=str))
+            else:
+                self.tramos.append(tramo)
+
+    def medir(self, nombre):
+        """Decorador: mide cada llamada a la función como un tramo"""
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                with self.tramo(nombre):
+                    return funcion(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    def total_ms(self):
+        return (time.perf_counter() - self._inicio) * 1000
+
+    def filas(self):
+        """Tramos como lista de dicts, en orden de cierre"""
+        return [tramo.como_dict() for tramo in self.tramos]
+
+    def emitir(self):
+        """Cierra la medición y escribe un evento con todos sus tramos"""
+        if self.cerrada:
+            return
+        self.cerrada = True
+        logger.info(json.dumps({
+            "evento": "ejecucion",
+            **self.contexto,
+            "total_ms": round(self.total_ms(), 3),
+            "memoria_max_mb": memoria_maxima_mb(),
+            "tramos": self.filas(),
+        }, default=str))
@@ -0,0 +1,139 @@
+"""Tablas de resumen diario y mensual mantenidas al cargar datos"""
+import pandas as pd
+
+# Métricas que se suman tal cual y métricas de las que se guarda suma y conteo
+# (no nulos) para poder reconstruir la media exacta de las filas originales.
+SUMAS = ["venta", "entradas", "tickets", "articulos"]
+MEDIAS = ["ticket_promedio", "articulos_por_ticket", "tasa_conversion"]
+
+COLUMNAS_RESUMEN = SUMAS + ["n_filas"] + [
+    c for m in MEDIAS for c in (f"suma_{m}", f"n_{m}")
+]
+
+# Expresiones SQL sobre fecha_dia (días desde 1970-01-01)
+_SQL_MES = "CAST(strftime('%m', {col} * 86400, 'unixepoch') AS INTEGER)"
+_SQL_MES_DIA = "CAST(julianday(date({col} * 86400, 'unixepoch', 'start of month')) - 2440587.5 AS INTEGER)"
+_SQL_MES_FIN_DIA = ("CAST(julianday(date({col} * 86400, 'unixepoch', 'start of month', '+1 month', '-1 day'))"
+                    " - 2440587.5 AS INTEGER)")
+
+_SQL_AGREGADOS_FILAS = ", ".join(
+    [f"SUM({c})" for c in SUMAS] + ["COUNT(*)"]
+    + [e for m in MEDIAS for e in (f"SUM({m})", f"COUNT({m})")]
+)
+_SQL_AGREGADOS_RESUMEN = ", ".join(f"SUM({c})" for c in COLUMNAS_RESUMEN)
+_SQL_COLUMNAS_RESUMEN = ", ".join(COLUMNAS_RESUMEN)
+
+
+def crear_tablas(conn):
+    """Crea las tablas de resumen si no existen"""
+    definicion = ",\n".join(
+        f"{c} {'INTEGER' if c.startswith('n_') or c in ('entradas', 'tickets', 'articulos') else 'REAL'}"
+        for c in COLUMNAS_RESUMEN
+    )
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS resumen_diario (
+            anio INTEGER,
+            fecha_dia INTEGER,
+            secciones TEXT,
+            mes INTEGER,
+            mes_dia INTEGER,
+            mes_fin_dia INTEGER,
+            {definicion},
+            PRIMARY KEY (anio, fecha_dia, secciones)
+        ) WITHOUT ROWID
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS resumen_mensual (
+            anio INTEGER,
+            mes_dia INTEGER,
+            secciones TEXT,
+            mes INTEGER,
+            mes_fin_dia INTEGER,
+            {definicion},
+            PRIMARY KEY (anio, mes_dia, secciones)
+        ) WITHOUT ROWID
+    """)
+
+
+def _insertar_diario(conn, filtro=""):
+    # La clave primaria (WITHOUT ROWID) no admite nulos: filas antiguas sin
+    # sección o sin año quedan fuera de los resúmenes
+    conn.execute(f"""
+        INSERT INTO resumen_diario (anio, fecha_dia, secciones, mes, mes_dia, mes_fin_dia, {_SQL_COLUMNAS_RESUMEN})
+        SELECT anio, fecha_dia, secciones,
+               {_SQL_MES.format(col="fecha_dia")},
+               {_SQL_MES_DIA.format(col="fecha_dia")},
+               {_SQL_MES_FIN_DIA.format(col="fecha_dia")},
+               {_SQL_AGREGADOS_FILAS}
+        FROM ventas
+        WHERE fecha_dia IS NOT NULL AND secciones IS NOT NULL AND anio IS NOT NULL {filtro}
+        GROUP BY anio, fecha_dia, secciones
+    """)
+
+
+def _insertar_mensual(conn, where=""):
+    conn.execute(f"""
+        INSERT INTO resumen_mensual (anio, mes_dia, secciones, mes, mes_fin_dia, {_SQL_COLUMNAS_RESUMEN})
+        SELECT anio, mes_dia, secciones, mes, mes_fin_dia, {_SQL_AGREGADOS_RESUMEN}
+        FROM resumen_diario
+        {where}
+        GROUP BY anio, mes_dia, secciones
+    """)
+
+
+def reconstruir(conn, dias=None):
+    """Recalcula los resúmenes; con `dias` [(anio, fecha_dia), ...] solo los afectados
+
+    No hace commit: debe ir dentro de la transacción de la escritura.
+    """
+    if dias is None:
+        conn.execute("DELETE FROM resumen_diario")
+        conn.execute("DELETE FROM resumen_mensual")
+        _insertar_diario(conn)
+        _insertar_mensual(conn)
+        return
+
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS dias_afectados (anio INTEGER, fecha_dia INTEGER, PRIMARY KEY (anio, fecha_dia))")
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS meses_afectados (anio INTEGER, mes_dia INTEGER, PRIMARY KEY (anio, mes_dia))")
+    conn.execute("DELETE FROM temp.dias_afectados")
+    conn.execute("DELETE FROM temp.meses_afectados")
+    conn.executemany(
+        "INSERT OR IGNORE INTO temp.dias_afectados (anio, fecha_dia) VALUES (?, ?)",
+        ((int(a), int(d)) for a, d in dias)
+    )
+    conn.execute(f"""
+        INSERT OR IGNORE INTO temp.meses_afectados (anio, mes_dia)
+        SELECT anio, {_SQL_MES_DIA.format(col="fecha_dia")} FROM temp.dias_afectados
+    """)
+
+    conn.execute("DELETE FROM resumen_diario WHERE (anio, fecha_dia) IN (SELECT anio, fecha_dia FROM temp.dias_afectados)")
+    _insertar_diario(conn, "AND (anio, fecha_dia) IN (SELECT anio, fecha_dia FROM temp.dias_afectados)")
+
+    conn.execute("DELETE FROM resumen_mensual WHERE (anio, mes_dia) IN (SELECT anio, mes_dia FROM temp.meses_afectados)")
+    _insertar_mensual(conn, "WHERE (anio, mes_dia) IN (SELECT anio, mes_dia FROM temp.meses_afectados)")
+
+
+def agregar(resumen, por, columnas):
+    """Agrupa filas de resumen; las medias se calculan como suma / conteo"""
+    necesarias = []
+    for c in columnas:
+        necesarias += [f"suma_{c}", f"n_{c}"] if c in MEDIAS else [c]
+
+    agrupado = resumen.groupby(por, observed=True)[necesarias].sum().reset_index()
+    for c in columnas:
+        if c in MEDIAS:
+            conteo = agrupado[f"n_{c}"]
+            agrupado[c] = agrupado[f"suma_{c}"] / conteo.where(conteo > 0)
+            agrupado = agrupado.drop(columns=[f"suma_{c}", f"n_{c}"])
+    return agrupado
+
+
+def media(resumen, columna):
+    """Media de una métrica sobre todas las filas originales del resumen"""
+    conteo = resumen[f"n_{columna}"].sum()
+    return resumen[f"suma_{columna}"].sum() / conteo if conteo > 0 else float("nan")
+
+
+def vacio():
+    """DataFrame de resumen sin filas"""
+    return pd.DataFrame(columns=["anio", "mes", "secciones"] + COLUMNAS_RESUMEN)
@@ -0,0 +1,80 @@
+"""Series temporales para gráficos: acumulados, curvas de presupuesto y reducción de puntos"""
+import numpy as np
+import pandas as pd
+
+
+def acumulada(df):
+    """Venta diaria total y su acumulado, ordenados por fecha"""
+    diaria = df.groupby("fecha")["venta"].sum().reset_index().sort_values("fecha")
+    diaria["venta_acum"] = diaria["venta"].cumsum()
+    return diaria
+
+
+def dias_rango(fechas):
+    """Días de calendario entre la primera y la última fecha (ordenadas), ambas incluidas"""
+    if len(fechas) == 0:
+        return 0
+    return (fechas.iloc[-1] - fechas.iloc[0]).days + 1
+
+
+def ritmo_final(acumulada, dias_totales):
+    """Venta al cabo de `dias_totales` si se mantiene el promedio de los días con datos"""
+    if acumulada.empty:
+        return 0.0
+    return acumulada["venta_acum"].iloc[-1] / len(acumulada) * dias_totales
+
+
+def curva_presupuesto(fechas, total):
+    """Presupuesto acumulado lineal: `total` repartido por igual en los días del rango de `fechas`"""
+    fechas = pd.Series(fechas).reset_index(drop=True)
+    if fechas.empty:
+        return pd.DataFrame({"fecha": fechas, "venta_acum": pd.Series(dtype="float64")})
+    dias = dias_rango(fechas)
+    diario = total / dias if dias > 0 else 0
+    return pd.DataFrame({
+        "fecha": fechas,
+        "venta_acum": diario * np.arange(1, len(fechas) + 1),
+    })
+
+
+def lttb(x, y, puntos):
+    """Índices de los puntos que conserva Largest-Triangle-Three-Buckets
+
+    Mantiene el primero y el último y, de cada tramo intermedio, el punto que
+    forma el triángulo de mayor área con el elegido antes y el promedio del
+    tramo siguiente: conserva picos y cambios de pendiente.
+    """
+    n = len(y)
+    if puntos >= n or puntos < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    # puntos - 2 tramos que cubren [1, n - 1); el último punto cierra la serie
+    bordes = np.linspace(1, n - 1, puntos - 1).astype(np.int64)
+    indices = np.empty(puntos, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+
+    elegido = 0
+    for i in range(puntos - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        siguiente_fin = bordes[i + 2] if i + 2 < len(bordes) else n
+        media_x = x[fin:siguiente_fin].mean()
+        media_y = y[fin:siguiente_fin].mean()
+        areas = np.abs(
+            (x[elegido] - media_x) * (y[inicio:fin] - y[elegido])
+            - (x[elegido] - x[inicio:fin]) * (media_y - y[elegido])
+        )
+        elegido = inicio + int(np.argmax(areas))
+        indices[i + 1] = elegido
+    return indices
+
+
+def reducir(df, puntos, x="fecha", y="venta_acum"):
+    """Filas de `df` elegidas por LTTB para no superar `puntos` (None: sin límite)"""
+    if puntos is None or len(df) <= puntos:
+        return df
+    eje_x = df[x].to_numpy()
+    if np.issubdtype(eje_x.dtype, np.datetime64):
+        eje_x = eje_x.astype("datetime64[s]").astype(np.int64)
+    return df.iloc[lttb(eje_x, df[y].to_numpy(), puntos)]
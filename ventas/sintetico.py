@@ -0,0 +1,102 @@
+"""Ventas sintéticas con los encabezados del Excel, para pruebas de rendimiento a cualquier escala"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from ventas import ingesta
+
+SECCIONES = [
+    "Hombre", "Mujer", "Niños", "Calzado", "Accesorios",
+    "Hogar", "Deportes", "Belleza", "Electrónica", "Juguetes",
+]
+
+# Afluencia relativa de lunes a domingo
+_PESO_DIA_SEMANA = np.array([0.8, 0.85, 0.9, 0.95, 1.1, 1.35, 1.2])
+
+
+def nombres_secciones(secciones=3, tiendas=1):
+    """Nombres de sección; con varias tiendas cada una tiene las suyas ("Hombre T001")
+
+    La clave de la tabla es (fecha, sección): las tiendas se distinguen en el nombre.
+    """
+    base = [SECCIONES[i] if i < len(SECCIONES) else f"Sección {i + 1}" for i in range(secciones)]
+    if tiendas == 1:
+        return base
+    return [f"{seccion} T{tienda:03d}" for tienda in range(1, tiendas + 1) for seccion in base]
+
+
+def filas_estimadas(anios, secciones=3, tiendas=1, dias=None):
+    """Filas que generará `lotes()` con los mismos parámetros"""
+    total_dias = sum(
+        dias if dias is not None else (date(anio, 12, 31) - date(anio, 1, 1)).days + 1
+        for anio in anios
+    )
+    return total_dias * secciones * tiendas
+
+
+def tiendas_para(filas, anios, secciones=3):
+    """Tiendas necesarias para llegar al menos a `filas` con años completos"""
+    por_tienda = filas_estimadas(anios, secciones)
+    return max(1, -(-filas // por_tienda))
+
+
+def lotes(anios, secciones=3, tiendas=1, dias=None, semilla=0, tamano_lote=100_000):
+    """DataFrames con las columnas de ingesta.COLUMNAS_REQUERIDAS, de hasta `tamano_lote` filas
+
+    Una fila por día y sección de cada tienda; `dias` limita cada año a sus
+    primeros días (None: año completo). Con la misma semilla los datos son
+    siempre los mismos.
+    """
+    generador = np.random.default_rng(semilla)
+    nombres = np.array(nombres_secciones(secciones, tiendas), dtype=object)
+    # Tamaño relativo de cada sección, fijo para toda la serie
+    escala = generador.uniform(0.5, 1.5, len(nombres))
+    dias_por_lote = max(1, tamano_lote // len(nombres))
+
+    for anio in anios:
+        fechas = pd.date_range(date(anio, 1, 1), date(anio, 12, 31), freq="D")
+        if dias is not None:
+            fechas = fechas[:dias]
+        # Tendencia anual suave para que haya crecimiento entre años
+        tendencia = 1 + 0.06 * (anio - anios[0])
+        for inicio in range(0, len(fechas), dias_por_lote):
+            bloque = fechas[inicio:inicio + dias_por_lote]
+            yield _bloque(generador, bloque, nombres, escala, tendencia)
+
+
+def _bloque(generador, fechas, nombres, escala, tendencia):
+    n = len(fechas) * len(nombres)
+    peso = np.repeat(_PESO_DIA_SEMANA[fechas.dayofweek] * tendencia, len(nombres)) * np.tile(escala, len(fechas))
+
+    entradas = generador.poisson(300 * peso) + 1
+    tickets = generador.binomial(entradas, generador.uniform(0.15, 0.45, n))
+    articulos = tickets * generador.integers(1, 4, n)
+    venta = tickets * generador.gamma(9.0, 5.0, n)
+
+    con_tickets = tickets > 0
+    return pd.DataFrame({
+        "Fecha": np.repeat(fechas.to_numpy(), len(nombres)),
+        "Secciones": np.tile(nombres, len(fechas)),
+        "Entradas": entradas,
+        "Venta": venta.round(2),
+        "Tickets": tickets,
+        "Artículos": articulos,
+        "Ticket promedio": np.where(con_tickets, venta / np.maximum(tickets, 1), 0.0).round(2),
+        "Artículos por ticket": np.where(con_tickets, articulos / np.maximum(tickets, 1), 0.0).round(2),
+        "Tasa de conversión": (tickets / entradas * 100).round(2),
+    })[ingesta.COLUMNAS_REQUERIDAS]
+
+
+def generar(anios, secciones=3, tiendas=1, dias=None, semilla=0):
+    """Todas las filas en un solo DataFrame (para escalas que caben en memoria)"""
+    return pd.concat(list(lotes(anios, secciones, tiendas, dias, semilla)), ignore_index=True)
+
+
+def poblar(conn, anios, secciones=3, tiendas=1, dias=None, semilla=0, tamano_lote=100_000, al_avanzar=None):
+    """Escribe las ventas generadas con la misma ruta que una carga de Excel
+
+    La base debe estar migrada. Devuelve los conteos de ingesta.cargar_lotes.
+    """
+    preparados = (ingesta.preparar(lote) for lote in lotes(anios, secciones, tiendas, dias, semilla, tamano_lote))
+    return ingesta.cargar_lotes(conn, preparados, al_avanzar)
@@ -0,0 +1,225 @@
+"""Cola persistente de cargas de Excel procesada por un hilo en segundo plano"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from ventas import ingesta
+
+ESTADOS_ACTIVOS = ("en_cola", "en_curso")
+
+# Un trabajo en curso sin latido durante este tiempo se da por abandonado
+# (proceso reiniciado) y se vuelve a tomar; la carga es idempotente.
+ABANDONO_SEGUNDOS = 300
+
+# Tiempo máximo sin recibir lotes de los lectores antes de dar el trabajo por
+# fallido; menor que ABANDONO_SEGUNDOS para que lo cierre el propio trabajador
+ESPERA_LOTE_SEGUNDOS = 120
+
+# Frecuencia máxima con la que se guarda el progreso en la tabla
+_INTERVALO_PROGRESO = 1.0
+
+
+def encolar(conn, archivos, directorio):
+    """Guarda los archivos en disco y registra un trabajo en cola; devuelve su id
+
+    `archivos` es una lista de (nombre, bytes).
+    """
+    ruta = os.path.join(directorio, uuid.uuid4().hex)
+    os.makedirs(ruta)
+    nombres = []
+    for i, (nombre, contenido) in enumerate(archivos):
+        # Prefijo numérico: dos archivos con el mismo nombre no se pisan
+        destino = f"{i:03d}_{os.path.basename(nombre)}"
+        with open(os.path.join(ruta, destino), "wb") as f:
+            f.write(contenido)
+        nombres.append([nombre, destino])
+
+    cursor = conn.execute(
+        "INSERT INTO trabajos_carga (estado, ruta, archivos, creado) VALUES ('en_cola', ?, ?, ?)",
+        (ruta, json.dumps(nombres), time.time())
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+
+def tomar(conn):
+    """Reclama el trabajo pendiente más antiguo; devuelve (id, ruta, archivos) o None"""
+    ahora = time.time()
+    fila = conn.execute("""
+        UPDATE trabajos_carga
+        SET estado = 'en_curso', iniciado = ?, actualizado = ?, filas_procesadas = 0
+        WHERE id = (
+            SELECT id FROM trabajos_carga
+            WHERE estado = 'en_cola' OR (estado = 'en_curso' AND actualizado < ?)
+            ORDER BY id
+            LIMIT 1
+        )
+        RETURNING id, ruta, archivos
+    """, (ahora, ahora, ahora - ABANDONO_SEGUNDOS)).fetchone()
+    conn.commit()
+    if fila is None:
+        return None
+    return fila[0], fila[1], json.loads(fila[2])
+
+
+def registrar_progreso(conn, trabajo_id, procesadas, estimadas):
+    """Actualiza el avance y el latido de un trabajo en curso"""
+    conn.execute(
+        "UPDATE trabajos_carga SET filas_procesadas = ?, filas_estimadas = ?, actualizado = ? WHERE id = ?",
+        (procesadas, estimadas, time.time(), trabajo_id)
+    )
+    conn.commit()
+
+
+def finalizar(conn, trabajo_id, resultados=None, error=None):
+    """Marca el trabajo como terminado o fallido con sus conteos y duración"""
+    resultados = resultados or {}
+    totales = {
+        clave: sum(r[clave] for r in resultados.values())
+        for clave in ("nuevos", "actualizados", "sin_cambios")
+    }
+    errores = [f"{nombre}: {r['error']}" for nombre, r in resultados.items() if r["error"]]
+    if error is None and errores:
+        error = "; ".join(errores)
+    # Fallido si hubo excepción o si ningún archivo se pudo cargar
+    fallido = error is not None and (not resultados or len(errores) == len(resultados))
+
+    ahora = time.time()
+    detalle = {
+        nombre: {**r, "anios": sorted(r["anios"])} for nombre, r in resultados.items()
+    }
+    conn.execute("""
+        UPDATE trabajos_carga
+        SET estado = ?, terminado = ?, actualizado = ?, duracion = ? - iniciado,
+            nuevos = ?, actualizados = ?, sin_cambios = ?, resultado = ?, error = ?
+        WHERE id = ?
+    """, (
+        "fallido" if fallido else "terminado", ahora, ahora, ahora,
+        totales["nuevos"], totales["actualizados"], totales["sin_cambios"],
+        json.dumps(detalle), error, trabajo_id
+    ))
+    conn.commit()
+
+
+def listar(conn, limite=10):
+    """Últimos trabajos de carga como lista de dicts (el más reciente primero)"""
+    cursor = conn.execute("""
+        SELECT id, estado, archivos, creado, iniciado, terminado, duracion,
+               filas_estimadas, filas_procesadas, nuevos, actualizados, sin_cambios,
+               resultado, error
+        FROM trabajos_carga
+        ORDER BY id DESC
+        LIMIT ?
+    """, (limite,))
+    columnas = [d[0] for d in cursor.description]
+    trabajos = []
+    for fila in cursor.fetchall():
+        trabajo = dict(zip(columnas, fila))
+        trabajo["archivos"] = [nombre for nombre, _ in json.loads(trabajo["archivos"])]
+        trabajo["resultado"] = json.loads(trabajo["resultado"]) if trabajo["resultado"] else {}
+        trabajos.append(trabajo)
+    return trabajos
+
+
+def hay_activos(conn):
+    """True si queda algún trabajo en cola o en curso"""
+    return conn.execute(
+        f"SELECT 1 FROM trabajos_carga WHERE estado IN ({', '.join('?' * len(ESTADOS_ACTIVOS))}) LIMIT 1",
+        ESTADOS_ACTIVOS
+    ).fetchone() is not None
+
+
+def ejecutar(conn, trabajo_id, ruta, archivos, procesos=None):
+    """Procesa un trabajo ya reclamado y deja su resultado en la tabla"""
+    ultimo = 0.0
+
+    def avanzar(procesadas, estimadas):
+        nonlocal ultimo
+        if time.time() - ultimo >= _INTERVALO_PROGRESO:
+            registrar_progreso(conn, trabajo_id, procesadas, estimadas)
+            ultimo = time.time()
+
+    try:
+        contenidos = []
+        for nombre, destino in archivos:
+            with open(os.path.join(ruta, destino), "rb") as f:
+                contenidos.append((nombre, f.read()))
+        resultados = ingesta.cargar_archivos(
+            conn, contenidos, procesos=procesos, al_avanzar=avanzar, espera_maxima=ESPERA_LOTE_SEGUNDOS
+        )
+    except Exception as e:
+        if conn.in_transaction:
+            conn.rollback()
+        finalizar(conn, trabajo_id, error=str(e))
+    else:
+        finalizar(conn, trabajo_id, resultados)
+    finally:
+        shutil.rmtree(ruta, ignore_errors=True)
+
+
+class Trabajador:
+    """Hilo de fondo que atiende la cola de cargas mientras vive el proceso
+
+    `al_terminar(conn)` se llama tras cada trabajo, p. ej. para poner al día
+    una réplica de lectura; si falla no cambia el estado del trabajo.
+    """
+
+    def __init__(self, pool, intervalo=2.0, procesos=None, al_terminar=None):
+        self.pool = pool
+        self.intervalo = intervalo
+        self.procesos = procesos
+        self.al_terminar = al_terminar
+        self._aviso = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="trabajador-cargas", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def despertar(self):
+        """Avisa de un trabajo nuevo para no esperar al siguiente sondeo"""
+        self._aviso.set()
+
+    def detener(self):
+        self._detener.set()
+        self._aviso.set()
+        self._hilo.join()
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            trabajo = None
+            try:
+                with self.pool.conexion() as conn:
+                    trabajo = tomar(conn)
+                    if trabajo is not None:
+                        ejecutar(conn, *trabajo, procesos=self.procesos)
+                        self._despues(conn)
+                        continue
+            except Exception as e:
+                # La base puede estar ocupada o en migración: reintentar luego.
+                # Un trabajo ya reclamado no se deja "en curso" hasta que otro lo abandone
+                if trabajo is not None:
+                    self._marcar_fallido(trabajo[0], e)
+            self._aviso.wait(self.intervalo)
+            self._aviso.clear()
+
+    def _despues(self, conn):
+        if self.al_terminar is None:
+            return
+        try:
+            self.al_terminar(conn)
+        except Exception:
+            # Se reintenta tras el próximo trabajo
+            pass
+
+    def _marcar_fallido(self, trabajo_id, error):
+        try:
+            with self.pool.conexion() as conn:
+                finalizar(conn, trabajo_id, error=str(error))
+        except Exception:
+            # Sin base disponible queda en curso y se retoma tras ABANDONO_SEGUNDOS
+            pass
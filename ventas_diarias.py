@@ -3,10 +3,8 @@ import pandas as pd
 import sqlite3
 from datetime import datetime, timedelta
 import os
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import calendar
+
+from ventas import almacen, analisis, cache, comparables, conexion, consultas, esquema, figuras, indice, kpis, proyecciones, rendimiento, resumenes, series, trabajos
 
 st.set_page_config(
     page_title="Comparador de Ventas Diarias", 
@@ -14,6 +12,10 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Tiempos de esta ejecución: panel "⏱️ Rendimiento" y una línea JSON por ejecución en el log
+rendimiento.configurar_log()
+medicion = rendimiento.Medicion(almacen=os.environ.get("VENTAS_ALMACEN", "sqlite"))
+
 # Custom CSS para mejor apariencia
 st.markdown("""
 <style>
@@ -82,141 +84,383 @@ st.markdown("""
 
 # ---------- DB ----------
 DB_DIR = "data"
-if not os.path.exists(DB_DIR):
-    os.makedirs(DB_DIR)
-
 DB_PATH = os.path.join(DB_DIR, "ventas.db")
 
+# Almacén de lectura de filas: "sqlite" (por defecto) o "parquet" (réplica por año)
+ALMACEN = os.environ.get("VENTAS_ALMACEN", "sqlite")
+
+# Puntos máximos por trazo en los gráficos de series largas (reducción LTTB)
+PUNTOS_GRAFICO = int(os.environ.get("VENTAS_PUNTOS_GRAFICO", "500"))
+
+# Figuras serializadas que se conservan entre ejecuciones (LRU)
+MAX_FIGURAS = 64
+
+# Columnas de ventas que usa la página fuera de la tabla de detalle (paginada en SQL)
+COLUMNAS_FILAS = ["anio", "secciones"] + kpis.COLUMNAS
+
+@st.cache_resource(show_spinner=False)
+def obtener_pool():
+    """Pool de conexiones (WAL) compartido por todas las sesiones del proceso"""
+    os.makedirs(DB_DIR, exist_ok=True)
+    return conexion.PoolConexiones(DB_PATH)
+
+@st.cache_resource(show_spinner=False)
+def obtener_almacen():
+    """Almacén de lectura configurado, compartido por todas las sesiones"""
+    return almacen.crear(ALMACEN, os.path.join(DB_DIR, "parquet"))
+
+def sincronizar_almacen(conn, tienda=None):
+    """Pone al día la réplica de lectura, si la hay, después de escribir
+
+    Si falla no se interrumpe nada: mientras tanto los años atrasados se leen de SQLite.
+    """
+    tienda = obtener_almacen() if tienda is None else tienda
+    if not hasattr(tienda, "sincronizar"):
+        return
+    try:
+        tienda.sincronizar(conn)
+    except Exception:
+        pass
+
 def conectar():
-    """Establece conexión con la base de datos"""
+    """Presta una conexión del pool compartido; usar como `with conectar() as conn:`"""
+    return obtener_pool().conexion()
+
+def eliminar_tabla_existente():
+    """Elimina la tabla si existe para recrearla con la nueva estructura"""
+    try:
+        with conectar() as conn:
+            conn.execute("DROP TABLE IF EXISTS ventas")
+            conn.commit()
+    except sqlite3.Error as e:
+        st.error(f"Error al eliminar tabla: {e}")
+
+def crear_tabla():
+    """Crea la tabla o migra en sitio una base existente a la última estructura"""
+    try:
+        with conectar() as conn:
+            esquema.migrar(conn)
+    except sqlite3.Error as e:
+        st.error(f"Error al crear la tabla: {e}")
+
+@st.cache_resource(show_spinner=False)
+def _migrar_al_iniciar():
+    with conectar() as conn:
+        esquema.migrar(conn)
+        sincronizar_almacen(conn)
+
+def preparar_base():
+    """Crea o migra la base una sola vez por proceso; si falla se reintenta en la próxima ejecución"""
+    try:
+        _migrar_al_iniciar()
+    except sqlite3.Error as e:
+        st.error(f"Error al crear la tabla: {e}")
+
+preparar_base()
+
+# Las consultas se guardan en una caché de proceso compartida por todas las
+# sesiones. La versión de datos forma parte de la clave, así que una escritura
+# (también desde otro proceso) deja las entradas anteriores sin uso.
+# Los DataFrames devueltos son compartidos: no modificarlos en sitio.
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _consultar_anio(version, anio):
+    # Un frame por año con todas las secciones: la caché crece con los años
+    # consultados y no con las combinaciones de secciones, que se filtran en memoria.
+    # Mismas categorías de sección en todos los frames para concatenarlos sin copiar a object.
+    # El índice se construye una vez por entrada de caché, no en cada ejecución.
+    categorias = _consultar_catalogo(version)["secciones"]
+    with conectar() as conn:
+        return indice.cargar(obtener_almacen(), conn, anio, categorias=categorias, columnas=COLUMNAS_FILAS)
+
+def _consultar_anios(version, anios):
+    """Índice de varios años armado con los frames cacheados de cada uno"""
+    indices = [_consultar_anio(version, int(a)) for a in sorted(set(anios))]
+    if len(indices) == 1:
+        return indices[0]
+    # Un año vacío no trae el tipo categórico: concatenarlo pasaría secciones a object
+    llenos = [i for i in indices if not i.df.empty]
+    if len(llenos) <= 1:
+        return llenos[0] if llenos else indice.IndiceFechas(pd.DataFrame())
+    return indice.IndiceFechas(pd.concat([i.df for i in llenos], ignore_index=True))
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def _consultar_resumen(version, anio, fecha_inicio, fecha_fin, secciones):
+    with conectar() as conn:
+        return consultas.cargar_resumen(conn, anio, fecha_inicio, fecha_fin, secciones)
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _consultar_catalogo(version):
+    with conectar() as conn:
+        return consultas.catalogo(conn)
+
+def obtener_version_datos():
+    """Versión actual de los datos (una lectura mínima por ejecución)"""
     try:
-        conn = sqlite3.connect(DB_PATH, timeout=10)
-        return conn
+        with conectar() as conn:
+            return esquema.version_datos(conn)
     except sqlite3.Error as e:
-        st.error(f"Error de conexión a la base de datos: {e}")
+        st.error(f"Error al leer la versión de datos: {e}")
         return None
 
-def eliminar_tabla_existente():
-    """Elimina la tabla si existe para recrearla con la nueva estructura"""
-    conn = conectar()
-    if conn is not None:
+def cargar_indice(anio=None):
+    """Filas de uno o varios años (todos si es None), con todas las secciones, y su índice por año y fecha"""
+    with medicion.tramo("carga", anio=anio) as tramo:
         try:
-            c = conn.cursor()
-            c.execute("DROP TABLE IF EXISTS ventas")
-            conn.commit()
+            if anio is None:
+                anios = _consultar_catalogo(version_datos)["anios"]
+            else:
+                anios = list(anio) if hasattr(anio, "__iter__") else [anio]
+            indice_fechas = _consultar_anios(version_datos, anios)
+        except sqlite3.Error as e:
+            st.error(f"Error al cargar datos: {e}")
+            indice_fechas = indice.IndiceFechas(pd.DataFrame())
+        tramo.anotar(indice_fechas.df)
+    return indice_fechas
+
+def filtrar_secciones(df, secciones):
+    """Filas de las secciones elegidas (None: todas), en el mismo orden"""
+    if secciones is None or df.empty:
+        return df
+    return df[df["secciones"].isin(secciones)]
+
+def cargar_datos(anio=None, fecha_inicio=None, fecha_fin=None, secciones=None):
+    """Filas que cumplen los filtros, cortadas del año cacheado"""
+    return filtrar_secciones(cargar_indice(anio).rango(None, fecha_inicio, fecha_fin), secciones)
+
+def cargar_periodo(anio, fecha_inicio, fecha_fin, secciones=None):
+    """Filas de un año y período: el año se lee (y cachea) entero y el período se corta por búsqueda binaria"""
+    indice_anio = cargar_indice(anio)
+    with medicion.tramo("filtro", anio=anio) as tramo:
+        df = filtrar_secciones(indice_anio.rango(anio, fecha_inicio, fecha_fin), secciones)
+        tramo.anotar(df)
+    return df
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _consultar_historial(version, anios):
+    return proyecciones.historial(_consultar_anios(version, anios).df)
+
+def cargar_historial(anios):
+    """Venta diaria con claves ISO de los años pedidos, para proyectar"""
+    with medicion.tramo("historial") as tramo:
+        try:
+            historial = _consultar_historial(version_datos, list(anios))
+        except sqlite3.Error as e:
+            st.error(f"Error al cargar datos: {e}")
+            historial = proyecciones.historial(pd.DataFrame())
+        tramo.anotar(historial)
+    return historial
+
+def cargar_comparables(fecha_inicio, fecha_fin):
+    """Día comparable del año anterior (misma semana y día ISO) de cada fecha del rango"""
+    try:
+        with conectar() as conn:
+            return comparables.del_anio_anterior(conn, fecha_inicio, fecha_fin)
+    except sqlite3.Error as e:
+        st.error(f"Error al leer los días comparables: {e}")
+        return comparables.del_anio_anterior(None, fecha_inicio, fecha_fin)
+
+FILAS_POR_PAGINA = 100
+
+def contar_registros(periodos, secciones=None):
+    """Número de filas de los períodos (anio, fecha_inicio, fecha_fin)"""
+    try:
+        with conectar() as conn:
+            return consultas.contar_periodos(conn, periodos, secciones)
+    except sqlite3.Error as e:
+        st.error(f"Error al cargar datos: {e}")
+        return 0
+
+def cargar_pagina(periodos, secciones, pagina):
+    """Una página de filas de los períodos, de la más reciente a la más antigua"""
+    with medicion.tramo("pagina", pagina=pagina) as tramo:
+        try:
+            with conectar() as conn:
+                df = consultas.pagina_periodos(conn, periodos, secciones, pagina, FILAS_POR_PAGINA)
         except sqlite3.Error as e:
-            st.error(f"Error al eliminar tabla: {e}")
-        finally:
-            conn.close()
+            st.error(f"Error al cargar datos: {e}")
+            df = pd.DataFrame()
+        tramo.anotar(df)
+    return df
 
-def crear_tabla():
-    """Crea la tabla con la nueva estructura"""
-    conn = conectar()
-    if conn is not None:
+def cargar_resumen(anio=None, fecha_inicio=None, fecha_fin=None, secciones=None):
+    """Totales pre-agregados por año, mes y sección del período"""
+    with medicion.tramo("resumen", anio=anio) as tramo:
         try:
-            c = conn.cursor()
-            c.execute("""
-                CREATE TABLE IF NOT EXISTS ventas (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    fecha TEXT,
-                    secciones TEXT,
-                    entradas INTEGER,
-                    venta REAL,
-                    tickets INTEGER,
-                    articulos INTEGER,
-                    ticket_promedio REAL,
-                    articulos_por_ticket REAL,
-                    tasa_conversion REAL,
-                    anio INTEGER
-                )
-            """)
-            conn.commit()
+            resumen = _consultar_resumen(version_datos, anio, fecha_inicio, fecha_fin, secciones)
         except sqlite3.Error as e:
-            st.error(f"Error al crear la tabla: {e}")
-        finally:
-            conn.close()
+            st.error(f"Error al cargar datos: {e}")
+            resumen = resumenes.vacio()
+        tramo.anotar(resumen)
+    return resumen
+
+def cargar_catalogo():
+    """Años, secciones y rangos de fechas disponibles, sin leer las filas"""
+    try:
+        with medicion.tramo("catalogo"):
+            return _consultar_catalogo(version_datos)
+    except sqlite3.Error as e:
+        st.error(f"Error al cargar datos: {e}")
+        return {"anios": [], "secciones": [], "rango": (None, None), "rango_anio": {}}
 
-# Crear tabla al iniciar
-crear_tabla()
+def registrar_cambio_datos():
+    """Sube la versión de datos tras una escritura y vacía las cachés de este proceso"""
+    try:
+        with conectar() as conn:
+            esquema.marcar_cambio_datos(conn)
+            conn.commit()
+            sincronizar_almacen(conn)
+    except sqlite3.Error as e:
+        st.error(f"Error al registrar el cambio: {e}")
+    limpiar_caches()
+
+@st.cache_resource(show_spinner=False)
+def obtener_cache_figuras():
+    """Figuras ya construidas, compartidas por todas las sesiones del proceso"""
+    return figuras.CacheFiguras(MAX_FIGURAS)
+
+def mostrar_figura(nombre, estado, construir):
+    """Dibuja la figura `nombre`; `construir()` solo se llama si cambió `estado` o los datos"""
+    clave = cache.huella(nombre, version_datos, estado)
+    with medicion.tramo(f"grafico.{nombre}", cache="acierto") as tramo:
+        def construir_medido():
+            tramo.anotar(cache="fallo")
+            return construir()
+        figura = obtener_cache_figuras().obtener(clave, construir_medido)
+    # Plotly valida y serializa la figura al dibujarla
+    with medicion.tramo(f"plotly.{nombre}"):
+        st.plotly_chart(figura, use_container_width=True)
+
+def limpiar_caches():
+    """Vacía las cachés de consultas de este proceso"""
+    _consultar_anio.clear()
+    _consultar_resumen.clear()
+    _consultar_catalogo.clear()
+    _consultar_historial.clear()
+    obtener_cache_figuras().limpiar()
+
+# ---------- CARGAS EN SEGUNDO PLANO ----------
+DIR_CARGAS = os.path.join(DB_DIR, "cargas")
+
+@st.cache_resource(show_spinner=False)
+def obtener_trabajador():
+    """Hilo que procesa la cola de cargas, uno por proceso del servidor"""
+    # El hilo no usa las cachés de Streamlit: recibe el almacén ya creado
+    tienda = obtener_almacen()
+    return trabajos.Trabajador(
+        obtener_pool(), al_terminar=lambda conn: sincronizar_almacen(conn, tienda)
+    ).iniciar()
+
+obtener_trabajador()
+
+if "trabajos_sesion" not in st.session_state:
+    st.session_state.trabajos_sesion = []
+    st.session_state.trabajos_notificados = set()
+
+def listar_trabajos():
+    """Últimos trabajos de carga registrados en la base"""
+    try:
+        with conectar() as conn:
+            return trabajos.listar(conn, limite=5)
+    except sqlite3.Error as e:
+        st.error(f"Error al leer las cargas: {e}")
+        return []
+
+def hay_trabajos_activos():
+    """True si hay cargas en cola o en curso (de cualquier sesión)"""
+    try:
+        with conectar() as conn:
+            return trabajos.hay_activos(conn)
+    except sqlite3.Error:
+        return False
+
+def mostrar_trabajo(trabajo):
+    """Estado de un trabajo de carga"""
+    nombres = ", ".join(trabajo["archivos"])
+    if trabajo["estado"] == "en_cola":
+        st.info(f"⏳ Carga #{trabajo['id']} en cola: {nombres}")
+    elif trabajo["estado"] == "en_curso":
+        procesadas, estimadas = trabajo["filas_procesadas"], trabajo["filas_estimadas"]
+        progreso = min(procesadas / estimadas, 1.0) if estimadas else 0.0
+        st.progress(
+            progreso,
+            text=f"Carga #{trabajo['id']} ({nombres}): procesadas {procesadas:,} de ~{estimadas:,} filas"
+        )
+    elif trabajo["estado"] == "fallido":
+        st.error(f"❌ Carga #{trabajo['id']} ({nombres}): {trabajo['error']}")
+    else:
+        st.success(
+            f"✅ Carga #{trabajo['id']} ({nombres}): {trabajo['nuevos']} nuevos, "
+            f"{trabajo['actualizados']} actualizados, {trabajo['sin_cambios']} sin cambios "
+            f"en {trabajo['duracion']:.1f} s"
+        )
+        if trabajo["error"]:
+            st.warning(f"Archivos con errores: {trabajo['error']}")
+
+def _panel_cargas(avisar=True):
+    lista = listar_trabajos()
+    for trabajo in lista:
+        mostrar_trabajo(trabajo)
+
+    # Avisar una sola vez de las cargas de esta sesión que ya terminaron
+    for trabajo in lista if avisar else []:
+        if (trabajo["id"] in st.session_state.trabajos_sesion
+                and trabajo["estado"] == "terminado"
+                and trabajo["id"] not in st.session_state.trabajos_notificados):
+            st.session_state.trabajos_notificados.add(trabajo["id"])
+            if trabajo["nuevos"] or trabajo["actualizados"]:
+                st.balloons()
+    return any(t["estado"] in trabajos.ESTADOS_ACTIVOS for t in lista)
+
+@st.fragment
+def panel_cargas():
+    """Estado de las últimas cargas, sin sondeo"""
+    _panel_cargas()
+
+@st.fragment(run_every=2)
+def panel_cargas_en_vivo():
+    """Estado de las cargas refrescado cada pocos segundos mientras haya alguna activa"""
+    if not _panel_cargas(avisar=False):
+        # Terminó la última: recargar el tablero con los datos nuevos
+        limpiar_caches()
+        st.rerun()
 
 # ---------- CARGA ----------
 st.title("📊 Comparador de Ventas Diarias")
 st.markdown("### Análisis Comparativo con Presupuesto +15%")
 
 with st.expander("📤 Cargar Excel", expanded=False):
-    col_upload1, col_upload2 = st.columns([2, 1])
-    with col_upload1:
-        archivo = st.file_uploader("Sube archivo Excel", type=["xlsx"])
-    with col_upload2:
-        anio = st.number_input("Año:", 
-                              min_value=2000, 
-                              max_value=2100, 
-                              value=datetime.now().year,
-                              step=1)
-
-    if archivo and st.button("📥 Guardar datos", use_container_width=True):
+    archivos = st.file_uploader(
+        "Sube uno o varios archivos Excel",
+        type=["xlsx"],
+        accept_multiple_files=True,
+        help="El año de cada fila se toma de su columna Fecha"
+    )
+
+    if archivos and st.button("📥 Guardar datos", use_container_width=True):
         try:
-            df = pd.read_excel(archivo)
+            # Se encola y se procesa en segundo plano; el tablero sigue usable
+            with conectar() as conn:
+                trabajo_id = trabajos.encolar(
+                    conn,
+                    [(a.name, a.getvalue()) for a in archivos],
+                    DIR_CARGAS
+                )
+            obtener_trabajador().despertar()
+            st.session_state.trabajos_sesion.append(trabajo_id)
+        except (OSError, sqlite3.Error) as e:
+            st.error(f"Error al encolar la carga: {e}")
 
-            columnas_requeridas = ["Fecha", "Secciones", "Entradas", "Venta", 
-                                  "Tickets", "Artículos", "Ticket promedio", 
-                                  "Artículos por ticket", "Tasa de conversión"]
-            
-            columnas_faltantes = [col for col in columnas_requeridas if col not in df.columns]
-            
-            if columnas_faltantes:
-                st.error(f"El archivo debe contener: {', '.join(columnas_faltantes)}")
-            else:
-                df = df.rename(columns={
-                    "Fecha": "fecha",
-                    "Secciones": "secciones",
-                    "Entradas": "entradas",
-                    "Venta": "venta",
-                    "Tickets": "tickets",
-                    "Artículos": "articulos",
-                    "Ticket promedio": "ticket_promedio",
-                    "Artículos por ticket": "articulos_por_ticket",
-                    "Tasa de conversión": "tasa_conversion"
-                })
-                
-                df["anio"] = anio
-                df["fecha"] = pd.to_datetime(df["fecha"]).dt.date
-                
-                # Convertir tipos de datos
-                for col in ["entradas", "venta", "tickets", "articulos", 
-                           "ticket_promedio", "articulos_por_ticket", "tasa_conversion"]:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-                
-                conn = conectar()
-                if conn is not None:
-                    df.to_sql("ventas", conn, if_exists="append", index=False)
-                    conn.close()
-                    st.success(f"✅ Datos del año {anio} cargados correctamente ({len(df)} registros)")
-                    st.balloons()
-                    
-        except Exception as e:
-            st.error(f"Error al cargar el archivo: {e}")
+    if hay_trabajos_activos():
+        panel_cargas_en_vivo()
+    else:
+        panel_cargas()
 
 # ---------- CONSULTAS ----------
-def cargar_datos():
-    """Carga todos los datos de la base de datos"""
-    conn = conectar()
-    if conn is not None:
-        try:
-            df = pd.read_sql("SELECT * FROM ventas", conn)
-            # Convertir fecha a datetime
-            df["fecha"] = pd.to_datetime(df["fecha"])
-            return df
-        except sqlite3.Error as e:
-            st.error(f"Error al cargar datos: {e}")
-            return pd.DataFrame()
-        finally:
-            conn.close()
-    return pd.DataFrame()
+version_datos = obtener_version_datos()
 
-df = cargar_datos()
+catalogo = cargar_catalogo()
 
-if df.empty:
+if not catalogo["anios"]:
     st.warning("⚠️ Aún no hay datos cargados")
     st.stop()
 
@@ -225,7 +469,7 @@ with st.sidebar:
     st.markdown("### ⚙️ Configuración")
     
     # Años disponibles
-    años_disponibles = sorted(df["anio"].unique(), reverse=True)
+    años_disponibles = catalogo["anios"]
     
     if len(años_disponibles) == 0:
         st.warning("No hay años disponibles")
@@ -264,7 +508,7 @@ with st.sidebar:
     
     # Filtro de secciones (común para ambos años)
     st.markdown("#### 🏷️ Secciones")
-    secciones = sorted(df["secciones"].unique())
+    secciones = catalogo["secciones"]
     secciones_seleccionadas = st.multiselect(
         "Selecciona secciones",
         options=secciones,
@@ -280,10 +524,10 @@ with st.sidebar:
         
         # Filtros para año base
         st.markdown(f"**{año_base}**")
-        df_base_year = df[df["anio"] == año_base]
-        if not df_base_year.empty:
-            min_fecha_base = df_base_year["fecha"].min().date()
-            max_fecha_base = df_base_year["fecha"].max().date()
+        min_fecha_base, max_fecha_base = catalogo["rango_anio"].get(año_base, (None, None))
+        if min_fecha_base is not None:
+            min_fecha_base = min_fecha_base.date()
+            max_fecha_base = max_fecha_base.date()
             
             col_fecha_base1, col_fecha_base2 = st.columns(2)
             with col_fecha_base1:
@@ -322,10 +566,10 @@ with st.sidebar:
         
         # Filtros para año comparar
         st.markdown(f"**{año_comparar}**")
-        df_comp_year = df[df["anio"] == año_comparar]
-        if not df_comp_year.empty:
-            min_fecha_comp = df_comp_year["fecha"].min().date()
-            max_fecha_comp = df_comp_year["fecha"].max().date()
+        min_fecha_comp, max_fecha_comp = catalogo["rango_anio"].get(año_comparar, (None, None))
+        if min_fecha_comp is not None:
+            min_fecha_comp = min_fecha_comp.date()
+            max_fecha_comp = max_fecha_comp.date()
             
             col_fecha_comp1, col_fecha_comp2 = st.columns(2)
             with col_fecha_comp1:
@@ -365,8 +609,8 @@ with st.sidebar:
         st.markdown("#### 📅 Período común")
         
         # Preparar fechas globales
-        fecha_min = df["fecha"].min().date()
-        fecha_max = df["fecha"].max().date()
+        fecha_min = catalogo["rango"][0].date()
+        fecha_max = catalogo["rango"][1].date()
         
         col_fecha1, col_fecha2 = st.columns(2)
         with col_fecha1:
@@ -396,21 +640,10 @@ with st.sidebar:
         # Calcular fechas equivalentes en año base
         dias_en_rango = (fecha_fin - fecha_inicio).days + 1
         
-        try:
-            fecha_inicio_base = fecha_inicio.replace(year=año_base)
-            fecha_fin_base = fecha_fin.replace(year=año_base)
-        except ValueError:
-            # Manejar 29 de febrero
+        fecha_inicio_base, fecha_fin_base, ajustado = analisis.periodo_equivalente(fecha_inicio, fecha_fin, año_base)
+        if ajustado:
+            # 29 de febrero en un año no bisiesto
             st.warning("Ajustando fechas para año no bisiesto")
-            if fecha_inicio.month == 2 and fecha_inicio.day == 29:
-                fecha_inicio_base = fecha_inicio.replace(year=año_base, month=2, day=28)
-            else:
-                fecha_inicio_base = fecha_inicio.replace(year=año_base)
-            
-            if fecha_fin.month == 2 and fecha_fin.day == 29:
-                fecha_fin_base = fecha_fin.replace(year=año_base, month=2, day=28)
-            else:
-                fecha_fin_base = fecha_fin.replace(year=año_base)
     
     st.markdown("---")
     
@@ -451,49 +684,42 @@ with st.sidebar:
     st.markdown(filter_html, unsafe_allow_html=True)
 
 # ---------- APLICAR FILTROS ----------
+# El año se lee de la base una vez con todas sus secciones; período y secciones
+# se cortan en memoria, así cambiar esos filtros no vuelve a consultar la base
 if filtros_independientes:
     # Filtrar con períodos independientes
     if fecha_inicio_base_dt is not None and fecha_fin_base_dt is not None:
-        datos_base = df[
-            (df["anio"] == año_base) &
-            (df["fecha"] >= fecha_inicio_base_dt) &
-            (df["fecha"] <= fecha_fin_base_dt) &
-            (df["secciones"].isin(secciones_seleccionadas))
-        ]
+        periodo_base = (año_base, fecha_inicio_base_dt, fecha_fin_base_dt)
+        datos_base = cargar_periodo(año_base, fecha_inicio_base_dt, fecha_fin_base_dt, secciones_seleccionadas)
+        resumen_base = cargar_resumen(año_base, fecha_inicio_base_dt, fecha_fin_base_dt, secciones_seleccionadas)
         periodo_desc_base = f"{fecha_inicio_base.strftime('%d/%m/%Y')} - {fecha_fin_base.strftime('%d/%m/%Y')}"
     else:
+        periodo_base = None
         datos_base = pd.DataFrame()
+        resumen_base = resumenes.vacio()
         periodo_desc_base = "sin datos"
     
     if fecha_inicio_comp_dt is not None and fecha_fin_comp_dt is not None:
-        datos_comparar = df[
-            (df["anio"] == año_comparar) &
-            (df["fecha"] >= fecha_inicio_comp_dt) &
-            (df["fecha"] <= fecha_fin_comp_dt) &
-            (df["secciones"].isin(secciones_seleccionadas))
-        ]
+        periodo_comp = (año_comparar, fecha_inicio_comp_dt, fecha_fin_comp_dt)
+        datos_comparar = cargar_periodo(año_comparar, fecha_inicio_comp_dt, fecha_fin_comp_dt, secciones_seleccionadas)
+        resumen_comparar = cargar_resumen(año_comparar, fecha_inicio_comp_dt, fecha_fin_comp_dt, secciones_seleccionadas)
         periodo_desc_comp = f"{fecha_inicio_comp.strftime('%d/%m/%Y')} - {fecha_fin_comp.strftime('%d/%m/%Y')}"
     else:
+        periodo_comp = None
         datos_comparar = pd.DataFrame()
+        resumen_comparar = resumenes.vacio()
         periodo_desc_comp = "sin datos"
     
     periodo_desc = f"Períodos independientes: {año_base} ({periodo_desc_base}) vs {año_comparar} ({periodo_desc_comp})"
     
 else:
     # Filtrar con mismo período
-    datos_base = df[
-        (df["anio"] == año_base) & 
-        (df["fecha"] >= fecha_inicio_base) &
-        (df["fecha"] <= fecha_fin_base) &
-        (df["secciones"].isin(secciones_seleccionadas))
-    ]
-    
-    datos_comparar = df[
-        (df["anio"] == año_comparar) & 
-        (df["fecha"] >= fecha_inicio) &
-        (df["fecha"] <= fecha_fin) &
-        (df["secciones"].isin(secciones_seleccionadas))
-    ]
+    periodo_base = (año_base, fecha_inicio_base, fecha_fin_base)
+    periodo_comp = (año_comparar, fecha_inicio, fecha_fin)
+    datos_base = cargar_periodo(*periodo_base, secciones_seleccionadas)
+    datos_comparar = cargar_periodo(*periodo_comp, secciones_seleccionadas)
+    resumen_base = cargar_resumen(año_base, fecha_inicio_base, fecha_fin_base, secciones_seleccionadas)
+    resumen_comparar = cargar_resumen(año_comparar, fecha_inicio, fecha_fin, secciones_seleccionadas)
     
     if dias_en_rango == 1:
         periodo_desc = f"día {fecha_inicio.strftime('%d/%m/%Y')}"
@@ -507,48 +733,43 @@ if datos_base.empty and datos_comparar.empty:
     st.warning("No hay datos para los períodos seleccionados")
     st.stop()
 
+# Indicadores de cada corte, calculados una vez y reutilizados en toda la página
+with medicion.tramo("kpis"):
+    kpis_base = kpis.calcular(datos_base)
+    kpis_comp = kpis.calcular(datos_comparar)
+dias_base, dias_comp = kpis_base.dias, kpis_comp.dias
+
 # Mostrar información de registros
 col_reg1, col_reg2 = st.columns(2)
 with col_reg1:
-    if not datos_base.empty:
-        dias_base = datos_base['fecha'].dt.date.nunique()
-        st.info(f"📅 **{año_base}:** {len(datos_base)} registros • {dias_base} días con datos")
+    if not kpis_base.vacio:
+        st.info(f"📅 **{año_base}:** {kpis_base.filas} registros • {dias_base} días con datos")
     else:
         st.warning(f"⚠️ No hay datos para {año_base} en el período seleccionado")
 
 with col_reg2:
-    if not datos_comparar.empty:
-        dias_comp = datos_comparar['fecha'].dt.date.nunique()
-        st.info(f"📅 **{año_comparar}:** {len(datos_comparar)} registros • {dias_comp} días con datos")
+    if not kpis_comp.vacio:
+        st.info(f"📅 **{año_comparar}:** {kpis_comp.filas} registros • {dias_comp} días con datos")
     else:
         st.warning(f"⚠️ No hay datos para {año_comparar} en el período seleccionado")
 
 # Calcular métricas si hay datos en ambos años
 if not datos_base.empty and not datos_comparar.empty:
-    ventas_base = datos_base["venta"].sum()
-    ventas_comp = datos_comparar["venta"].sum()
-    entradas_base = datos_base["entradas"].sum()
-    entradas_comp = datos_comparar["entradas"].sum()
-    
-    tickets_base = datos_base["tickets"].sum()
-    tickets_comp = datos_comparar["tickets"].sum()
-    
-    ticket_base = ventas_base / tickets_base if tickets_base > 0 else 0
-    ticket_comp = ventas_comp / tickets_comp if tickets_comp > 0 else 0
-    
-    tasa_base = datos_base["tasa_conversion"].mean()
-    tasa_comp = datos_comparar["tasa_conversion"].mean()
+    ventas_base, ventas_comp = kpis_base.venta, kpis_comp.venta
+    entradas_base, entradas_comp = kpis_base.entradas, kpis_comp.entradas
+    ticket_base, ticket_comp = kpis_base.ticket_promedio, kpis_comp.ticket_promedio
+    tasa_base, tasa_comp = kpis_base.tasa_conversion, kpis_comp.tasa_conversion
     
     # Calcular presupuesto con crecimiento
     if mostrar_presupuesto:
-        presupuesto = ventas_base * (1 + crecimiento_presupuesto / 100)
-        cumplimiento_presupuesto = (ventas_comp / presupuesto * 100) if presupuesto > 0 else 0
+        presupuesto = kpis.presupuesto(ventas_base, crecimiento_presupuesto)
+        cumplimiento_presupuesto = kpis.cumplimiento(ventas_comp, presupuesto)
     
     # Crear KPIs
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        delta = ((ventas_comp - ventas_base)/ventas_base*100) if ventas_base > 0 else None
+        delta = kpis.variacion(ventas_comp, ventas_base)
         st.markdown(f"""
         <div class="metric-card">
             <h3 style="color: #666; font-size: 0.9rem; margin: 0;">Ventas {año_comparar}</h3>
@@ -561,7 +782,7 @@ if not datos_base.empty and not datos_comparar.empty:
         """, unsafe_allow_html=True)
     
     with col2:
-        delta = ((entradas_comp - entradas_base)/entradas_base*100) if entradas_base > 0 else None
+        delta = kpis.variacion(entradas_comp, entradas_base)
         st.markdown(f"""
         <div class="metric-card">
             <h3 style="color: #666; font-size: 0.9rem; margin: 0;">Entradas {año_comparar}</h3>
@@ -574,7 +795,7 @@ if not datos_base.empty and not datos_comparar.empty:
         """, unsafe_allow_html=True)
     
     with col3:
-        delta = ((ticket_comp - ticket_base)/ticket_base*100) if ticket_base > 0 else None
+        delta = kpis.variacion(ticket_comp, ticket_base)
         st.markdown(f"""
         <div class="metric-card">
             <h3 style="color: #666; font-size: 0.9rem; margin: 0;">Ticket Prom. {año_comparar}</h3>
@@ -645,358 +866,358 @@ if not datos_base.empty and not datos_comparar.empty:
             st.warning(f"📉 Estás {100 - cumplimiento_presupuesto:.1f}% por debajo del presupuesto")
 
 # ---------- GRÁFICOS EXISTENTES ----------
+# Plotly se importa recién aquí: sin datos (o solo cargando archivos) la página no lo necesita
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
 st.markdown(f'<div class="section-title">📊 Análisis Visual</div>', unsafe_allow_html=True)
 
+# Lo que determina las figuras de los gráficos: cada una añade sus propios controles
+estado_graficos = (año_base, año_comparar, periodo_base, periodo_comp, tuple(secciones_seleccionadas))
+
 if not datos_base.empty and not datos_comparar.empty:
     # Preparar datos para gráficos
-    # Combinar datos de ambos años para los gráficos que necesitan vista anual
-    df_plot = pd.concat([datos_base, datos_comparar])
-    df_plot['mes'] = df_plot['fecha'].dt.month
-    df_plot['año_str'] = df_plot['anio'].astype(str)
-    
-    # Diccionario de meses en español
-    meses_es = {
-        1: 'Enero', 2: 'Febrero', 3: 'Marzo', 4: 'Abril', 5: 'Mayo', 6: 'Junio',
-        7: 'Julio', 8: 'Agosto', 9: 'Septiembre', 10: 'Octubre', 11: 'Noviembre', 12: 'Diciembre'
-    }
-    df_plot['mes_nombre'] = df_plot['mes'].map(meses_es)
-    
-    # Gráfico 1: Evolución mensual comparativa
-    df_mensual = df_plot.groupby(['mes', 'mes_nombre', 'anio'])['venta'].sum().reset_index()
-    df_mensual = df_mensual.sort_values('mes')
-    
-    fig1 = go.Figure()
-    
-    for año in [año_base, año_comparar]:
-        df_año = df_mensual[df_mensual['anio'] == año]
-        if not df_año.empty:
-            color = '#1f77b4' if año == año_base else '#ff7f0e'
-            nombre = f"Año {año}"
+    # Combinar resúmenes de ambos años (ya agregados por año, mes y sección)
+    with medicion.tramo("agregacion.df_plot") as tramo:
+        df_plot = analisis.tabla_graficos(resumen_base, resumen_comparar)
+        tramo.anotar(df_plot)
+    
+    def figura_mensual():
+        # Gráfico 1: Evolución mensual comparativa
+        df_mensual = analisis.ventas_mensuales(df_plot)
+    
+        fig1 = go.Figure()
+    
+        for año in [año_base, año_comparar]:
+            df_año = df_mensual[df_mensual['anio'] == año]
+            if not df_año.empty:
+                color = '#1f77b4' if año == año_base else '#ff7f0e'
+                nombre = f"Año {año}"
             
-            fig1.add_trace(go.Scatter(
-                x=df_año['mes_nombre'],
-                y=df_año['venta'],
-                mode='lines+markers+text',
-                name=nombre,
-                line=dict(color=color, width=3),
-                marker=dict(size=10, symbol='circle'),
-                text=df_año['venta'].apply(lambda x: f'${x/1e6:.1f}M'),
-                textposition='top center',
-                textfont=dict(size=10, color=color),
-                hovertemplate='<b>%{x}</b><br>' +
-                             'Ventas: $%{y:,.0f}<br>' +
-                             '<extra>%{fullData.name}</extra>'
-            ))
+                fig1.add_trace(go.Scatter(
+                    x=df_año['mes_nombre'],
+                    y=df_año['venta'],
+                    mode='lines+markers+text',
+                    name=nombre,
+                    line=dict(color=color, width=3),
+                    marker=dict(size=10, symbol='circle'),
+                    text=df_año['venta'].apply(lambda x: f'${x/1e6:.1f}M'),
+                    textposition='top center',
+                    textfont=dict(size=10, color=color),
+                    hovertemplate='<b>%{x}</b><br>' +
+                                 'Ventas: $%{y:,.0f}<br>' +
+                                 '<extra>%{fullData.name}</extra>'
+                ))
+    
+        fig1.update_layout(
+            title=dict(
+                text='Evolución Mensual de Ventas',
+                x=0.5,
+                font=dict(size=20)
+            ),
+            xaxis=dict(
+                title='Mes',
+                tickangle=45,
+                categoryorder='array',
+                categoryarray=list(analisis.MESES.values()),
+                gridcolor='lightgray'
+            ),
+            yaxis=dict(
+                title='Ventas ($)',
+                gridcolor='lightgray',
+                tickformat='$,.0f'
+            ),
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            hovermode='x unified',
+            legend=dict(
+                orientation='h',
+                yanchor='bottom',
+                y=1.02,
+                xanchor='center',
+                x=0.5
+            ),
+            margin=dict(b=100)
+        )
     
-    fig1.update_layout(
-        title=dict(
-            text='Evolución Mensual de Ventas',
-            x=0.5,
-            font=dict(size=20)
-        ),
-        xaxis=dict(
-            title='Mes',
-            tickangle=45,
-            categoryorder='array',
-            categoryarray=list(meses_es.values()),
-            gridcolor='lightgray'
-        ),
-        yaxis=dict(
-            title='Ventas ($)',
-            gridcolor='lightgray',
-            tickformat='$,.0f'
-        ),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        hovermode='x unified',
-        legend=dict(
-            orientation='h',
-            yanchor='bottom',
-            y=1.02,
-            xanchor='center',
-            x=0.5
-        ),
-        margin=dict(b=100)
-    )
+        return fig1
     
-    st.plotly_chart(fig1, use_container_width=True)
+    mostrar_figura('mensual', estado_graficos, figura_mensual)
     
     # Gráfico 2: Barras comparativas por sección
     st.markdown("### 📊 Comparación por Sección")
     
-    df_secciones = df_plot.groupby(['secciones', 'anio'])['venta'].sum().reset_index()
+    def figura_secciones():
+        df_secciones = analisis.ventas_por_seccion(df_plot)
     
-    fig2 = go.Figure()
+        fig2 = go.Figure()
     
-    for año in [año_base, año_comparar]:
-        df_año = df_secciones[df_secciones['anio'] == año]
-        if not df_año.empty:
-            color = '#1f77b4' if año == año_base else '#ff7f0e'
-            nombre = f"Año {año}"
+        for año in [año_base, año_comparar]:
+            df_año = df_secciones[df_secciones['anio'] == año]
+            if not df_año.empty:
+                color = '#1f77b4' if año == año_base else '#ff7f0e'
+                nombre = f"Año {año}"
             
-            fig2.add_trace(go.Bar(
-                x=df_año['secciones'],
-                y=df_año['venta'],
-                name=nombre,
-                marker_color=color,
-                text=df_año['venta'].apply(lambda x: f'${x/1e6:.1f}M'),
-                textposition='outside',
-                textfont=dict(size=11),
-                hovertemplate='<b>%{x}</b><br>' +
-                             'Ventas: $%{y:,.0f}<br>' +
-                             '<extra>%{fullData.name}</extra>'
-            ))
+                fig2.add_trace(go.Bar(
+                    x=df_año['secciones'],
+                    y=df_año['venta'],
+                    name=nombre,
+                    marker_color=color,
+                    text=df_año['venta'].apply(lambda x: f'${x/1e6:.1f}M'),
+                    textposition='outside',
+                    textfont=dict(size=11),
+                    hovertemplate='<b>%{x}</b><br>' +
+                                 'Ventas: $%{y:,.0f}<br>' +
+                                 '<extra>%{fullData.name}</extra>'
+                ))
+    
+        fig2.update_layout(
+            title=dict(
+                text='Ventas por Sección - Comparativa Anual',
+                x=0.5,
+                font=dict(size=18)
+            ),
+            xaxis=dict(
+                title='Sección',
+                tickangle=45,
+                gridcolor='lightgray'
+            ),
+            yaxis=dict(
+                title='Ventas ($)',
+                gridcolor='lightgray',
+                tickformat='$,.0f'
+            ),
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            barmode='group',
+            legend=dict(
+                orientation='h',
+                yanchor='bottom',
+                y=1.02,
+                xanchor='center',
+                x=0.5
+            ),
+            margin=dict(b=100)
+        )
     
-    fig2.update_layout(
-        title=dict(
-            text='Ventas por Sección - Comparativa Anual',
-            x=0.5,
-            font=dict(size=18)
-        ),
-        xaxis=dict(
-            title='Sección',
-            tickangle=45,
-            gridcolor='lightgray'
-        ),
-        yaxis=dict(
-            title='Ventas ($)',
-            gridcolor='lightgray',
-            tickformat='$,.0f'
-        ),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        barmode='group',
-        legend=dict(
-            orientation='h',
-            yanchor='bottom',
-            y=1.02,
-            xanchor='center',
-            x=0.5
-        ),
-        margin=dict(b=100)
-    )
+        return fig2
     
-    st.plotly_chart(fig2, use_container_width=True)
+    mostrar_figura('secciones', estado_graficos, figura_secciones)
     
     # Gráfico 3: Distribución de tickets y entradas
     st.markdown("### 📈 Análisis de Eficiencia")
     
-    df_eficiencia = df_plot.groupby('anio').agg({
-        'tickets': 'sum',
-        'entradas': 'sum',
-        'ticket_promedio': 'mean',
-        'tasa_conversion': 'mean',
-        'venta': 'sum'
-    }).reset_index()
-    
-    fig3 = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=('Tickets vs Entradas', 'Ticket Promedio', 
-                       'Tasa de Conversión', 'Distribución de Ventas'),
-        specs=[
-            [{'type': 'bar'}, {'type': 'bar'}],
-            [{'type': 'bar'}, {'type': 'pie'}]
-        ]
-    )
+    def figura_eficiencia():
+        df_eficiencia = analisis.eficiencia(df_plot)
+    
+        fig3 = make_subplots(
+            rows=2, cols=2,
+            subplot_titles=('Tickets vs Entradas', 'Ticket Promedio', 
+                           'Tasa de Conversión', 'Distribución de Ventas'),
+            specs=[
+                [{'type': 'bar'}, {'type': 'bar'}],
+                [{'type': 'bar'}, {'type': 'pie'}]
+            ]
+        )
     
-    # Gráfico 1: Tickets vs Entradas
-    for i, fila in df_eficiencia.iterrows():
-        año = int(fila['anio'])
-        color = '#1f77b4' if año == año_base else '#ff7f0e'
+        # Gráfico 1: Tickets vs Entradas
+        for i, fila in df_eficiencia.iterrows():
+            año = int(fila['anio'])
+            color = '#1f77b4' if año == año_base else '#ff7f0e'
+        
+            fig3.add_trace(
+                go.Bar(
+                    name=f'Tickets {año}',
+                    x=[str(año)],
+                    y=[fila['tickets']],
+                    marker_color=color,
+                    text=[f'{fila["tickets"]:,.0f}'],
+                    textposition='inside',
+                    showlegend=False
+                ),
+                row=1, col=1
+            )
         
+            fig3.add_trace(
+                go.Bar(
+                    name=f'Entradas {año}',
+                    x=[str(año)],
+                    y=[fila['entradas']],
+                    marker_color=color,
+                    marker_pattern_shape="/" if año == año_comparar else "",
+                    text=[f'{fila["entradas"]:,.0f}'],
+                    textposition='inside',
+                    showlegend=False
+                ),
+                row=1, col=1
+            )
+    
+        # Gráfico 2: Ticket Promedio
         fig3.add_trace(
             go.Bar(
-                name=f'Tickets {año}',
-                x=[str(año)],
-                y=[fila['tickets']],
-                marker_color=color,
-                text=[f'{fila["tickets"]:,.0f}'],
-                textposition='inside',
+                x=df_eficiencia['anio'].astype(str),
+                y=df_eficiencia['ticket_promedio'],
+                marker_color=['#1f77b4', '#ff7f0e'],
+                text=df_eficiencia['ticket_promedio'].apply(lambda x: f'${x:,.2f}'),
+                textposition='outside',
                 showlegend=False
             ),
-            row=1, col=1
+            row=1, col=2
         )
-        
+    
+        # Gráfico 3: Tasa de Conversión
         fig3.add_trace(
             go.Bar(
-                name=f'Entradas {año}',
-                x=[str(año)],
-                y=[fila['entradas']],
-                marker_color=color,
-                marker_pattern_shape="/" if año == año_comparar else "",
-                text=[f'{fila["entradas"]:,.0f}'],
-                textposition='inside',
+                x=df_eficiencia['anio'].astype(str),
+                y=df_eficiencia['tasa_conversion'],
+                marker_color=['#1f77b4', '#ff7f0e'],
+                text=df_eficiencia['tasa_conversion'].apply(lambda x: f'{x:.2f}%'),
+                textposition='outside',
                 showlegend=False
             ),
-            row=1, col=1
+            row=2, col=1
         )
     
-    # Gráfico 2: Ticket Promedio
-    fig3.add_trace(
-        go.Bar(
-            x=df_eficiencia['anio'].astype(str),
-            y=df_eficiencia['ticket_promedio'],
-            marker_color=['#1f77b4', '#ff7f0e'],
-            text=df_eficiencia['ticket_promedio'].apply(lambda x: f'${x:,.2f}'),
-            textposition='outside',
-            showlegend=False
-        ),
-        row=1, col=2
-    )
-    
-    # Gráfico 3: Tasa de Conversión
-    fig3.add_trace(
-        go.Bar(
-            x=df_eficiencia['anio'].astype(str),
-            y=df_eficiencia['tasa_conversion'],
-            marker_color=['#1f77b4', '#ff7f0e'],
-            text=df_eficiencia['tasa_conversion'].apply(lambda x: f'{x:.2f}%'),
-            textposition='outside',
-            showlegend=False
-        ),
-        row=2, col=1
-    )
+        # Gráfico 4: Distribución de ventas por año
+        fig3.add_trace(
+            go.Pie(
+                labels=[f'Año {int(año)}' for año in df_eficiencia['anio']],
+                values=df_eficiencia['venta'],
+                marker_colors=['#1f77b4', '#ff7f0e'],
+                textinfo='label+percent',
+                textposition='inside',
+                hole=0.3,
+                showlegend=False
+            ),
+            row=2, col=2
+        )
     
-    # Gráfico 4: Distribución de ventas por año
-    fig3.add_trace(
-        go.Pie(
-            labels=[f'Año {int(año)}' for año in df_eficiencia['anio']],
-            values=df_eficiencia['venta'],
-            marker_colors=['#1f77b4', '#ff7f0e'],
-            textinfo='label+percent',
-            textposition='inside',
-            hole=0.3,
-            showlegend=False
-        ),
-        row=2, col=2
-    )
+        fig3.update_layout(
+            height=600,
+            title_text="Métricas de Eficiencia",
+            title_x=0.5,
+            title_font=dict(size=18),
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            showlegend=False,
+            barmode='group'
+        )
     
-    fig3.update_layout(
-        height=600,
-        title_text="Métricas de Eficiencia",
-        title_x=0.5,
-        title_font=dict(size=18),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        showlegend=False,
-        barmode='group'
-    )
+        fig3.update_xaxes(gridcolor='lightgray')
+        fig3.update_yaxes(gridcolor='lightgray', tickformat='$,.2f', row=1, col=2)
+        fig3.update_yaxes(gridcolor='lightgray', tickformat='.1f', row=2, col=1)
     
-    fig3.update_xaxes(gridcolor='lightgray')
-    fig3.update_yaxes(gridcolor='lightgray', tickformat='$,.2f', row=1, col=2)
-    fig3.update_yaxes(gridcolor='lightgray', tickformat='.1f', row=2, col=1)
+        return fig3
     
-    st.plotly_chart(fig3, use_container_width=True)
+    mostrar_figura('eficiencia', estado_graficos, figura_eficiencia)
     
     # Gráfico 4: Heatmap de rendimiento por mes y sección
     st.markdown("### 🔥 Mapa de Calor - Rendimiento por Mes y Sección")
     
-    # Seleccionar año para el heatmap
-    año_heatmap = st.radio(
-        "Selecciona año para ver el detalle:",
-        [año_base, año_comparar],
-        horizontal=True
-    )
-    
-    df_heat = df_plot[df_plot['anio'] == año_heatmap].copy()
-    
-    if not df_heat.empty:
-        # Crear tabla pivote para el heatmap
-        pivot_heat = df_heat.pivot_table(
-            values='venta',
-            index='secciones',
-            columns='mes_nombre',
-            aggfunc='sum',
-            fill_value=0
+    # El selector de año solo vuelve a ejecutar este fragmento
+    @st.fragment
+    @medicion.medir("seccion.heatmap")
+    def seccion_heatmap():
+        # Seleccionar año para el heatmap
+        año_heatmap = st.radio(
+            "Selecciona año para ver el detalle:",
+            [año_base, año_comparar],
+            horizontal=True
         )
+    
+        if (df_plot['anio'] == año_heatmap).any():
+            def figura_heatmap():
+                # Tabla pivote sección × mes, con los meses en orden de calendario
+                pivot_heat = analisis.mapa_calor(df_plot, año_heatmap)
         
-        # Reordenar meses
-        meses_disponibles = [col for col in list(meses_es.values()) if col in pivot_heat.columns]
-        pivot_heat = pivot_heat[meses_disponibles]
-        
-        if not pivot_heat.empty:
-            fig4 = go.Figure(data=go.Heatmap(
-                z=pivot_heat.values,
-                x=pivot_heat.columns,
-                y=pivot_heat.index,
-                colorscale='Viridis',
-                text=pivot_heat.values,
-                texttemplate='$%{text:,.0f}',
-                textfont={"size": 10},
-                hovertemplate='<b>%{y}</b><br>' +
-                             'Mes: %{x}<br>' +
-                             'Ventas: $%{z:,.0f}<br>' +
-                             '<extra></extra>'
-            ))
+                fig4 = go.Figure(data=go.Heatmap(
+                    z=pivot_heat.values,
+                    x=pivot_heat.columns,
+                    y=pivot_heat.index,
+                    colorscale='Viridis',
+                    text=pivot_heat.values,
+                    texttemplate='$%{text:,.0f}',
+                    textfont={"size": 10},
+                    hovertemplate='<b>%{y}</b><br>' +
+                                 'Mes: %{x}<br>' +
+                                 'Ventas: $%{z:,.0f}<br>' +
+                                 '<extra></extra>'
+                ))
             
-            fig4.update_layout(
-                title=f'Distribución de Ventas {año_heatmap}',
-                xaxis=dict(
-                    title='Mes',
-                    tickangle=45
-                ),
-                yaxis=dict(
-                    title='Sección'
-                ),
-                height=400,
-                plot_bgcolor='white',
-                paper_bgcolor='white'
-            )
+                fig4.update_layout(
+                    title=f'Distribución de Ventas {año_heatmap}',
+                    xaxis=dict(
+                        title='Mes',
+                        tickangle=45
+                    ),
+                    yaxis=dict(
+                        title='Sección'
+                    ),
+                    height=400,
+                    plot_bgcolor='white',
+                    paper_bgcolor='white'
+                )
             
-            st.plotly_chart(fig4, use_container_width=True)
+                return fig4
+        
+            mostrar_figura('heatmap', estado_graficos + (año_heatmap,), figura_heatmap)
+    
+    seccion_heatmap()
     
     # Gráfico 5: Tendencia de ticket promedio
     st.markdown("### 📈 Evolución del Ticket Promedio")
     
-    df_ticket = df_plot.groupby(['mes', 'mes_nombre', 'anio'])['ticket_promedio'].mean().reset_index()
-    df_ticket = df_ticket.sort_values('mes')
+    def figura_ticket():
+        df_ticket = analisis.ticket_mensual(df_plot)
     
-    fig5 = go.Figure()
+        fig5 = go.Figure()
     
-    for año in [año_base, año_comparar]:
-        df_año = df_ticket[df_ticket['anio'] == año]
-        if not df_año.empty:
-            color = '#1f77b4' if año == año_base else '#ff7f0e'
-            nombre = f"Año {año}"
+        for año in [año_base, año_comparar]:
+            df_año = df_ticket[df_ticket['anio'] == año]
+            if not df_año.empty:
+                color = '#1f77b4' if año == año_base else '#ff7f0e'
+                nombre = f"Año {año}"
             
-            fig5.add_trace(go.Scatter(
-                x=df_año['mes_nombre'],
-                y=df_año['ticket_promedio'],
-                mode='lines+markers',
-                name=nombre,
-                line=dict(color=color, width=3, dash='solid'),
-                marker=dict(size=8),
-                hovertemplate='<b>%{x}</b><br>' +
-                             'Ticket Prom.: $%{y:,.2f}<br>' +
-                             '<extra>%{fullData.name}</extra>'
-            ))
-    
-    fig5.update_layout(
-        title='Evolución del Ticket Promedio por Mes',
-        xaxis=dict(
-            title='Mes',
-            tickangle=45,
-            categoryorder='array',
-            categoryarray=list(meses_es.values())
-        ),
-        yaxis=dict(
-            title='Ticket Promedio ($)',
-            tickformat='$,.2f',
-            gridcolor='lightgray'
-        ),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        hovermode='x unified',
-        legend=dict(
-            orientation='h',
-            yanchor='bottom',
-            y=1.02,
-            xanchor='center',
-            x=0.5
+                fig5.add_trace(go.Scatter(
+                    x=df_año['mes_nombre'],
+                    y=df_año['ticket_promedio'],
+                    mode='lines+markers',
+                    name=nombre,
+                    line=dict(color=color, width=3, dash='solid'),
+                    marker=dict(size=8),
+                    hovertemplate='<b>%{x}</b><br>' +
+                                 'Ticket Prom.: $%{y:,.2f}<br>' +
+                                 '<extra>%{fullData.name}</extra>'
+                ))
+    
+        fig5.update_layout(
+            title='Evolución del Ticket Promedio por Mes',
+            xaxis=dict(
+                title='Mes',
+                tickangle=45,
+                categoryorder='array',
+                categoryarray=list(analisis.MESES.values())
+            ),
+            yaxis=dict(
+                title='Ticket Promedio ($)',
+                tickformat='$,.2f',
+                gridcolor='lightgray'
+            ),
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            hovermode='x unified',
+            legend=dict(
+                orientation='h',
+                yanchor='bottom',
+                y=1.02,
+                xanchor='center',
+                x=0.5
+            )
         )
-    )
     
-    st.plotly_chart(fig5, use_container_width=True)
+        return fig5
+    
+    mostrar_figura('ticket', estado_graficos, figura_ticket)
 
 else:
     if datos_base.empty and datos_comparar.empty:
@@ -1012,157 +1233,129 @@ if not datos_base.empty and not datos_comparar.empty and mostrar_presupuesto:
     
     # Preparar datos para la gráfica de evolución acumulada
     # Agrupar por fecha para ambos años y calcular acumulado
-    df_evolucion_base = datos_base.groupby('fecha')['venta'].sum().reset_index()
-    df_evolucion_base = df_evolucion_base.sort_values('fecha')
-    df_evolucion_base['venta_acum'] = df_evolucion_base['venta'].cumsum()
-    df_evolucion_base['año'] = año_base
-    df_evolucion_base['tipo'] = 'Real'
-    
-    df_evolucion_comp = datos_comparar.groupby('fecha')['venta'].sum().reset_index()
-    df_evolucion_comp = df_evolucion_comp.sort_values('fecha')
-    df_evolucion_comp['venta_acum'] = df_evolucion_comp['venta'].cumsum()
-    df_evolucion_comp['año'] = año_comparar
-    df_evolucion_comp['tipo'] = 'Real'
-    
-    # Calcular líneas de presupuesto
-    # Para el año base (presupuesto base = ventas reales acumuladas)
-    if len(df_evolucion_base) > 0:
-        primer_dia_base = df_evolucion_base['fecha'].iloc[0]
-        ultimo_dia_base = df_evolucion_base['fecha'].iloc[-1]
-        dias_totales_base = (ultimo_dia_base - primer_dia_base).days + 1
-        
-        # Presupuesto diario para año base (promedio)
-        presupuesto_diario_base = ventas_base / dias_totales_base if dias_totales_base > 0 else 0
-        
-        # Crear DataFrame para línea de presupuesto base
-        df_presupuesto_base = pd.DataFrame({
-            'fecha': df_evolucion_base['fecha'],
-            'venta_acum': [presupuesto_diario_base * (i + 1) for i in range(len(df_evolucion_base))],
-            'año': año_base,
-            'tipo': 'Presupuesto'
-        })
-    
-    # Para el año comparar (presupuesto = ventas base * (1 + crecimiento))
-    if len(df_evolucion_comp) > 0:
-        primer_dia_comp = df_evolucion_comp['fecha'].iloc[0]
-        ultimo_dia_comp = df_evolucion_comp['fecha'].iloc[-1]
-        dias_totales_comp = (ultimo_dia_comp - primer_dia_comp).days + 1
-        
-        # Presupuesto diario para año comparar
-        presupuesto_diario_comp = presupuesto / dias_totales_comp if dias_totales_comp > 0 else 0
-        
-        # Crear DataFrame para línea de presupuesto comparar
-        df_presupuesto_comp = pd.DataFrame({
-            'fecha': df_evolucion_comp['fecha'],
-            'venta_acum': [presupuesto_diario_comp * (i + 1) for i in range(len(df_evolucion_comp))],
-            'año': año_comparar,
-            'tipo': 'Presupuesto'
-        })
-    
-    # Crear figura con Plotly
-    fig_evolucion = go.Figure()
-    
-    # Línea real año base
-    if not df_evolucion_base.empty:
-        fig_evolucion.add_trace(go.Scatter(
-            x=df_evolucion_base['fecha'],
-            y=df_evolucion_base['venta_acum'],
-            mode='lines+markers',
-            name=f'Real {año_base}',
-            line=dict(color='#1f77b4', width=3),
-            marker=dict(size=6),
-            hovertemplate='<b>%{x|%d/%m/%Y}</b><br>' +
-                         f'Real {año_base}: $%{{y:,.0f}}<br>' +
-                         '<extra></extra>'
-        ))
+    with medicion.tramo("agregacion.acumulada"):
+        df_evolucion_base = series.acumulada(datos_base)
+        df_evolucion_comp = series.acumulada(datos_comparar)
+    
+    # Líneas de presupuesto: el total repartido por igual entre los días del rango
+    # Año base: presupuesto = ventas reales; año comparar: ventas base * (1 + crecimiento)
+    df_presupuesto_base = series.curva_presupuesto(df_evolucion_base['fecha'], ventas_base)
+    df_presupuesto_comp = series.curva_presupuesto(df_evolucion_comp['fecha'], presupuesto)
+    dias_totales_comp = series.dias_rango(df_evolucion_comp['fecha'])
+    
+    def figura_evolucion():
+        # Cada trazo se reduce a PUNTOS_GRAFICO puntos (LTTB) para acotar el tamaño del gráfico
+        trazo_base = series.reducir(df_evolucion_base, PUNTOS_GRAFICO)
+        trazo_comp = series.reducir(df_evolucion_comp, PUNTOS_GRAFICO)
+        trazo_presupuesto_base = series.reducir(df_presupuesto_base, PUNTOS_GRAFICO)
+        trazo_presupuesto_comp = series.reducir(df_presupuesto_comp, PUNTOS_GRAFICO)
+    
+        # Crear figura con Plotly
+        fig_evolucion = go.Figure()
+    
+        # Línea real año base
+        if not df_evolucion_base.empty:
+            fig_evolucion.add_trace(go.Scatter(
+                x=trazo_base['fecha'],
+                y=trazo_base['venta_acum'],
+                mode='lines+markers',
+                name=f'Real {año_base}',
+                line=dict(color='#1f77b4', width=3),
+                marker=dict(size=6),
+                hovertemplate='<b>%{x|%d/%m/%Y}</b><br>' +
+                             f'Real {año_base}: $%{{y:,.0f}}<br>' +
+                             '<extra></extra>'
+            ))
     
-    # Línea presupuesto año base
-    if not df_presupuesto_base.empty:
-        fig_evolucion.add_trace(go.Scatter(
-            x=df_presupuesto_base['fecha'],
-            y=df_presupuesto_base['venta_acum'],
-            mode='lines',
-            name=f'Presupuesto {año_base}',
-            line=dict(color='rgba(31, 119, 180, 0.3)', width=2, dash='dash'),
-            hovertemplate='<b>%{x|%d/%m/%Y}</b><br>' +
-                         f'Presupuesto {año_base}: $%{{y:,.0f}}<br>' +
-                         '<extra></extra>'
-        ))
+        # Línea presupuesto año base
+        if not df_presupuesto_base.empty:
+            fig_evolucion.add_trace(go.Scatter(
+                x=trazo_presupuesto_base['fecha'],
+                y=trazo_presupuesto_base['venta_acum'],
+                mode='lines',
+                name=f'Presupuesto {año_base}',
+                line=dict(color='rgba(31, 119, 180, 0.3)', width=2, dash='dash'),
+                hovertemplate='<b>%{x|%d/%m/%Y}</b><br>' +
+                             f'Presupuesto {año_base}: $%{{y:,.0f}}<br>' +
+                             '<extra></extra>'
+            ))
     
-    # Línea real año comparar
-    if not df_evolucion_comp.empty:
-        fig_evolucion.add_trace(go.Scatter(
-            x=df_evolucion_comp['fecha'],
-            y=df_evolucion_comp['venta_acum'],
-            mode='lines+markers',
-            name=f'Real {año_comparar}',
-            line=dict(color='#ff7f0e', width=3),
-            marker=dict(size=6),
-            hovertemplate='<b>%{x|%d/%m/%Y}</b><br>' +
-                         f'Real {año_comparar}: $%{{y:,.0f}}<br>' +
-                         '<extra></extra>'
-        ))
+        # Línea real año comparar
+        if not df_evolucion_comp.empty:
+            fig_evolucion.add_trace(go.Scatter(
+                x=trazo_comp['fecha'],
+                y=trazo_comp['venta_acum'],
+                mode='lines+markers',
+                name=f'Real {año_comparar}',
+                line=dict(color='#ff7f0e', width=3),
+                marker=dict(size=6),
+                hovertemplate='<b>%{x|%d/%m/%Y}</b><br>' +
+                             f'Real {año_comparar}: $%{{y:,.0f}}<br>' +
+                             '<extra></extra>'
+            ))
     
-    # Línea presupuesto año comparar
-    if not df_presupuesto_comp.empty:
-        fig_evolucion.add_trace(go.Scatter(
-            x=df_presupuesto_comp['fecha'],
-            y=df_presupuesto_comp['venta_acum'],
-            mode='lines',
-            name=f'Presupuesto {año_comparar}',
-            line=dict(color='rgba(255, 127, 14, 0.3)', width=2, dash='dash'),
-            hovertemplate='<b>%{x|%d/%m/%Y}</b><br>' +
-                         f'Presupuesto {año_comparar}: $%{{y:,.0f}}<br>' +
-                         '<extra></extra>'
-        ))
+        # Línea presupuesto año comparar
+        if not df_presupuesto_comp.empty:
+            fig_evolucion.add_trace(go.Scatter(
+                x=trazo_presupuesto_comp['fecha'],
+                y=trazo_presupuesto_comp['venta_acum'],
+                mode='lines',
+                name=f'Presupuesto {año_comparar}',
+                line=dict(color='rgba(255, 127, 14, 0.3)', width=2, dash='dash'),
+                hovertemplate='<b>%{x|%d/%m/%Y}</b><br>' +
+                             f'Presupuesto {año_comparar}: $%{{y:,.0f}}<br>' +
+                             '<extra></extra>'
+            ))
     
-    # Configurar layout
-    fig_evolucion.update_layout(
-        title=dict(
-            text=f'Evolución Acumulada de Ventas vs Presupuesto (+{crecimiento_presupuesto}%)',
-            x=0.5,
-            font=dict(size=20)
-        ),
-        xaxis=dict(
-            title='Fecha',
-            tickformat='%d/%m/%Y',
-            tickangle=45,
-            gridcolor='lightgray'
-        ),
-        yaxis=dict(
-            title='Ventas Acumuladas ($)',
-            gridcolor='lightgray',
-            tickformat='$,.0f'
-        ),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        hovermode='x unified',
-        legend=dict(
-            orientation='h',
-            yanchor='bottom',
-            y=1.02,
-            xanchor='center',
-            x=0.5
-        ),
-        margin=dict(b=100)
-    )
+        # Configurar layout
+        fig_evolucion.update_layout(
+            title=dict(
+                text=f'Evolución Acumulada de Ventas vs Presupuesto (+{crecimiento_presupuesto}%)',
+                x=0.5,
+                font=dict(size=20)
+            ),
+            xaxis=dict(
+                title='Fecha',
+                tickformat='%d/%m/%Y',
+                tickangle=45,
+                gridcolor='lightgray'
+            ),
+            yaxis=dict(
+                title='Ventas Acumuladas ($)',
+                gridcolor='lightgray',
+                tickformat='$,.0f'
+            ),
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            hovermode='x unified',
+            legend=dict(
+                orientation='h',
+                yanchor='bottom',
+                y=1.02,
+                xanchor='center',
+                x=0.5
+            ),
+            margin=dict(b=100)
+        )
     
-    # Añadir anotación con el objetivo
-    fig_evolucion.add_annotation(
-        x=0.02,
-        y=0.98,
-        xref='paper',
-        yref='paper',
-        text=f'Objetivo {año_comparar}: ${presupuesto:,.0f}',
-        showarrow=False,
-        font=dict(size=12, color='#666'),
-        bgcolor='rgba(255,255,255,0.8)',
-        bordercolor='#ccc',
-        borderwidth=1,
-        borderpad=4
-    )
+        # Añadir anotación con el objetivo
+        fig_evolucion.add_annotation(
+            x=0.02,
+            y=0.98,
+            xref='paper',
+            yref='paper',
+            text=f'Objetivo {año_comparar}: ${presupuesto:,.0f}',
+            showarrow=False,
+            font=dict(size=12, color='#666'),
+            bgcolor='rgba(255,255,255,0.8)',
+            bordercolor='#ccc',
+            borderwidth=1,
+            borderpad=4
+        )
     
-    st.plotly_chart(fig_evolucion, use_container_width=True)
+        return fig_evolucion
+    
+    mostrar_figura('evolucion', estado_graficos + (crecimiento_presupuesto, PUNTOS_GRAFICO), figura_evolucion)
     
     # Métricas de seguimiento
     col_comp1, col_comp2, col_comp3 = st.columns(3)
@@ -1172,7 +1365,7 @@ if not datos_base.empty and not datos_comparar.empty and mostrar_presupuesto:
         if not df_evolucion_comp.empty and not df_evolucion_base.empty:
             ultimo_valor_comp = df_evolucion_comp['venta_acum'].iloc[-1]
             ultimo_valor_base = df_evolucion_base['venta_acum'].iloc[-1]
-            diff_base = ((ultimo_valor_comp - ultimo_valor_base) / ultimo_valor_base * 100) if ultimo_valor_base > 0 else 0
+            diff_base = kpis.variacion(ultimo_valor_comp, ultimo_valor_base) or 0
             
             st.metric(
                 f"vs {año_base}",
@@ -1186,7 +1379,7 @@ if not datos_base.empty and not datos_comparar.empty and mostrar_presupuesto:
         if not df_evolucion_comp.empty and not df_presupuesto_comp.empty:
             ultimo_real = df_evolucion_comp['venta_acum'].iloc[-1]
             ultimo_pres = df_presupuesto_comp['venta_acum'].iloc[-1]
-            cumplimiento = (ultimo_real / ultimo_pres * 100) if ultimo_pres > 0 else 0
+            cumplimiento = kpis.cumplimiento(ultimo_real, ultimo_pres)
             
             st.metric(
                 "Cumplimiento",
@@ -1198,9 +1391,7 @@ if not datos_base.empty and not datos_comparar.empty and mostrar_presupuesto:
     with col_comp3:
         # Proyección final
         if not df_evolucion_comp.empty and dias_totales_comp > 0:
-            dias_transcurridos = len(df_evolucion_comp)
-            ritmo_diario = ultimo_real / dias_transcurridos if dias_transcurridos > 0 else 0
-            proyeccion = ritmo_diario * dias_totales_comp
+            proyeccion = series.ritmo_final(df_evolucion_comp, dias_totales_comp)
             
             st.metric(
                 "Proyección final",
@@ -1212,85 +1403,88 @@ if not datos_base.empty and not datos_comparar.empty and mostrar_presupuesto:
     # Gráfico de barras comparativo
     st.markdown("### 📊 Comparación por Año")
     
-    periodos = [str(año_base), str(año_comparar)]
-    valores_reales = [ventas_base, ventas_comp]
-    valores_presupuesto = [ventas_base, presupuesto]
-    
-    fig_barras = go.Figure()
-    
-    # Barras de real
-    fig_barras.add_trace(go.Bar(
-        name='Real',
-        x=periodos,
-        y=valores_reales,
-        marker_color=['#1f77b4', '#ff7f0e'],
-        text=[f'${v:,.0f}' for v in valores_reales],
-        textposition='outside',
-        hovertemplate='<b>%{x}</b><br>' +
-                     'Real: $%{y:,.0f}<br>' +
-                     '<extra></extra>'
-    ))
-    
-    # Línea de presupuesto
-    fig_barras.add_trace(go.Scatter(
-        name='Presupuesto',
-        x=periodos,
-        y=valores_presupuesto,
-        mode='markers+lines',
-        marker=dict(
-            symbol='diamond',
-            size=15,
-            color=['#1f77b4', '#ff7f0e'],
-            line=dict(color='white', width=2)
-        ),
-        line=dict(
-            color='rgba(0,0,0,0.3)',
-            width=2,
-            dash='dot'
-        ),
-        text=[f'${v:,.0f}' for v in valores_presupuesto],
-        textposition='top center',
-        hovertemplate='<b>%{x}</b><br>' +
-                     'Presupuesto: $%{y:,.0f}<br>' +
-                     '<extra></extra>'
-    ))
-    
-    fig_barras.update_layout(
-        title=dict(
-            text='Ventas Reales vs Presupuesto',
-            x=0.5,
-            font=dict(size=18)
-        ),
-        xaxis=dict(
-            title='Año',
-            gridcolor='lightgray'
-        ),
-        yaxis=dict(
-            title='Ventas ($)',
-            gridcolor='lightgray',
-            tickformat='$,.0f'
-        ),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        barmode='group',
-        legend=dict(
-            orientation='h',
-            yanchor='bottom',
-            y=1.02,
-            xanchor='center',
-            x=0.5
-        ),
-        margin=dict(b=50)
-    )
+    def figura_barras():
+        periodos = [str(año_base), str(año_comparar)]
+        valores_reales = [ventas_base, ventas_comp]
+        valores_presupuesto = [ventas_base, presupuesto]
+    
+        fig_barras = go.Figure()
+    
+        # Barras de real
+        fig_barras.add_trace(go.Bar(
+            name='Real',
+            x=periodos,
+            y=valores_reales,
+            marker_color=['#1f77b4', '#ff7f0e'],
+            text=[f'${v:,.0f}' for v in valores_reales],
+            textposition='outside',
+            hovertemplate='<b>%{x}</b><br>' +
+                         'Real: $%{y:,.0f}<br>' +
+                         '<extra></extra>'
+        ))
+    
+        # Línea de presupuesto
+        fig_barras.add_trace(go.Scatter(
+            name='Presupuesto',
+            x=periodos,
+            y=valores_presupuesto,
+            mode='markers+lines',
+            marker=dict(
+                symbol='diamond',
+                size=15,
+                color=['#1f77b4', '#ff7f0e'],
+                line=dict(color='white', width=2)
+            ),
+            line=dict(
+                color='rgba(0,0,0,0.3)',
+                width=2,
+                dash='dot'
+            ),
+            text=[f'${v:,.0f}' for v in valores_presupuesto],
+            textposition='top center',
+            hovertemplate='<b>%{x}</b><br>' +
+                         'Presupuesto: $%{y:,.0f}<br>' +
+                         '<extra></extra>'
+        ))
+    
+        fig_barras.update_layout(
+            title=dict(
+                text='Ventas Reales vs Presupuesto',
+                x=0.5,
+                font=dict(size=18)
+            ),
+            xaxis=dict(
+                title='Año',
+                gridcolor='lightgray'
+            ),
+            yaxis=dict(
+                title='Ventas ($)',
+                gridcolor='lightgray',
+                tickformat='$,.0f'
+            ),
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            barmode='group',
+            legend=dict(
+                orientation='h',
+                yanchor='bottom',
+                y=1.02,
+                xanchor='center',
+                x=0.5
+            ),
+            margin=dict(b=50)
+        )
     
-    st.plotly_chart(fig_barras, use_container_width=True)
+        return fig_barras
+    
+    mostrar_figura('barras', estado_graficos + (crecimiento_presupuesto,), figura_barras)
     
     # Tabla resumen
     st.markdown("### 📋 Resumen Comparativo")
     
     # Calcular promedios diarios
-    promedio_diario_base = ventas_base / dias_base if dias_base > 0 else 0
-    promedio_diario_comp = ventas_comp / dias_comp if dias_comp > 0 else 0
+    promedio_diario_base = kpis_base.promedio_diario
+    promedio_diario_comp = kpis_comp.promedio_diario
     
     df_resumen = pd.DataFrame({
         'Métrica': ['Ventas Totales', 'Días con datos', 'Promedio diario', 'vs Presupuesto'],
@@ -1320,172 +1514,209 @@ if not datos_base.empty and not datos_comparar.empty and mostrar_presupuesto:
 # CALENDARIO DESPLEGABLE
 # ==============================
 
-col_cal1, col_cal2, col_cal3 = st.columns([2, 2, 1])
-
-fechas_base = sorted(datos_base["fecha"].dt.date.unique())
-fechas_comp = sorted(datos_comparar["fecha"].dt.date.unique())
-
-# Inicializar estado si no existe
-if "fecha_base" not in st.session_state and fechas_base:
-    st.session_state.fecha_base = fechas_base[0]
+def _mismo_dia(anio_comparar, fechas_comp):
+    """Lleva el calendario comparado al mismo día del año base
 
-if "fecha_comp" not in st.session_state and fechas_comp:
-    st.session_state.fecha_comp = fechas_comp[0]
+    Corre como callback, antes de dibujar los widgets: así se puede cambiar
+    también el estado del calendario ("cal_comp"), que si no conserva su fecha.
+    """
+    base = st.session_state.get("cal_base", st.session_state.get("fecha_base"))
 
-with col_cal1:
-    st.markdown(f"### **{año_base}**")
+    # Mismo día y mes en el año comparado (el 29/02 pasa al 28/02)
+    try:
+        with conectar() as conn:
+            misma_fecha = comparables.equivalente(conn, base, anio_comparar, modo="calendario")
+    except sqlite3.Error as e:
+        st.session_state.aviso_mismo_dia = ("error", f"Error al leer los días comparables: {e}")
+        return
 
-    if fechas_base:
-        st.session_state.fecha_base = st.date_input(
-            "Selecciona fecha",
-            value=st.session_state.fecha_base,
-            min_value=min(fechas_base),
-            max_value=max(fechas_base),
-            key="cal_base"
-        )
-    else:
-        st.warning("No hay fechas disponibles")
-
-with col_cal2:
-    st.markdown(f"### **{año_comparar}**")
-
-    if fechas_comp:
-        st.session_state.fecha_comp = st.date_input(
-            "Selecciona fecha",
-            value=st.session_state.fecha_comp,
-            min_value=min(fechas_comp),
-            max_value=max(fechas_comp),
-            key="cal_comp"
-        )
+    if misma_fecha in fechas_comp:
+        st.session_state.fecha_comp = misma_fecha
+        st.session_state.cal_comp = misma_fecha
     else:
-        st.warning("No hay fechas disponibles")
-
-with col_cal3:
-    st.markdown("### **Acciones**")
-
-    if st.button("🔄 Mismo día", use_container_width=True):
-
-        base = st.session_state.fecha_base
-
-        misma_fecha = [
-            f for f in fechas_comp
-            if f.month == base.month and f.day == base.day
-        ]
-
-        if misma_fecha:
-            st.session_state.fecha_comp = misma_fecha[0]
-            st.rerun()
+        st.session_state.aviso_mismo_dia = ("warning", "Ese día no existe en el año comparado")
+
+# Elegir fechas o pulsar "Mismo día" solo vuelve a ejecutar esta sección
+@st.fragment
+@medicion.medir("seccion.dia")
+def seccion_dia():
+    col_cal1, col_cal2, col_cal3 = st.columns([2, 2, 1])
+
+    fechas_base = sorted(datos_base["fecha"].dt.date.unique())
+    fechas_comp = sorted(datos_comparar["fecha"].dt.date.unique())
+
+    # Inicializar estado si no existe
+    if "fecha_base" not in st.session_state and fechas_base:
+        st.session_state.fecha_base = fechas_base[0]
+
+    if "fecha_comp" not in st.session_state and fechas_comp:
+        st.session_state.fecha_comp = fechas_comp[0]
+
+    with col_cal1:
+        st.markdown(f"### **{año_base}**")
+
+        if fechas_base:
+            st.session_state.fecha_base = st.date_input(
+                "Selecciona fecha",
+                value=st.session_state.fecha_base,
+                min_value=min(fechas_base),
+                max_value=max(fechas_base),
+                key="cal_base"
+            )
+        else:
+            st.warning("No hay fechas disponibles")
+
+    with col_cal2:
+        st.markdown(f"### **{año_comparar}**")
+
+        if fechas_comp:
+            st.session_state.fecha_comp = st.date_input(
+                "Selecciona fecha",
+                value=st.session_state.fecha_comp,
+                min_value=min(fechas_comp),
+                max_value=max(fechas_comp),
+                key="cal_comp"
+            )
         else:
-            st.warning("Ese día no existe en el año comparado")
+            st.warning("No hay fechas disponibles")
 
-# Variables finales para usar en métricas
-fecha_base = st.session_state.fecha_base
-fecha_comp = st.session_state.fecha_comp
+    with col_cal3:
+        st.markdown("### **Acciones**")
 
-# Mostrar comparación si hay fechas seleccionadas
-if fecha_base and fecha_comp:  # Esta línea debe tener 0 espacios de indentación
-    datos_dia_base = datos_base[datos_base["fecha"].dt.date == fecha_base]
-    datos_dia_comp = datos_comparar[datos_comparar["fecha"].dt.date == fecha_comp]
+        st.button(
+            "🔄 Mismo día", use_container_width=True,
+            on_click=_mismo_dia, args=(año_comparar, set(fechas_comp))
+        )
+        aviso = st.session_state.pop("aviso_mismo_dia", None)
+        if aviso is not None:
+            tipo, texto = aviso
+            getattr(st, tipo)(texto)
+
+    # Variables finales para usar en métricas
+    fecha_base = st.session_state.fecha_base
+    fecha_comp = st.session_state.fecha_comp
+
+    # Mostrar comparación si hay fechas seleccionadas
+    if fecha_base and fecha_comp:
+        # Solo días dentro del período filtrado (las fechas guardadas pueden ser de otro)
+        datos_dia_base = (
+            cargar_periodo(año_base, fecha_base, fecha_base, secciones_seleccionadas)
+            if fecha_base in fechas_base else datos_base.iloc[:0]
+        )
+        datos_dia_comp = (
+            cargar_periodo(año_comparar, fecha_comp, fecha_comp, secciones_seleccionadas)
+            if fecha_comp in fechas_comp else datos_comparar.iloc[:0]
+        )
     
-    if not datos_dia_base.empty and not datos_dia_comp.empty:
-        st.markdown("---")
-        st.markdown(f"## 📊 Comparación: {fecha_base.strftime('%d/%m/%Y')} vs {fecha_comp.strftime('%d/%m/%Y')}")
-        
-        # Calcular métricas del día
-        venta_base = datos_dia_base["venta"].sum()
-        venta_comp = datos_dia_comp["venta"].sum()
-        entradas_base = datos_dia_base["entradas"].sum()
-        entradas_comp = datos_dia_comp["entradas"].sum()
-        tickets_base = datos_dia_base["tickets"].sum()
-        tickets_comp = datos_dia_comp["tickets"].sum()
-        
-        ticket_prom_base = venta_base / tickets_base if tickets_base > 0 else 0
-        ticket_prom_comp = venta_comp / tickets_comp if tickets_comp > 0 else 0
+        if not datos_dia_base.empty and not datos_dia_comp.empty:
+            st.markdown("---")
+            st.markdown(f"## 📊 Comparación: {fecha_base.strftime('%d/%m/%Y')} vs {fecha_comp.strftime('%d/%m/%Y')}")
         
-        tasa_base = datos_dia_base["tasa_conversion"].mean()
-        tasa_comp = datos_dia_comp["tasa_conversion"].mean()
+            # Calcular métricas del día
+            kpis_dia_base = kpis.calcular(datos_dia_base)
+            kpis_dia_comp = kpis.calcular(datos_dia_comp)
+            venta_base, venta_comp = kpis_dia_base.venta, kpis_dia_comp.venta
+            entradas_base, entradas_comp = kpis_dia_base.entradas, kpis_dia_comp.entradas
+            ticket_prom_base, ticket_prom_comp = kpis_dia_base.ticket_promedio, kpis_dia_comp.ticket_promedio
+            tasa_base, tasa_comp = kpis_dia_base.tasa_conversion, kpis_dia_comp.tasa_conversion
         
-        # Mostrar KPIs del día
-        col_d1, col_d2, col_d3, col_d4 = st.columns(4)
+            # Mostrar KPIs del día
+            col_d1, col_d2, col_d3, col_d4 = st.columns(4)
         
-        delta_venta = ((venta_comp - venta_base)/venta_base*100) if venta_base > 0 else None
-        with col_d1:
-            st.metric(
-                f"Ventas {año_comparar}",
-                f"${venta_comp:,.0f}",
-                f"{delta_venta:+.1f}%" if delta_venta else None
-            )
+            delta_venta = kpis.variacion(venta_comp, venta_base)
+            with col_d1:
+                st.metric(
+                    f"Ventas {año_comparar}",
+                    f"${venta_comp:,.0f}",
+                    f"{delta_venta:+.1f}%" if delta_venta else None
+                )
         
-        delta_ent = ((entradas_comp - entradas_base)/entradas_base*100) if entradas_base > 0 else None
-        with col_d2:
-            st.metric(
-                f"Entradas {año_comparar}",
-                f"{entradas_comp:,.0f}",
-                f"{delta_ent:+.1f}%" if delta_ent else None
-            )
+            delta_ent = kpis.variacion(entradas_comp, entradas_base)
+            with col_d2:
+                st.metric(
+                    f"Entradas {año_comparar}",
+                    f"{entradas_comp:,.0f}",
+                    f"{delta_ent:+.1f}%" if delta_ent else None
+                )
         
-        delta_ticket = ((ticket_prom_comp - ticket_prom_base)/ticket_prom_base*100) if ticket_prom_base > 0 else None
-        with col_d3:
-            st.metric(
-                f"Ticket Prom. {año_comparar}",
-                f"${ticket_prom_comp:,.2f}",
-                f"{delta_ticket:+.1f}%" if delta_ticket else None
-            )
+            delta_ticket = kpis.variacion(ticket_prom_comp, ticket_prom_base)
+            with col_d3:
+                st.metric(
+                    f"Ticket Prom. {año_comparar}",
+                    f"${ticket_prom_comp:,.2f}",
+                    f"{delta_ticket:+.1f}%" if delta_ticket else None
+                )
         
-        delta_tasa = tasa_comp - tasa_base
-        with col_d4:
-            st.metric(
-                f"Tasa Conv. {año_comparar}",
-                f"{tasa_comp:.2f}%",
-                f"{delta_tasa:+.2f} pp"
-            )
+            delta_tasa = tasa_comp - tasa_base
+            with col_d4:
+                st.metric(
+                    f"Tasa Conv. {año_comparar}",
+                    f"{tasa_comp:.2f}%",
+                    f"{delta_tasa:+.2f} pp"
+                )
+
+seccion_dia()
 
 # ---------- DATOS DETALLADOS ----------
-with st.expander("📋 Ver datos detallados", expanded=False):
-    tab1, tab2 = st.tabs(["Resumen por Período", "Registros Detallados"])
-    
-    with tab1:
-        # Crear resumen para los períodos seleccionados
-        resumen_data = []
-        
-        if not datos_base.empty:
-            resumen_data.append({
-                "Año": año_base,
-                "Período": periodo_desc,
-                "Ventas Totales": f"${datos_base['venta'].sum():,.0f}",
-                "Entradas Totales": f"{datos_base['entradas'].sum():,.0f}",
-                "Tickets Totales": f"{datos_base['tickets'].sum():,.0f}",
-                "Ticket Prom.": f"${datos_base['venta'].sum()/datos_base['tickets'].sum():,.2f}" if datos_base['tickets'].sum() > 0 else "N/A",
-                "Tasa Conv.": f"{datos_base['tasa_conversion'].mean():.2f}%"
-            })
+# Expander y pestañas con estado: los registros solo se consultan con ambos abiertos.
+# Abrir, cambiar de pestaña o de página solo vuelve a ejecutar esta sección
+@st.fragment
+@medicion.medir("seccion.detalle")
+def seccion_detalle():
+    panel_detalle = st.expander("📋 Ver datos detallados", expanded=False, key="panel_detalle", on_change="rerun")
+    with panel_detalle:
+        tab1, tab2 = st.tabs(["Resumen por Período", "Registros Detallados"], key="tabs_detalle", on_change="rerun")
+    
+        with tab1:
+            # Crear resumen para los períodos seleccionados
+            resumen_data = []
         
-        if not datos_comparar.empty:
-            resumen_data.append({
-                "Año": año_comparar,
-                "Período": periodo_desc,
-                "Ventas Totales": f"${datos_comparar['venta'].sum():,.0f}",
-                "Entradas Totales": f"{datos_comparar['entradas'].sum():,.0f}",
-                "Tickets Totales": f"{datos_comparar['tickets'].sum():,.0f}",
-                "Ticket Prom.": f"${datos_comparar['venta'].sum()/datos_comparar['tickets'].sum():,.2f}" if datos_comparar['tickets'].sum() > 0 else "N/A",
-                "Tasa Conv.": f"{datos_comparar['tasa_conversion'].mean():.2f}%"
-            })
+            for año, kpis_año in [(año_base, kpis_base), (año_comparar, kpis_comp)]:
+                if not kpis_año.vacio:
+                    resumen_data.append({
+                        "Año": año,
+                        "Período": periodo_desc,
+                        "Ventas Totales": f"${kpis_año.venta:,.0f}",
+                        "Entradas Totales": f"{kpis_año.entradas:,.0f}",
+                        "Tickets Totales": f"{kpis_año.tickets:,.0f}",
+                        "Ticket Prom.": f"${kpis_año.ticket_promedio:,.2f}" if kpis_año.tickets > 0 else "N/A",
+                        "Tasa Conv.": f"{kpis_año.tasa_conversion:.2f}%"
+                    })
         
-        resumen_df = pd.DataFrame(resumen_data)
-        st.dataframe(resumen_df, use_container_width=True)
-    
-    with tab2:
-        # Mostrar todos los registros del período seleccionado
-        df_detalle = pd.concat([datos_base, datos_comparar]) if not datos_base.empty or not datos_comparar.empty else pd.DataFrame()
-        if not df_detalle.empty:
-            st.dataframe(
-                df_detalle.sort_values(["anio", "fecha"], ascending=[False, False])
-                .style.format({
-                    "venta": "${:,.0f}",
-                    "ticket_promedio": "${:,.2f}",
-                    "tasa_conversion": "{:.2f}%"
-                }),
-                use_container_width=True
-            )
+            resumen_df = pd.DataFrame(resumen_data)
+            st.dataframe(resumen_df, use_container_width=True)
+    
+        with tab2:
+            if panel_detalle.open and tab2.open:
+                # Una página por consulta: orden y formato solo sobre las filas visibles
+                periodos = [p for p in (periodo_base, periodo_comp) if p is not None]
+                total_registros = contar_registros(periodos, secciones_seleccionadas)
+            
+                if total_registros:
+                    paginas = -(-total_registros // FILAS_POR_PAGINA)
+                    if st.session_state.get("pagina_detalle", 1) > paginas:
+                        st.session_state.pagina_detalle = paginas
+                    pagina = st.number_input("Página", min_value=1, max_value=paginas, value=1, key="pagina_detalle")
+                
+                    inicio = (pagina - 1) * FILAS_POR_PAGINA
+                    st.caption(
+                        f"Registros {inicio + 1:,}–{min(inicio + FILAS_POR_PAGINA, total_registros):,} "
+                        f"de {total_registros:,} (página {pagina} de {paginas})"
+                    )
+                    st.dataframe(
+                        cargar_pagina(periodos, secciones_seleccionadas, pagina)
+                        .style.format({
+                            "venta": "${:,.0f}",
+                            "ticket_promedio": "${:,.2f}",
+                            "tasa_conversion": "{:.2f}%"
+                        }),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                else:
+                    st.info("No hay registros para los períodos seleccionados")
+
+seccion_detalle()
 
 # ---------- PROYECCIÓN INTELIGENTE FUTURA ----------
 st.markdown(f'<div class="section-title">🔮 Proyección Inteligente de Venta</div>', unsafe_allow_html=True)
@@ -1497,15 +1728,11 @@ Proyecta una fecha futura usando:
 • Crecimiento real acumulado
 """)
 
-# Trabajar sobre copia segura
-df_proy = df.copy()
-
-if not df_proy.empty:
-
-    df_proy["dia_semana"] = df_proy["fecha"].dt.day_name()
-    df_proy["semana"] = df_proy["fecha"].dt.isocalendar().week
-
-    colp1, colp2 = st.columns(2)
+# Fecha, ambición y días a proyectar solo vuelven a ejecutar esta sección
+@st.fragment
+@medicion.medir("seccion.proyeccion")
+def seccion_proyeccion():
+    colp1, colp2, colp3 = st.columns(3)
 
     with colp1:
         fecha_proyectar = st.date_input(
@@ -1517,36 +1744,35 @@ if not df_proy.empty:
     with colp2:
         ambicion_extra = st.slider("Ambición adicional (%)", 0, 20, 15)
 
+    with colp3:
+        dias_proyeccion = st.number_input("Días a proyectar", min_value=1, max_value=366, value=90)
+
     if fecha_proyectar:
 
         fecha_proyectar = pd.Timestamp(fecha_proyectar)
         anio_objetivo = fecha_proyectar.year
         anio_anterior = anio_objetivo - 1
 
-        dia_semana = fecha_proyectar.day_name()
-        semana = fecha_proyectar.isocalendar().week
+        fecha_fin_proyeccion = fecha_proyectar + pd.Timedelta(days=int(dias_proyeccion) - 1)
 
-        # Buscar comparable
-        comparable = df_proy[
-            (df_proy["anio"] == anio_anterior) &
-            (df_proy["dia_semana"] == dia_semana) &
-            (df_proy["semana"] == semana)
-        ]
-
-        if not comparable.empty:
+        # Todo el rango se proyecta con un join entre la tabla de días
+        # comparables y el historial cacheado; la primera fila es la fecha elegida
+        historial = cargar_historial(range(anio_anterior, fecha_fin_proyeccion.year + 1))
+        df_proyeccion = proyecciones.proyectar(
+            historial,
+            cargar_comparables(fecha_proyectar, fecha_fin_proyeccion),
+            ambicion_extra
+        )
+        proyeccion_dia = df_proyeccion.iloc[0]
 
-            venta_hist = comparable["venta"].sum()
+        if pd.notna(proyeccion_dia["venta_comparable"]):
 
-            total_actual = df_proy[df_proy["anio"] == anio_objetivo]["venta"].sum()
-            total_pasado = df_proy[df_proy["anio"] == anio_anterior]["venta"].sum()
+            venta_hist = proyeccion_dia["venta_comparable"]
+            crecimiento_real = proyeccion_dia["crecimiento"]
+            total_pasado = proyecciones.crecimiento_anual(historial, [anio_objetivo])["total_anterior"].iloc[0]
 
-            crecimiento_real = (
-                (total_actual - total_pasado) / total_pasado
-                if total_pasado > 0 else 0
-            )
-
-            proyeccion_base = venta_hist * (1 + crecimiento_real)
-            meta_sugerida = proyeccion_base * (1 + ambicion_extra / 100)
+            proyeccion_base = proyeccion_dia["proyeccion"]
+            meta_sugerida = proyeccion_dia["meta"]
 
             # Métricas principales
             col1, col2, col3, col4 = st.columns(4)
@@ -1558,8 +1784,8 @@ if not df_proy.empty:
 
             st.markdown("### 📊 Escenarios")
 
-            esc_conservador = venta_hist * (1 + crecimiento_real * 0.5)
-            esc_agresivo = venta_hist * (1 + crecimiento_real * 1.5)
+            esc_conservador = proyeccion_dia["conservador"]
+            esc_agresivo = proyeccion_dia["agresivo"]
 
             e1, e2, e3 = st.columns(3)
             e1.metric("Conservador", f"${esc_conservador:,.0f}")
@@ -1570,31 +1796,14 @@ if not df_proy.empty:
             st.markdown("---")
             st.markdown("### 💰 Totales Acumulados y Presupuesto")
             
-            # Calcular totales acumulados hasta la fecha proyectada
-            # Para el año anterior
-            fecha_limite_anterior = pd.Timestamp(year=anio_anterior, month=fecha_proyectar.month, day=fecha_proyectar.day)
-            total_acum_anterior = df_proy[
-                (df_proy["anio"] == anio_anterior) & 
-                (df_proy["fecha"] <= fecha_limite_anterior)
-            ]["venta"].sum()
-            
-            # Para el año actual (hasta ahora)
-            fecha_actual = pd.Timestamp.now()
-            total_acum_actual = df_proy[
-                (df_proy["anio"] == anio_objetivo) & 
-                (df_proy["fecha"] <= fecha_actual)
-            ]["venta"].sum()
-            
-            # Proyección del total del año actual
-            dias_restantes = (pd.Timestamp(year=anio_objetivo, month=12, day=31) - fecha_actual).days
-            if dias_restantes > 0:
-                promedio_diario_actual = total_acum_actual / (fecha_actual.day_of_year if hasattr(fecha_actual, 'day_of_year') else fecha_actual.timetuple().tm_yday)
-                proyeccion_total_anual = total_acum_actual + (promedio_diario_actual * dias_restantes)
-            else:
-                proyeccion_total_anual = total_acum_actual
-            
-            # Presupuesto del año actual (basado en año anterior + crecimiento)
-            presupuesto_anual = total_pasado * (1 + abs(crecimiento_real) if crecimiento_real < 0 else 1 + crecimiento_real)
+            # Acumulados de ambos años, cierre proyectado y presupuesto del año objetivo
+            totales = proyecciones.totales_anuales(
+                cargar_indice([anio_anterior, anio_objetivo]), fecha_proyectar, total_pasado, crecimiento_real
+            )
+            fecha_limite_anterior, fecha_actual = totales.limite_anterior, totales.hoy
+            total_acum_anterior, total_acum_actual = totales.acumulado_anterior, totales.acumulado_actual
+            proyeccion_total_anual = totales.proyeccion_anual
+            presupuesto_anual = totales.presupuesto_anual
             
             # Mostrar métricas de totales
             col_t1, col_t2, col_t3, col_t4 = st.columns(4)
@@ -1610,7 +1819,7 @@ if not df_proy.empty:
                 st.metric(
                     "Total Acumulado Año Actual",
                     f"${total_acum_actual:,.0f}",
-                    f"{((total_acum_actual - total_acum_anterior)/total_acum_anterior*100):+.1f}%" if total_acum_anterior > 0 else None,
+                    f"{kpis.variacion(total_acum_actual, total_acum_anterior):+.1f}%" if total_acum_anterior > 0 else None,
                     help=f"Hasta {fecha_actual.strftime('%d/%m/%Y')}"
                 )
             
@@ -1623,7 +1832,7 @@ if not df_proy.empty:
             
             with col_t4:
                 # Calcular cumplimiento de presupuesto
-                cumplimiento_presupuesto = (proyeccion_total_anual / presupuesto_anual * 100) if presupuesto_anual > 0 else 0
+                cumplimiento_presupuesto = totales.cumplimiento
                 delta_color = "normal" if cumplimiento_presupuesto >= 100 else "inverse"
                 
                 st.metric(
@@ -1635,7 +1844,7 @@ if not df_proy.empty:
             
             # Barra de progreso del presupuesto
             st.markdown("#### 📊 Progreso del Presupuesto Anual")
-            progreso_presupuesto = min(total_acum_actual / presupuesto_anual, 1.0) if presupuesto_anual > 0 else 0
+            progreso_presupuesto = totales.progreso
             st.progress(progreso_presupuesto, text=f"Progreso actual: {progreso_presupuesto*100:.1f}% del presupuesto anual")
             
             # Tabla resumen de proyecciones
@@ -1670,30 +1879,87 @@ if not df_proy.empty:
             if crecimiento_real < 0:
                 st.warning(f"⚠️ El crecimiento real es negativo ({crecimiento_real*100:.2f}%). Considera revisar las estrategias de venta.")
             
+            # Proyección de cada día del rango
+            if dias_proyeccion > 1:
+                st.markdown(f"#### 📅 Proyección por Día ({int(dias_proyeccion)} días)")
+                
+                con_comparable = df_proyeccion["venta_comparable"].notna()
+                col_r1, col_r2, col_r3 = st.columns(3)
+                col_r1.metric("Proyección del Rango", f"${df_proyeccion['proyeccion'].sum():,.0f}")
+                col_r2.metric("Meta del Rango", f"${df_proyeccion['meta'].sum():,.0f}")
+                col_r3.metric("Días con Comparable", f"{int(con_comparable.sum())} de {len(df_proyeccion)}")
+                
+                st.dataframe(
+                    df_proyeccion[["fecha", "venta_comparable", "crecimiento", "conservador", "proyeccion", "agresivo", "meta"]]
+                    .rename(columns={
+                        "fecha": "Fecha",
+                        "venta_comparable": "Venta Comparable",
+                        "crecimiento": "Crecimiento",
+                        "conservador": "Conservador",
+                        "proyeccion": "Proyección",
+                        "agresivo": "Agresivo",
+                        "meta": "Meta"
+                    })
+                    .style.format({
+                        "Fecha": "{:%d/%m/%Y}",
+                        "Venta Comparable": "${:,.0f}",
+                        "Crecimiento": lambda v: f"{v*100:.2f}%",
+                        "Conservador": "${:,.0f}",
+                        "Proyección": "${:,.0f}",
+                        "Agresivo": "${:,.0f}",
+                        "Meta": "${:,.0f}"
+                    }, na_rep="—"),
+                    use_container_width=True,
+                    hide_index=True
+                )
+            
         else:
             st.warning("No se encontró día comparable en el año anterior.")
 
+if catalogo["anios"]:
+    seccion_proyeccion()
+
 # ---------- ADMINISTRACIÓN ----------
 with st.expander("⚙️ Administración", expanded=False):
     col_admin1, col_admin2 = st.columns(2)
     
     with col_admin1:
         if st.button("🗑️ Borrar todos los datos", use_container_width=True):
-            conn = conectar()
-            if conn is not None:
-                try:
+            try:
+                with conectar() as conn:
+                    # La versión sube en la misma transacción que el borrado, como en
+                    # la ingesta: ningún lector ve la base vacía con la versión anterior
                     conn.execute("DELETE FROM ventas")
+                    resumenes.reconstruir(conn)
+                    esquema.marcar_cambio_datos(conn)
                     conn.commit()
-                    st.warning("Base de datos limpiada")
-                    st.rerun()
-                except sqlite3.Error as e:
-                    st.error(f"Error: {e}")
-                finally:
-                    conn.close()
+                    sincronizar_almacen(conn)
+                limpiar_caches()
+                st.warning("Base de datos limpiada")
+                st.rerun()
+            except sqlite3.Error as e:
+                st.error(f"Error: {e}")
     
     with col_admin2:
         if st.button("🔄 Reiniciar estructura", use_container_width=True):
             eliminar_tabla_existente()
             crear_tabla()
+            registrar_cambio_datos()
             st.success("Estructura reiniciada")
-            st.rerun()
\ No newline at end of file
+            st.rerun()
+# ---------- RENDIMIENTO ----------
+# Tramos de esta ejecución; los fragmentos que se vuelven a ejecutar solos van solo al log
+panel_rendimiento = st.sidebar.expander("⏱️ Rendimiento", expanded=False, key="panel_rendimiento", on_change="rerun")
+if panel_rendimiento.open:
+    with panel_rendimiento:
+        memoria = rendimiento.memoria_maxima_mb()
+        st.caption(
+            f"Ejecución: {medicion.total_ms():,.0f} ms"
+            + (f" · memoria máx.: {memoria:,.0f} MB" if memoria is not None else "")
+        )
+        st.dataframe(
+            pd.DataFrame(medicion.filas()).style.format({"ms": "{:,.1f}"}, na_rep=""),
+            use_container_width=True,
+            hide_index=True
+        )
+medicion.emitir()